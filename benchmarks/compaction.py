@@ -0,0 +1,94 @@
+"""
+Executor prompt size with and without tool output compaction.
+
+Runs a chain of stub tasks through handle_user_input twice, with
+tool_output_compaction off and on, and reads the recorded spans back with
+todo_agent.report.summarize. The stub model reports the estimated size of each
+prompt as its input tokens, and the stub scraper returns pages of
+--page-chars characters, so the numbers show how much page text every model
+call of a step re-sends.
+
+    uv run -m benchmarks.compaction --tasks 5 --page-chars 20000
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+import uuid
+
+# The benchmark never calls the APIs; point the DB at a scratch SQLite file
+_scratch = tempfile.mkdtemp()
+os.environ.setdefault("OPENAI_API_KEY", "unused")
+os.environ.setdefault("TAVILY_API_KEY", "unused")
+os.environ.setdefault("DATABASE_DSN", f"sqlite:///{_scratch}/bench.db")
+os.environ.setdefault("TOOL_CACHE_PATH", f"{_scratch}/tool_cache.db")
+os.environ.setdefault("CHECKPOINT_ENABLED", "false")
+os.environ.setdefault("TASK_MEMO_ENABLED", "false")
+os.environ.setdefault("LLM_CACHE_ENABLED", "false")
+os.environ.setdefault("PLAN_CACHE_ENABLED", "false")
+
+from benchmarks.stubs import stub_agents, synthetic_plan  # noqa: E402
+from todo_agent.config import settings  # noqa: E402
+from todo_agent.db import engine  # noqa: E402
+from todo_agent.metrics import get_metrics  # noqa: E402
+from todo_agent.migrations import upgrade_schema  # noqa: E402
+from todo_agent.report import summarize  # noqa: E402
+from todo_agent.session_manager import handle_user_input  # noqa: E402
+
+
+def run(args, compaction: bool):
+    """Run one session of args.tasks chained tasks; returns its summary."""
+    settings.tool_output_compaction = compaction
+    planner, executor = stub_agents(
+        synthetic_plan(args.tasks), page_chars=args.page_chars
+    )
+    thread_id = f"compaction-{uuid.uuid4().hex[:8]}"
+    start = time.perf_counter()
+    # Session output is noise here
+    with contextlib.redirect_stdout(io.StringIO()):
+        handle_user_input(thread_id, f"Objective {thread_id}", planner, executor)
+    elapsed = time.perf_counter() - start
+    return summarize(get_metrics(thread_id)), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tasks", type=int, default=5, help="Tasks in the chain")
+    parser.add_argument(
+        "--page-chars",
+        type=int,
+        default=20000,
+        help="Characters of every page the stub scraper returns",
+    )
+    args = parser.parse_args()
+
+    upgrade_schema(engine)
+    settings.metrics_enabled = True
+    print(
+        f"tasks={args.tasks} page_chars={args.page_chars} "
+        f"budget={settings.tool_output_token_budget} tokens"
+    )
+    header = (
+        f"{'compaction':<11} {'llm calls':>9} {'in tok':>9} {'in tok/task':>12} "
+        f"{'tool tok':>9} {'kept tok':>9} {'wall s':>7}"
+    )
+    print(header)
+    print("-" * len(header))
+    for compaction in (False, True):
+        summary, elapsed = run(args, compaction)
+        total = summary["total"]
+        tools = summary["compaction"]
+        print(
+            f"{'on' if compaction else 'off':<11} {total['llm_calls']:>9} "
+            f"{total['input_tokens']:>9} "
+            f"{total['input_tokens'] // args.tasks:>12} "
+            f"{tools['tokens_before'] if compaction else '-':>9} "
+            f"{tools['tokens_after'] if compaction else '-':>9} {elapsed:>7.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
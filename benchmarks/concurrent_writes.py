@@ -0,0 +1,140 @@
+"""
+Concurrent session writes against one database, counting lock errors.
+
+Many sessions at once create their plan, then move every task through
+in_progress and completed, each update in its own transaction, the way parallel
+tasks and batch workers write. Runs on a thread pool through the sync engine and
+on one event loop through the async engine, then prints throughput, errors and
+the connection pool readout. Exits non-zero if any write failed.
+
+    uv run -m benchmarks.concurrent_writes --sessions 64 --tasks 20
+    # Without the SQLite tuning, for comparison
+    SQLITE_JOURNAL_MODE=DELETE SQLITE_BUSY_TIMEOUT_MS=0 \\
+        uv run -m benchmarks.concurrent_writes
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+# The benchmark never calls the APIs; point the DB at a scratch SQLite file
+_scratch = os.path.join(tempfile.mkdtemp(), "bench.db")
+os.environ.setdefault("OPENAI_API_KEY", "unused")
+os.environ.setdefault("TAVILY_API_KEY", "unused")
+os.environ.setdefault("DATABASE_DSN", f"sqlite:///{_scratch}")
+
+from sqlalchemy.exc import OperationalError  # noqa: E402
+
+from todo_agent import crud  # noqa: E402
+from todo_agent.db import engine, pool_status  # noqa: E402
+from todo_agent.migrations import upgrade_schema  # noqa: E402
+
+
+def plan(n_tasks: int) -> List[Dict]:
+    return [
+        {"id": i, "title": f"Task {i}", "content": f"Do step {i}", "dependencies": []}
+        for i in range(1, n_tasks + 1)
+    ]
+
+
+class Errors:
+    def __init__(self):
+        self.locked = 0
+        self.other: List[str] = []
+
+    def add(self, error: Exception):
+        if isinstance(error, OperationalError) and "locked" in str(error):
+            self.locked += 1
+        else:
+            self.other.append(repr(error))
+
+
+def run_session(thread_id: str, n_tasks: int, errors: Errors):
+    try:
+        crud.create_session(thread_id, f"Objective {thread_id}", plan(n_tasks))
+        for task_id in range(1, n_tasks + 1):
+            crud.update_task_status(thread_id, task_id, "in_progress")
+            crud.update_task_status(thread_id, task_id, "completed", result="ok")
+        crud.mark_session_complete(thread_id)
+    except Exception as e:
+        errors.add(e)
+
+
+async def arun_session(thread_id: str, n_tasks: int, errors: Errors):
+    try:
+        await crud.acreate_session(thread_id, f"Objective {thread_id}", plan(n_tasks))
+        for task_id in range(1, n_tasks + 1):
+            await crud.aupdate_task_status(thread_id, task_id, "in_progress")
+            await crud.aupdate_task_status(thread_id, task_id, "completed", result="ok")
+        await crud.amark_session_complete(thread_id)
+    except Exception as e:
+        errors.add(e)
+
+
+def completed_tasks(thread_ids: List[str]) -> int:
+    completed = 0
+    for thread_id in thread_ids:
+        # Sessions whose plan insert failed don't exist
+        session_data = crud.get_session_by_thread(thread_id) or {"tasks": []}
+        completed += sum(t["status"] == "completed" for t in session_data["tasks"])
+    return completed
+
+
+def report(mode: str, thread_ids: List[str], n_tasks: int, elapsed: float, errors):
+    # One insert of the plan, two updates per task, one final update
+    writes = len(thread_ids) * (2 * n_tasks + 2)
+    print(
+        f"{mode:>8}: {len(thread_ids)} sessions, "
+        f"{completed_tasks(thread_ids)}/{len(thread_ids) * n_tasks} tasks completed, "
+        f"{writes / elapsed:.0f} writes/s, "
+        f"{errors.locked} lock errors, {len(errors.other)} other errors"
+    )
+    for error in errors.other[:5]:
+        print(f"          {error}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sessions", type=int, default=64)
+    parser.add_argument("--tasks", type=int, default=20, help="Tasks per session")
+    parser.add_argument(
+        "--threads", type=int, default=32, help="Sessions writing at once (sync)"
+    )
+    args = parser.parse_args()
+
+    upgrade_schema(engine)
+    run_id = uuid.uuid4().hex[:8]
+    print(f"database: {engine.url}")
+
+    errors = Errors()
+    thread_ids = [f"writes-{run_id}-sync-{i}" for i in range(args.sessions)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        list(pool.map(lambda t: run_session(t, args.tasks, errors), thread_ids))
+    report("threads", thread_ids, args.tasks, time.perf_counter() - start, errors)
+    failures = errors.locked + len(errors.other)
+
+    async def run_async():
+        await asyncio.gather(
+            *[arun_session(t, args.tasks, aerrors) for t in athread_ids]
+        )
+
+    aerrors = Errors()
+    athread_ids = [f"writes-{run_id}-async-{i}" for i in range(args.sessions)]
+    start = time.perf_counter()
+    asyncio.run(run_async())
+    report("async", athread_ids, args.tasks, time.perf_counter() - start, aerrors)
+    failures += aerrors.locked + len(aerrors.other)
+
+    for name, stats in pool_status().items():
+        print(f"pool ({name}): {stats}")
+    raise SystemExit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Count SQL statements per task for the crud helpers vs. SessionRepository.
+
+Simulates the DB traffic of executing a plan sequentially: mark the task
+in_progress, gather completed context, store the result. Also counts the
+statements of storing plans, one session at a time and in bulk.
+
+    uv run -m benchmarks.crud_queries --tasks 15 --sessions 200
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+# The benchmark never calls the APIs; point the DB at a scratch SQLite file
+_scratch = os.path.join(tempfile.mkdtemp(), "bench.db")
+os.environ.setdefault("OPENAI_API_KEY", "unused")
+os.environ.setdefault("TAVILY_API_KEY", "unused")
+os.environ.setdefault("DATABASE_DSN", f"sqlite:///{_scratch}")
+
+from sqlalchemy import event  # noqa: E402
+
+from todo_agent import crud  # noqa: E402
+from todo_agent.db import engine  # noqa: E402
+from todo_agent.migrations import upgrade_schema  # noqa: E402
+from todo_agent.repository import SessionRepository  # noqa: E402
+
+statements = 0
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def _count(conn, cursor, statement, parameters, context, executemany):
+    global statements
+    statements += 1
+
+
+def plan(n_tasks: int):
+    return [
+        {"id": i, "title": f"Task {i}", "content": f"Do step {i}", "dependencies": []}
+        for i in range(1, n_tasks + 1)
+    ]
+
+
+def run_crud(thread_id: str, n_tasks: int):
+    for task_id in range(1, n_tasks + 1):
+        crud.update_task_status(thread_id, task_id, "in_progress")
+        crud.get_completed_tasks(thread_id)
+        crud.update_task_status(thread_id, task_id, "completed", result="ok")
+    crud.mark_session_complete(thread_id)
+
+
+def run_repository(thread_id: str, n_tasks: int):
+    with SessionRepository(thread_id) as repo:
+        for task_id in range(1, n_tasks + 1):
+            repo.update_task_status(task_id, "in_progress")
+            repo.flush()
+            repo.get_completed_tasks()
+            repo.update_task_status(task_id, "completed", result="ok")
+            repo.flush()
+        repo.mark_session_complete()
+
+
+def measure(name: str, runner, n_tasks: int):
+    global statements
+    thread_id = f"bench-{name}"
+    crud.create_session(thread_id, "benchmark", plan(n_tasks))
+    statements = 0
+    start = time.perf_counter()
+    runner(thread_id, n_tasks)
+    elapsed = time.perf_counter() - start
+    print(
+        f"{name:<12} {statements:>6} statements  "
+        f"{statements / n_tasks:>6.2f} per task  {elapsed * 1000 / n_tasks:>7.2f} ms per task"
+    )
+
+
+def measure_plans(n_sessions: int, n_tasks: int):
+    """Statements and time to store n_sessions plans of n_tasks tasks."""
+    global statements
+    plans = [
+        {
+            "thread_id": f"plan-{mode}-{i}",
+            "objective": "benchmark",
+            "tasks": plan(n_tasks),
+        }
+        for mode in ("single", "bulk")
+        for i in range(n_sessions)
+    ]
+
+    def report(name: str, elapsed: float):
+        print(
+            f"{name:<12} {statements:>6} statements  "
+            f"{statements / n_sessions:>6.2f} per plan  "
+            f"{elapsed * 1000 / n_sessions:>7.2f} ms per plan"
+        )
+
+    statements = 0
+    start = time.perf_counter()
+    for entry in plans[:n_sessions]:
+        crud.create_session(entry["thread_id"], entry["objective"], entry["tasks"])
+    report("create", time.perf_counter() - start)
+
+    statements = 0
+    start = time.perf_counter()
+    crud.bulk_create_sessions(plans[n_sessions:])
+    report("bulk_create", time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tasks", type=int, default=15)
+    parser.add_argument(
+        "--sessions", type=int, default=200, help="Plans stored per method"
+    )
+    args = parser.parse_args()
+
+    upgrade_schema(engine)
+    measure("crud", run_crud, args.tasks)
+    measure("repository", run_repository, args.tasks)
+    measure_plans(args.sessions, args.tasks)
+
+
+if __name__ == "__main__":
+    main()
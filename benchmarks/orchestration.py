@@ -0,0 +1,235 @@
+"""
+End-to-end orchestration benchmark with a stub LLM and stub Tavily tools.
+
+Drives handle_user_input (or ahandle_user_input with --async) for synthetic
+plans of several sizes and many concurrent sessions against a scratch SQLite
+database. Model and tool calls sleep for a fixed latency, so everything above
+that is orchestration overhead (scheduling, context building, DB traffic).
+
+    uv run -m benchmarks.orchestration --tasks 5 50 500 --sessions 8
+    uv run -m benchmarks.orchestration --async --json results.json
+"""
+
+import argparse
+import asyncio
+import contextlib
+import datetime
+import io
+import json
+import os
+import statistics
+import tempfile
+import time
+import tracemalloc
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+# The benchmark never calls the APIs; point the DB at a scratch SQLite file
+_scratch = tempfile.mkdtemp()
+os.environ.setdefault("OPENAI_API_KEY", "unused")
+os.environ.setdefault("TAVILY_API_KEY", "unused")
+os.environ.setdefault("DATABASE_DSN", f"sqlite:///{_scratch}/bench.db")
+os.environ.setdefault("TOOL_CACHE_PATH", f"{_scratch}/tool_cache.db")
+os.environ.setdefault("CHECKPOINT_DB_PATH", f"{_scratch}/agent_state.db")
+# Every session runs the same synthetic tasks; measure execution, not reuse
+os.environ.setdefault("TASK_MEMO_ENABLED", "false")
+
+from sqlalchemy import event  # noqa: E402
+
+from benchmarks.stubs import stub_agents, stub_seconds_per_task, synthetic_plan  # noqa: E402
+from todo_agent import crud  # noqa: E402
+from todo_agent.checkpoints import get_checkpointer  # noqa: E402
+from todo_agent.config import settings  # noqa: E402
+from todo_agent.db import engine, get_async_engine  # noqa: E402
+from todo_agent.migrations import upgrade_schema  # noqa: E402
+from todo_agent.session_manager import ahandle_user_input, handle_user_input  # noqa: E402
+
+statements = 0
+
+
+def _count(conn, cursor, statement, parameters, context, executemany):
+    global statements
+    statements += 1
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))
+    return ordered[index]
+
+
+def task_overheads(thread_ids: List[str], stub_seconds: float) -> List[float]:
+    """Per-task wall time minus the time spent inside the stubs, in ms."""
+    overheads = []
+    for thread_id in thread_ids:
+        session_data = crud.get_session_by_thread(thread_id)
+        for task in session_data["tasks"]:
+            if not (task["started_at"] and task["completed_at"]):
+                continue
+            wall = (
+                datetime.datetime.fromisoformat(task["completed_at"])
+                - datetime.datetime.fromisoformat(task["started_at"])
+            ).total_seconds()
+            overheads.append((wall - stub_seconds) * 1000)
+    return overheads
+
+
+def run_scenario(args, n_tasks: int) -> Dict:
+    """Run args.sessions sessions of an n_tasks plan and collect the numbers."""
+    global statements
+    plan = synthetic_plan(n_tasks, args.width)
+    planner, executor = stub_agents(
+        plan,
+        args.llm_latency,
+        args.tool_latency,
+        checkpointer=get_checkpointer() if args.checkpoints else None,
+    )
+    run_id = uuid.uuid4().hex[:8]
+    thread_ids = [f"bench-{run_id}-{i}" for i in range(args.sessions)]
+
+    def run_sync(thread_id: str):
+        handle_user_input(thread_id, f"Objective {thread_id}", planner, executor)
+
+    async def run_async():
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def run_one(thread_id: str):
+            async with semaphore:
+                await ahandle_user_input(
+                    thread_id, f"Objective {thread_id}", planner, executor
+                )
+
+        await asyncio.gather(*[run_one(thread_id) for thread_id in thread_ids])
+
+    if args.tracemalloc:
+        tracemalloc.start()
+    statements = 0
+    start = time.perf_counter()
+    # Session output is noise here
+    with contextlib.redirect_stdout(io.StringIO()):
+        if args.use_async:
+            asyncio.run(run_async())
+        else:
+            with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+                list(pool.map(run_sync, thread_ids))
+    elapsed = time.perf_counter() - start
+    queries = statements
+    peak_mb = None
+    if args.tracemalloc:
+        peak_mb = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+
+    overheads = task_overheads(
+        thread_ids, stub_seconds_per_task(args.llm_latency, args.tool_latency)
+    )
+    total_tasks = n_tasks * args.sessions
+    return {
+        "tasks": n_tasks,
+        "sessions": args.sessions,
+        "completed_tasks": len(overheads),
+        "elapsed_s": elapsed,
+        "tasks_per_s": total_tasks / elapsed,
+        "overhead_p50_ms": percentile(overheads, 50),
+        "overhead_p99_ms": percentile(overheads, 99),
+        "overhead_mean_ms": statistics.fmean(overheads) if overheads else 0.0,
+        "queries_per_task": queries / total_tasks,
+        "peak_mb": peak_mb,
+    }
+
+
+def peak_rss_mb() -> float:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return float("nan")
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--tasks", type=int, nargs="+", default=[5, 50, 500], help="Plan sizes"
+    )
+    parser.add_argument(
+        "--sessions", type=int, default=8, help="Sessions per plan size"
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=8, help="Sessions running at once"
+    )
+    parser.add_argument(
+        "--width",
+        type=int,
+        default=4,
+        help="Task i depends on task i - width (1 = strict chain)",
+    )
+    parser.add_argument("--llm-latency", type=float, default=0.01, help="Seconds")
+    parser.add_argument("--tool-latency", type=float, default=0.005, help="Seconds")
+    parser.add_argument(
+        "--async",
+        dest="use_async",
+        action="store_true",
+        help="Use ahandle_user_input on one event loop instead of threads",
+    )
+    parser.add_argument(
+        "--checkpoints",
+        action="store_true",
+        help="Checkpoint the agent graphs to SQLite, as the CLI does",
+    )
+    parser.add_argument(
+        "--tracemalloc",
+        action="store_true",
+        help="Measure peak Python heap per scenario (slows everything down)",
+    )
+    parser.add_argument(
+        "--speculate",
+        action="store_true",
+        help="Prefetch the searches of upcoming tasks (speculative_prefetch)",
+    )
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+    settings.speculative_prefetch = args.speculate
+
+    upgrade_schema(engine)
+    event.listen(engine, "before_cursor_execute", _count)
+    if args.use_async:
+        event.listen(get_async_engine().sync_engine, "before_cursor_execute", _count)
+
+    mode = "async" if args.use_async else "threads"
+    print(
+        f"mode={mode} sessions={args.sessions} concurrency={args.concurrency} "
+        f"width={args.width} llm={args.llm_latency}s tool={args.tool_latency}s "
+        f"checkpoints={args.checkpoints} speculate={args.speculate}"
+    )
+    header = (
+        f"{'tasks':>6} {'done':>6} {'elapsed s':>10} {'tasks/s':>9} "
+        f"{'p50 ms':>8} {'p99 ms':>8} {'queries/task':>13} {'heap MB':>8}"
+    )
+    print(header)
+    print("-" * len(header))
+
+    results = []
+    for n_tasks in args.tasks:
+        result = run_scenario(args, n_tasks)
+        results.append(result)
+        heap = f"{result['peak_mb']:.1f}" if result["peak_mb"] is not None else "-"
+        print(
+            f"{result['tasks']:>6} {result['completed_tasks']:>6} "
+            f"{result['elapsed_s']:>10.2f} {result['tasks_per_s']:>9.1f} "
+            f"{result['overhead_p50_ms']:>8.1f} {result['overhead_p99_ms']:>8.1f} "
+            f"{result['queries_per_task']:>13.2f} {heap:>8}"
+        )
+    print(f"peak RSS: {peak_rss_mb():.1f} MB")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(
+                {"mode": mode, "args": vars(args), "results": results}, f, indent=2
+            )
+
+
+if __name__ == "__main__":
+    main()
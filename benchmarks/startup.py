@@ -0,0 +1,118 @@
+"""
+CLI startup time: importing todo_agent.main and resuming a completed session.
+
+Every scenario runs in a fresh interpreter, --runs times, and reports the
+median wall time of the process plus whether LangChain was imported. Resuming
+a completed session only reads the database, so it should never load
+LangChain; "build agents" forces the planner and executor to be built, which
+is what every run paid before they were created lazily.
+
+    uv run -m benchmarks.startup --runs 5
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict
+
+# The benchmark never calls the APIs; point the DB at a scratch SQLite file
+_scratch = tempfile.mkdtemp()
+_database = os.path.join(_scratch, "bench.db")
+os.environ.setdefault("OPENAI_API_KEY", "unused")
+os.environ.setdefault("TAVILY_API_KEY", "unused")
+os.environ.setdefault("DATABASE_DSN", f"sqlite:///{_database}")
+os.environ.setdefault("CHECKPOINT_DB_PATH", os.path.join(_scratch, "agent_state.db"))
+
+from todo_agent import crud  # noqa: E402
+from todo_agent.db import engine  # noqa: E402
+from todo_agent.main import make_thread_id  # noqa: E402
+from todo_agent.migrations import upgrade_schema  # noqa: E402
+
+OBJECTIVE = "Benchmark startup of a completed session"
+
+# Each snippet runs in a child interpreter; the last line it prints is JSON
+_REPORT = """
+print(json.dumps({
+    "seconds": time.perf_counter() - start,
+    "langchain": any(m.split(".")[0].startswith("langchain") for m in sys.modules),
+}))
+"""
+SCENARIOS = {
+    "import config": "import todo_agent.config",
+    "import main": "import todo_agent.main",
+    "resume completed": f"""
+import contextlib, io
+from todo_agent.main import main
+sys.stdin = io.StringIO({OBJECTIVE!r} + "\\n")
+output = io.StringIO()
+with contextlib.redirect_stdout(output):
+    main([])
+assert "All tasks already completed" in output.getvalue(), output.getvalue()
+""",
+    "build agents": """
+from todo_agent.main import build_agents
+planner, executor = build_agents()
+planner.get(), executor.get()
+""",
+}
+
+
+def seed_completed_session():
+    """Store a finished three-task session for OBJECTIVE."""
+    upgrade_schema(engine)
+    thread_id = make_thread_id(OBJECTIVE)
+    if crud.get_session_by_thread(thread_id):
+        return
+    plan = [
+        {"id": i, "title": f"Task {i}", "content": f"Do step {i}", "dependencies": []}
+        for i in range(1, 4)
+    ]
+    crud.create_session(thread_id, OBJECTIVE, plan)
+    for task in plan:
+        crud.update_task_status(thread_id, task["id"], "completed", result="ok")
+    crud.mark_session_complete(thread_id)
+
+
+def run_scenario(code: str) -> Dict:
+    """Run a snippet in a fresh interpreter; returns its timings."""
+    script = f"import json, sys, time\nstart = time.perf_counter()\n{code}\n{_REPORT}"
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-c", script],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    wall = time.perf_counter() - start
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    return {"wall": wall, **result}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5, help="Processes per scenario")
+    args = parser.parse_args()
+
+    seed_completed_session()
+    # One untimed run so every scenario sees warm .pyc files and OS caches
+    run_scenario(SCENARIOS["import main"])
+
+    header = f"{'scenario':<18} {'wall s':>7} {'in-process s':>13} {'langchain':>10}"
+    print(header)
+    print("-" * len(header))
+    for name, code in SCENARIOS.items():
+        runs = [run_scenario(code) for _ in range(args.runs)]
+        print(
+            f"{name:<18} {statistics.median(r['wall'] for r in runs):>7.2f} "
+            f"{statistics.median(r['seconds'] for r in runs):>13.2f} "
+            f"{'yes' if any(r['langchain'] for r in runs) else 'no':>10}"
+        )
+
+
+if __name__ == "__main__":
+    main()
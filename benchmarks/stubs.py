@@ -0,0 +1,215 @@
+"""
+Deterministic local stand-ins for the OpenAI chat model and the Tavily tools.
+
+They let the agents run end to end without network access, with a fixed,
+configurable latency per call, so benchmark numbers measure the orchestration
+code rather than the providers.
+"""
+
+import asyncio
+import time
+from typing import Dict, List, Optional, Type
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.tools import BaseTool
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from pydantic import BaseModel, Field
+
+from todo_agent.agents.executor import Executor
+from todo_agent.agents.planner import Planner
+from todo_agent.context import estimate_tokens
+from todo_agent.prefetch import PREFETCH_HEADER
+from todo_agent.tools.web_scraper import BatchWebScraper
+
+# Model calls made per executed task: search, scrape, structured result
+LLM_CALLS_PER_TASK = 3
+# Pages every stub search finds, and the stub model then scrapes
+RESULT_URLS = ["https://example.com/a", "https://example.com/b"]
+
+
+def synthetic_plan(n_tasks: int, width: int = 1) -> List[Dict]:
+    """
+    Plan of n_tasks tasks in which task i depends on task i - width.
+
+    width=1 is a strict chain; width >= n_tasks makes every task independent.
+    """
+    return [
+        {
+            "id": i,
+            "title": f"Step {i}",
+            "content": f"Research topic {i} and summarize it",
+            "dependencies": [i - width] if i > width else [],
+        }
+        for i in range(1, n_tasks + 1)
+    ]
+
+
+class StubChatModel(BaseChatModel):
+    """
+    Chat model that answers from a script instead of calling a provider.
+
+    Bound to the planner's TodoList schema it returns the configured plan;
+    otherwise it acts as the executor: search, then scrape, then return a
+    completed TaskResult. Every call sleeps for ``latency`` seconds and reports
+    the estimated size of its prompt as input tokens.
+    """
+
+    plan: List[Dict] = Field(default_factory=list)
+    latency: float = 0.0
+    tool_names: List[str] = Field(default_factory=list)
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub"
+
+    def bind_tools(self, tools, **kwargs):
+        names = [getattr(tool, "name", None) or tool.__name__ for tool in tools]
+        return self.model_copy(update={"tool_names": names})
+
+    def _respond(self, messages: List[BaseMessage]) -> ChatResult:
+        if "TodoList" in self.tool_names:
+            tool_call = {"name": "TodoList", "args": {"tasks": self.plan}}
+        else:
+            # Count tool results since the task message to pick the next step
+            steps = 0
+            for message in reversed(messages):
+                if message.type == "human":
+                    # Search results prefetched into the prompt replace the search
+                    steps += PREFETCH_HEADER in message.content
+                    break
+                steps += message.type == "tool"
+            if steps == 0:
+                query = messages[-1].content[-200:]
+                tool_call = {"name": "tavily_search", "args": {"query": query}}
+            elif steps == 1:
+                tool_call = {"name": "web_scraper", "args": {"urls": RESULT_URLS}}
+            else:
+                tool_call = {
+                    "name": "TaskResult",
+                    "args": {
+                        "task": "stub",
+                        "status": "completed",
+                        "result": "Stub result " + "lorem ipsum " * 40,
+                        "reflection": "Done",
+                    },
+                }
+        tool_call["id"] = f"call_{len(messages)}"
+        message = AIMessage(content="", tool_calls=[tool_call])
+        prompt_tokens = sum(estimate_tokens(str(m.content)) for m in messages)
+        return ChatResult(
+            generations=[ChatGeneration(message=message)],
+            llm_output={
+                "token_usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": 100,
+                },
+                "model_name": "stub",
+            },
+        )
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.latency)
+        return self._respond(messages)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.latency)
+        return self._respond(messages)
+
+
+class StubSearchInput(BaseModel):
+    query: str
+
+
+class StubSearch(BaseTool):
+    name: str = "tavily_search"
+    description: str = "Search the web."
+    args_schema: Type[BaseModel] = StubSearchInput
+    latency: float = 0.0
+
+    def _result(self, query: str) -> Dict:
+        return {
+            "query": query,
+            "results": [
+                {"url": url, "title": f"Result {i}", "content": "snippet " * 50}
+                for i, url in enumerate(RESULT_URLS)
+            ],
+        }
+
+    def _run(self, query: str, run_manager=None) -> Dict:
+        time.sleep(self.latency)
+        return self._result(query)
+
+    async def _arun(self, query: str, run_manager=None) -> Dict:
+        await asyncio.sleep(self.latency)
+        return self._result(query)
+
+
+class StubExtractInput(BaseModel):
+    urls: List[str]
+
+
+class StubExtract(BaseTool):
+    name: str = "tavily_extract"
+    description: str = "Extract web pages."
+    args_schema: Type[BaseModel] = StubExtractInput
+    latency: float = 0.0
+    page_chars: int = 5000
+
+    def _page(self, url: str) -> str:
+        """Page text: mostly boilerplate, with a few sentences on a topic."""
+        sentences = []
+        length = 0
+        while length < self.page_chars:
+            n = len(sentences)
+            if n % 8 == 3:
+                sentence = f"Notes on topic {n} from {url} list the key findings."
+            else:
+                sentence = f"Navigation, cookie banner and related links, block {n}."
+            sentences.append(sentence)
+            length += len(sentence) + 1
+        return " ".join(sentences)
+
+    def _result(self, urls: List[str]) -> Dict:
+        return {
+            "results": [{"url": url, "raw_content": self._page(url)} for url in urls],
+            "failed_results": [],
+        }
+
+    def _run(self, urls: List[str], run_manager=None) -> Dict:
+        time.sleep(self.latency)
+        return self._result(urls)
+
+    async def _arun(self, urls: List[str], run_manager=None) -> Dict:
+        await asyncio.sleep(self.latency)
+        return self._result(urls)
+
+
+def stub_agents(
+    plan: List[Dict],
+    llm_latency: float = 0.0,
+    tool_latency: float = 0.0,
+    checkpointer: Optional[BaseCheckpointSaver] = None,
+    page_chars: int = 5000,
+):
+    """Planner and Executor wired to the stub model and stub Tavily tools."""
+    planner = Planner(
+        llm=StubChatModel(plan=plan, latency=llm_latency), checkpointer=checkpointer
+    )
+    tools = [
+        StubSearch(latency=tool_latency),
+        BatchWebScraper(
+            extractor=StubExtract(latency=tool_latency, page_chars=page_chars)
+        ),
+    ]
+    executor = Executor(
+        tools, llm=StubChatModel(latency=llm_latency), checkpointer=checkpointer
+    )
+    return planner, executor
+
+
+def stub_seconds_per_task(llm_latency: float, tool_latency: float) -> float:
+    """Time a task spends inside the stubs: the rest is orchestration overhead."""
+    # One search and one batched scrape; scraped pages are fetched in parallel
+    return LLM_CALLS_PER_TASK * llm_latency + 2 * tool_latency
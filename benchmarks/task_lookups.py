@@ -0,0 +1,164 @@
+"""
+Task lookup latency as the tasks table grows to a million rows.
+
+Seeds sessions of --tasks-per-session tasks in bulk, and at each table size
+times the per-session lookups the scheduler and session manager make
+(get_session_by_thread, get_completed_tasks, get_pending_tasks,
+update_task_status) on random sessions. With the tasks indexes the latency
+stays flat as the table grows; --drop-indexes shows the full-scan baseline.
+
+    uv run -m benchmarks.task_lookups --sizes 10000 100000 1000000
+    uv run -m benchmarks.task_lookups --sizes 10000 100000 --drop-indexes
+"""
+
+import argparse
+import datetime
+import os
+import random
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+# The benchmark never calls the APIs; point the DB at a scratch SQLite file
+_scratch = os.path.join(tempfile.mkdtemp(), "bench.db")
+os.environ.setdefault("OPENAI_API_KEY", "unused")
+os.environ.setdefault("TAVILY_API_KEY", "unused")
+os.environ.setdefault("DATABASE_DSN", f"sqlite:///{_scratch}")
+
+from sqlalchemy import func, insert, select, text  # noqa: E402
+
+from todo_agent import crud  # noqa: E402
+from todo_agent.crud import Task, Thread  # noqa: E402
+from todo_agent.db import engine  # noqa: E402
+from todo_agent.migrations import upgrade_schema  # noqa: E402
+
+BATCH = 50_000
+
+
+def seed(first_session: int, n_sessions: int, tasks_per_session: int):
+    """Bulk insert sessions whose first half of tasks is completed."""
+    now = datetime.datetime.now()
+    threads = [
+        {
+            "id": session_id,
+            "thread_id": f"seed-{session_id}",
+            "objective": f"Objective {session_id}",
+            "status": "active",
+            "created_at": now,
+            "updated_at": now,
+        }
+        for session_id in range(first_session, first_session + n_sessions)
+    ]
+    tasks = [
+        {
+            "session_id": thread["id"],
+            "task_id": task_id,
+            "title": f"Task {task_id}",
+            "content": f"Do step {task_id} of {thread['id']}",
+            "status": "completed" if task_id <= tasks_per_session // 2 else "pending",
+            "result": "ok" if task_id <= tasks_per_session // 2 else None,
+            "dependencies": "[]",
+        }
+        for thread in threads
+        for task_id in range(1, tasks_per_session + 1)
+    ]
+    with engine.begin() as conn:
+        conn.execute(insert(Thread), threads)
+        for start in range(0, len(tasks), BATCH):
+            conn.execute(insert(Task), tasks[start : start + BATCH])
+
+
+def time_calls(call: Callable[[str], object], thread_ids: List[str]) -> Dict:
+    durations = []
+    for thread_id in thread_ids:
+        start = time.perf_counter()
+        call(thread_id)
+        durations.append((time.perf_counter() - start) * 1e6)
+    durations.sort()
+    return {
+        "p50": durations[len(durations) // 2],
+        "p99": durations[min(len(durations) - 1, int(len(durations) * 0.99))],
+    }
+
+
+def query_plan() -> List[str]:
+    """SQLite plan of the per-session task lookup."""
+    statement = (
+        select(Task)
+        .join(Thread, Task.session_id == Thread.id)
+        .filter(Thread.thread_id == "seed-1", Task.status == "completed")
+        .compile(engine, compile_kwargs={"literal_binds": True})
+    )
+    with engine.connect() as conn:
+        rows = conn.execute(text(f"EXPLAIN QUERY PLAN {statement}")).all()
+    return [row[-1] for row in rows]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[10_000, 100_000, 1_000_000],
+        help="Total task rows at which to measure",
+    )
+    parser.add_argument("--tasks-per-session", type=int, default=20)
+    parser.add_argument(
+        "--lookups", type=int, default=200, help="Random sessions timed per size"
+    )
+    parser.add_argument(
+        "--drop-indexes",
+        action="store_true",
+        help="Drop the tasks indexes first, to measure the full-scan baseline",
+    )
+    args = parser.parse_args()
+
+    upgrade_schema(engine)
+    if args.drop_indexes:
+        with engine.begin() as conn:
+            for index in Task.__table__.indexes:
+                conn.execute(text(f"DROP INDEX IF EXISTS {index.name}"))
+
+    operations = {
+        "get_session": crud.get_session_by_thread,
+        "get_completed": crud.get_completed_tasks,
+        "get_pending": crud.get_pending_tasks,
+        "update_status": lambda thread_id: crud.update_task_status(
+            thread_id, args.tasks_per_session, "pending"
+        ),
+    }
+    header = f"{'tasks':>10} {'seed s':>7}" + "".join(
+        f" {name + ' p50/p99 µs':>26}" for name in operations
+    )
+    print(header)
+    print("-" * len(header))
+
+    sessions = 0
+    for size in args.sizes:
+        target = size // args.tasks_per_session
+        start = time.perf_counter()
+        if target > sessions:
+            seed(sessions + 1, target - sessions, args.tasks_per_session)
+            sessions = target
+        seeded = time.perf_counter() - start
+        with engine.connect() as conn:
+            rows = conn.execute(select(func.count()).select_from(Task)).scalar()
+
+        thread_ids = [
+            f"seed-{random.randint(1, sessions)}" for _ in range(args.lookups)
+        ]
+        cells = []
+        for call in operations.values():
+            timing = time_calls(call, thread_ids)
+            cells.append(f" {timing['p50']:>12.0f} / {timing['p99']:>9.0f}")
+        print(f"{rows:>10} {seeded:>7.1f}" + "".join(cells))
+
+    if engine.dialect.name == "sqlite":
+        print("\nquery plan (completed tasks of one session):")
+        for line in query_plan():
+            print(f"  {line}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+import os
+import tempfile
+
+import pytest
+
+# Settings are read when todo_agent is imported: point everything at scratch
+# files and keep the APIs out of reach
+_scratch = tempfile.mkdtemp()
+os.environ.setdefault("OPENAI_API_KEY", "unused")
+os.environ.setdefault("TAVILY_API_KEY", "unused")
+os.environ.setdefault("DATABASE_DSN", f"sqlite:///{_scratch}/test.db")
+os.environ.setdefault("TOOL_CACHE_PATH", f"{_scratch}/tool_cache.db")
+os.environ.setdefault("CHECKPOINT_DB_PATH", f"{_scratch}/agent_state.db")
+os.environ.setdefault("CHECKPOINT_ENABLED", "false")
+os.environ.setdefault("TASK_MEMO_ENABLED", "false")
+os.environ.setdefault("LLM_CACHE_ENABLED", "false")
+os.environ.setdefault("PLAN_CACHE_ENABLED", "false")
+
+
+@pytest.fixture(scope="session")
+def database():
+    """The scratch database, migrated to the current schema."""
+    from todo_agent.db import engine
+    from todo_agent.migrations import upgrade_schema
+
+    upgrade_schema(engine)
+    return engine
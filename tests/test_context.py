@@ -0,0 +1,48 @@
+from todo_agent.context import TRUNCATION_MARKER, ContextStore, estimate_tokens
+
+
+def step(step_id: int, result: str):
+    return {
+        "id": step_id,
+        "title": f"Step {step_id}",
+        "description": f"Do step {step_id}",
+        "result": result,
+    }
+
+
+def test_steps_within_budget_are_kept_whole():
+    context = ContextStore(token_budget=1000, step_token_limit=500)
+    context.extend([step(1, "short"), step(2, "also short")])
+
+    selected = context.steps([2, 1])
+
+    assert [entry["id"] for entry in selected] == [1, 2]
+    assert [entry["result"] for entry in selected] == ["short", "also short"]
+
+
+def test_steps_over_budget_keep_every_dependency():
+    context = ContextStore(token_budget=600, step_token_limit=2000)
+    context.extend([step(1, "small result"), step(2, "x" * 4000), step(3, "y" * 4000)])
+
+    selected = context.steps([1, 2, 3])
+
+    assert [entry["id"] for entry in selected] == [1, 2, 3]
+    # The small step fits its share and stays whole
+    assert selected[0]["result"] == "small result"
+    # The large ones share the rest and say that they were cut
+    for entry in selected[1:]:
+        assert entry["result"].endswith(TRUNCATION_MARKER)
+        assert entry["text"].startswith(f"Step #{entry['id']}:")
+    assert sum(entry["tokens"] for entry in selected) <= 600
+    assert abs(selected[1]["tokens"] - selected[2]["tokens"]) <= 1
+
+
+def test_shrinking_leaves_the_stored_entry_and_its_hash_alone():
+    context = ContextStore(token_budget=200, step_token_limit=2000)
+    context.extend([step(1, "x" * 2000), step(2, "y" * 2000)])
+    stored = dict(context.get(1))
+
+    context.steps([1, 2])
+
+    assert context.get(1) == stored
+    assert stored["tokens"] > estimate_tokens("x" * 1000)
@@ -0,0 +1,91 @@
+import asyncio
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import text
+
+from todo_agent import crud
+from todo_agent.db import get_async_engine
+
+SESSIONS = 16
+TASKS = 10
+
+
+def plan():
+    return [
+        {"id": i, "title": f"Task {i}", "content": f"Do step {i}", "dependencies": []}
+        for i in range(1, TASKS + 1)
+    ]
+
+
+def run_session(thread_id: str):
+    crud.create_session(thread_id, f"Objective {thread_id}", plan())
+    for task_id in range(1, TASKS + 1):
+        crud.update_task_status(thread_id, task_id, "in_progress")
+        crud.update_task_status(thread_id, task_id, "completed", result="ok")
+    crud.mark_session_complete(thread_id)
+
+
+async def arun_session(thread_id: str):
+    await crud.acreate_session(thread_id, f"Objective {thread_id}", plan())
+    for task_id in range(1, TASKS + 1):
+        await crud.aupdate_task_status(thread_id, task_id, "in_progress")
+        await crud.aupdate_task_status(thread_id, task_id, "completed", result="ok")
+    await crud.amark_session_complete(thread_id)
+
+
+def assert_all_written(thread_ids):
+    for thread_id in thread_ids:
+        session_data = crud.get_session_by_thread(thread_id)
+        assert session_data["session"]["status"] == "completed"
+        assert [t["status"] for t in session_data["tasks"]] == ["completed"] * TASKS
+
+
+def test_sqlite_connections_use_wal(database):
+    with database.connect() as connection:
+        assert connection.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert connection.execute(text("PRAGMA busy_timeout")).scalar() > 0
+
+
+def test_concurrent_sessions_write_without_lock_errors(database):
+    """Sessions writing from many threads at once all land, none hits a lock."""
+    thread_ids = [f"writes-{uuid.uuid4().hex[:8]}-{i}" for i in range(SESSIONS)]
+
+    with ThreadPoolExecutor(max_workers=SESSIONS) as pool:
+        # result() re-raises any OperationalError ("database is locked")
+        for future in [pool.submit(run_session, t) for t in thread_ids]:
+            future.result()
+
+    assert_all_written(thread_ids)
+
+
+def test_concurrent_async_sessions_write_without_lock_errors(database):
+    thread_ids = [f"awrites-{uuid.uuid4().hex[:8]}-{i}" for i in range(SESSIONS)]
+
+    async def run():
+        try:
+            await asyncio.gather(*[arun_session(t) for t in thread_ids])
+        finally:
+            # Connections are bound to this event loop
+            await get_async_engine().dispose()
+
+    asyncio.run(run())
+
+    assert_all_written(thread_ids)
+
+
+def test_enqueue_more_objectives_than_sqlite_bind_limit(database):
+    """The existing-thread lookup is chunked, past SQLite's old 999-variable limit."""
+    prefix = f"queued-{uuid.uuid4().hex[:8]}"
+    objectives = {f"{prefix}-{i}": f"Objective {i}" for i in range(2500)}
+
+    async def run():
+        try:
+            first = await crud.aenqueue_objectives(objectives)
+            more = {**objectives, f"{prefix}-new": "New objective"}
+            return first, await crud.aenqueue_objectives(more)
+        finally:
+            await get_async_engine().dispose()
+
+    # Threads that already exist are skipped on the second call
+    assert asyncio.run(run()) == (2500, 1)
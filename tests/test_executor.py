@@ -0,0 +1,37 @@
+from benchmarks.stubs import StubChatModel, StubExtract, StubSearch
+from todo_agent.agents.executor import Executor
+from todo_agent.config import settings
+from todo_agent.tools.web_scraper import BatchWebScraper
+
+
+def stub_executor() -> Executor:
+    tools = [StubSearch(), BatchWebScraper(extractor=StubExtract())]
+    return Executor(tools, llm=StubChatModel(), escalation_llm=StubChatModel())
+
+
+def test_routing_uses_the_real_dependency_count():
+    """Dependencies trimmed from the context still count towards routing."""
+    executor = stub_executor()
+
+    executor.execute_step(
+        step_description="Summarize",
+        previous_steps=[],
+        config={"configurable": {"thread_id": "route-test"}},
+        n_dependencies=settings.routing_complex_min_dependencies,
+    )
+
+    stats = executor.route_stats()
+    assert stats["strong"]["attempts"] == 1
+    assert stats["fast"]["attempts"] == 0
+
+
+def test_routing_defaults_to_the_previous_steps():
+    executor = stub_executor()
+
+    executor.execute_step(
+        step_description="Summarize",
+        previous_steps=[],
+        config={"configurable": {"thread_id": "route-default"}},
+    )
+
+    assert executor.route_stats()["fast"]["attempts"] == 1
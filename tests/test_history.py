@@ -0,0 +1,67 @@
+import datetime
+import uuid
+
+import pytest
+from sqlalchemy import create_engine, select
+
+from todo_agent import crud
+from todo_agent.crud import Task, Thread
+from todo_agent.history import (
+    TASK_COLUMNS,
+    THREAD_COLUMNS,
+    export_sessions,
+    import_sessions,
+)
+
+PLAN = [
+    {"id": 1, "title": "Search", "content": "Search the web", "dependencies": []},
+    {"id": 2, "title": "Report", "content": "Write it up", "dependencies": [1]},
+]
+
+
+def dump(engine, thread_ids):
+    """Exported columns of the given sessions and their tasks, by thread id."""
+    with engine.connect() as conn:
+        threads = conn.execute(
+            select(*THREAD_COLUMNS).filter(Thread.thread_id.in_(thread_ids))
+        ).all()
+        tasks = conn.execute(
+            select(Thread.thread_id, *TASK_COLUMNS)
+            .join(Thread, Task.session_id == Thread.id)
+            .filter(Thread.thread_id.in_(thread_ids))
+        ).all()
+    return sorted(map(tuple, threads)), sorted(map(tuple, tasks))
+
+
+@pytest.mark.parametrize("name", ["sessions.ndjson", "sessions.ndjson.gz"])
+def test_export_and_import_round_trip(database, tmp_path, name):
+    since = datetime.datetime.now()
+    thread_ids = [f"history-{uuid.uuid4().hex}" for _ in range(5)]
+    for thread_id in thread_ids:
+        crud.create_session(thread_id, f"Objective {thread_id}", PLAN)
+        crud.update_task_status(thread_id, 1, "completed", result="ünïcode ✓")
+    crud.mark_session_complete(thread_ids[0])
+
+    path = str(tmp_path / name)
+    assert export_sessions(path, since=since, chunk_size=2) == (5, 10)
+    target = create_engine(f"sqlite:///{tmp_path / 'target.db'}")
+
+    assert import_sessions(path, chunk_size=2, engine=target) == (5, 0)
+    assert dump(target, thread_ids) == dump(database, thread_ids)
+    # Running the import again skips the sessions already there
+    assert import_sessions(path, engine=target) == (0, 5)
+
+
+def test_export_filters_by_status(database, tmp_path):
+    since = datetime.datetime.now()
+    done, active = f"history-{uuid.uuid4().hex}", f"history-{uuid.uuid4().hex}"
+    for thread_id in (done, active):
+        crud.create_session(thread_id, f"Objective {thread_id}", PLAN)
+    crud.mark_session_complete(done)
+
+    path = str(tmp_path / "completed.ndjson")
+    assert export_sessions(path, statuses=["completed"], since=since) == (1, 2)
+    target = create_engine(f"sqlite:///{tmp_path / 'target.db'}")
+    import_sessions(path, engine=target)
+
+    assert dump(target, [done, active]) == dump(database, [done])
@@ -0,0 +1,75 @@
+from sqlalchemy import create_engine, inspect, text
+
+from todo_agent.db import Base
+from todo_agent.migrations import upgrade_schema
+
+# The schema of the first release: no dependencies, memo keys, workers...
+OLD_SCHEMA = [
+    """CREATE TABLE threads (
+        id INTEGER PRIMARY KEY,
+        thread_id VARCHAR(100) NOT NULL UNIQUE,
+        objective TEXT NOT NULL,
+        status VARCHAR(20),
+        created_at DATETIME,
+        updated_at DATETIME
+    )""",
+    """CREATE TABLE tasks (
+        id INTEGER PRIMARY KEY,
+        session_id INTEGER NOT NULL REFERENCES threads (id),
+        task_id INTEGER NOT NULL,
+        title VARCHAR(500) NOT NULL,
+        content TEXT NOT NULL,
+        status VARCHAR(20),
+        result TEXT
+    )""",
+    "INSERT INTO threads (id, thread_id, objective, status) "
+    "VALUES (1, 'old', 'Old objective', 'completed')",
+    "INSERT INTO tasks (session_id, task_id, title, content, status, result) "
+    "VALUES (1, 1, 'Task', 'Do it', 'completed', 'done')",
+]
+
+
+def old_database(path):
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as conn:
+        for statement in OLD_SCHEMA:
+            conn.execute(text(statement))
+    return engine
+
+
+def test_upgrade_adds_missing_tables_columns_and_indexes(tmp_path):
+    engine = old_database(tmp_path / "old.db")
+
+    upgrade_schema(engine)
+    # Running it again finds nothing left to do
+    upgrade_schema(engine)
+
+    inspector = inspect(engine)
+    for table in Base.metadata.sorted_tables:
+        columns = {column["name"] for column in inspector.get_columns(table.name)}
+        assert columns == {column.name for column in table.columns}
+        indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        assert {index.name for index in table.indexes} <= indexes
+    with engine.connect() as conn:
+        row = conn.execute(text("SELECT result, memo_key FROM tasks")).one()
+    assert tuple(row) == ("done", None)
+
+
+def test_duplicate_rows_skip_the_unique_index(tmp_path, capsys):
+    engine = old_database(tmp_path / "duplicates.db")
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                "INSERT INTO tasks (session_id, task_id, title, content) "
+                "VALUES (1, 1, 'Task', 'Do it again')"
+            )
+        )
+
+    upgrade_schema(engine)
+
+    indexes = {index["name"] for index in inspect(engine).get_indexes("tasks")}
+    assert "uq_tasks_session_task" not in indexes
+    assert "ix_tasks_session_status" in indexes
+    assert "Could not create unique index uq_tasks_session_task" in (
+        capsys.readouterr().out
+    )
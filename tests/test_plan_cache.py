@@ -0,0 +1,51 @@
+import uuid
+
+from todo_agent import crud
+from todo_agent.plan_cache import PlanCache
+
+PLAN = [{"id": 1, "title": "Search", "content": "Search the web", "dependencies": []}]
+
+
+def store(objective: str) -> str:
+    thread_id = f"plans-{uuid.uuid4().hex}"
+    crud.create_session(thread_id, objective, PLAN)
+    return thread_id
+
+
+def test_stored_sessions_are_matched_by_similar_objectives(database):
+    city = uuid.uuid4().hex[:8]
+    thread_id = store(f"Plan a 3-day trip to {city} with museums and food")
+    cache = PlanCache(threshold=0.6)
+
+    assert cache.match(f"plan a 3 day trip to {city} with museums and food!") == (
+        thread_id,
+        1.0,
+    )
+    found, similarity = cache.match(
+        f"plan a 3 day trip to {city} with museums and food please"
+    )
+    assert found == thread_id and 0.6 <= similarity < 1.0
+    assert cache.match(f"plan a 3 day trip to {city}", exclude=thread_id) is None
+
+
+def test_plans_added_by_another_process_are_found_without_reloading(database):
+    city = uuid.uuid4().hex[:8]
+    cache = PlanCache()
+    assert cache.match(f"Weekend in {city}") is None
+
+    # Another process stores and indexes a plan for the objective
+    thread_id = store(f"Weekend in {city}")
+    PlanCache().add(thread_id, f"Weekend in {city}")
+
+    assert cache.match(f"weekend in {city}") == (thread_id, 1.0)
+
+
+def test_sessions_with_failed_tasks_are_not_reused(database):
+    city = uuid.uuid4().hex[:8]
+    thread_id = store(f"Compare hotels in {city}")
+    cache = PlanCache()
+    assert cache.match(f"Compare hotels in {city}") == (thread_id, 1.0)
+
+    crud.update_task_status(thread_id, 1, "failed")
+
+    assert cache.match(f"Compare hotels in {city}") is None
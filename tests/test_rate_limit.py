@@ -0,0 +1,112 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from langchain_core.callbacks import BaseCallbackHandler
+
+from benchmarks.stubs import StubChatModel, StubSearch
+from todo_agent import rate_limit
+from todo_agent.config import settings
+from todo_agent.rate_limit import (
+    ModelRateLimiter,
+    ProviderLimiter,
+    RateLimitedTool,
+    TokenBucket,
+    call_with_retry,
+    get_limiter,
+)
+from todo_agent.response_cache import ResponseCache
+
+
+class CountingLimiter(ProviderLimiter):
+    acquired = 0
+
+    def acquire(self, tokens: int = 0):
+        self.acquired += 1
+        super().acquire(tokens)
+
+
+class RateLimited(Exception):
+    status_code = 429
+
+    def __init__(self, retry_after: str):
+        super().__init__("Error 429")
+        self.response = SimpleNamespace(headers={"retry-after": retry_after})
+
+
+class ToolRuns(BaseCallbackHandler):
+    def __init__(self):
+        self.started = []
+
+    def on_tool_start(self, serialized, input_str, **kwargs):
+        self.started.append(kwargs.get("parent_run_id"))
+
+
+@pytest.fixture
+def limiters(monkeypatch):
+    monkeypatch.setattr(rate_limit, "_limiters", {})
+    monkeypatch.setattr(settings, "retry_base_delay_seconds", 0.01)
+    return rate_limit._limiters
+
+
+def test_cache_hits_take_no_quota(database, limiters):
+    limiter = limiters[("openai", "stub")] = CountingLimiter("openai stub", 1000)
+    cache = ResponseCache()
+    cache.clear()
+    model = StubChatModel(cache=cache, rate_limiter=ModelRateLimiter("openai", "stub"))
+
+    model.invoke("Compare the vendors")
+    model.invoke("Compare the vendors")
+
+    assert cache.stats() == {"hits": 1, "misses": 1}
+    assert limiter.acquired == 1
+
+
+def test_token_bucket_waits_once_empty():
+    bucket = TokenBucket(60, capacity=2)
+
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == pytest.approx(1.0, abs=0.05)
+
+
+def test_429_is_retried_and_pauses_the_model(limiters):
+    attempts = []
+
+    def call():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RateLimited(retry_after="0.05")
+        return "ok"
+
+    assert call_with_retry("openai", call, model="stub") == "ok"
+    limiter = get_limiter("openai", "stub")
+    assert len(attempts) == 2
+    assert limiter.retries == 1
+    assert limiter._paused_until > 0  # Other callers of the model held back too
+
+
+def test_model_limits_fall_back_to_the_provider_defaults(limiters, monkeypatch):
+    monkeypatch.setattr(
+        settings, "openai_model_limits", {"big": {"tokens_per_minute": 200000}}
+    )
+
+    big, small = get_limiter("openai", "big"), get_limiter("openai", "small")
+
+    assert big is not small
+    assert big.tokens.capacity == 200000
+    assert big.requests.capacity == settings.openai_requests_per_minute
+    assert small.tokens.capacity == settings.openai_tokens_per_minute
+
+
+def test_wrapped_tool_gets_the_callbacks(limiters):
+    tool = RateLimitedTool.wrap(StubSearch(), "tavily")
+    runs = ToolRuns()
+
+    tool.invoke({"query": "rome hotels"}, {"callbacks": [runs]})
+    asyncio.run(tool.ainvoke({"query": "rome hotels"}, {"callbacks": [runs]}))
+
+    # The wrapped search runs as a child of each wrapper run
+    assert len(runs.started) == 4
+    assert runs.started[0] is None and runs.started[1] is not None
+    assert runs.started[2] is None and runs.started[3] is not None
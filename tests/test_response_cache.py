@@ -0,0 +1,72 @@
+import datetime
+
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration
+
+from benchmarks.stubs import StubChatModel
+from todo_agent.db import SessionLocal
+from todo_agent.llm_cache import LLMCacheEntry
+from todo_agent.response_cache import ResponseCache
+
+LLM = "stub-model"
+
+
+class CountingModel(StubChatModel):
+    calls: int = 0
+
+    def _respond(self, messages):
+        self.calls += 1
+        return super()._respond(messages)
+
+
+def generation(text: str, status: str = "completed"):
+    call = {"name": "TaskResult", "args": {"status": status}, "id": "call-1"}
+    return ChatGeneration(message=AIMessage(content=text, tool_calls=[call]))
+
+
+def test_repeated_prompt_is_answered_from_the_cache(database):
+    cache = ResponseCache()
+    cache.clear()
+    model = CountingModel(cache=cache)
+
+    first = model.invoke("Summarize the findings")
+    second = model.invoke("Summarize the findings")
+
+    assert model.calls == 1
+    assert second.content == first.content
+    assert cache.stats() == {"hits": 1, "misses": 1}
+
+
+def test_failed_results_are_not_cached(database):
+    cache = ResponseCache()
+    cache.update("failed prompt", LLM, [generation("", status="failed")])
+    cache.update("good prompt", LLM, [generation("done")])
+
+    assert cache.lookup("failed prompt", LLM) is None
+    assert cache.lookup("good prompt", LLM)[0].message.content == "done"
+
+
+def test_expired_entries_miss(database):
+    cache = ResponseCache(ttl_seconds=60)
+    cache.update("old prompt", LLM, [generation("stale")])
+    db = SessionLocal()
+    entry = db.get(LLMCacheEntry, cache._key("old prompt", LLM))
+    entry.created_at -= datetime.timedelta(minutes=2)
+    db.commit()
+    db.close()
+
+    assert cache.lookup("old prompt", LLM) is None
+
+
+def test_least_recently_used_entries_are_evicted(database):
+    cache = ResponseCache(max_entries=2)
+    cache.clear()
+    cache.update("a", LLM, [generation("a")])
+    cache.update("b", LLM, [generation("b")])
+    # Reading "a" makes "b" the least recently used
+    cache.lookup("a", LLM)
+    cache.update("c", LLM, [generation("c")])
+
+    assert cache.lookup("b", LLM) is None
+    assert cache.lookup("a", LLM) is not None
+    assert cache.lookup("c", LLM) is not None
@@ -0,0 +1,134 @@
+import asyncio
+import threading
+import time
+import uuid
+
+from todo_agent import crud
+from todo_agent.agents.executor import TaskResult
+from todo_agent.db import get_async_engine
+from todo_agent.repository import SessionRepository
+from todo_agent.scheduler import arun_tasks, run_tasks, task_dependencies
+
+
+class RecordingExecutor:
+    """Executor stand-in recording the context and concurrency of every task."""
+
+    tools = []
+
+    def __init__(self, fail=(), delay: float = 0.05):
+        self.fail = set(fail)
+        self.delay = delay
+        self.previous = {}  # task id -> ids of the steps it received
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def _enter(self):
+        with self._lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+
+    def _leave(self):
+        with self._lock:
+            self.active -= 1
+
+    def _result(self, config, previous_steps):
+        task_id = config["metadata"]["task_id"]
+        self.previous[task_id] = [step["id"] for step in previous_steps]
+        return {
+            "structured_response": TaskResult(
+                task=f"Task {task_id}",
+                status="failed" if task_id in self.fail else "completed",
+                result=f"result {task_id}",
+                reflection="ok",
+            )
+        }
+
+    def execute_step(self, step_description, previous_steps, config, **kwargs):
+        self._enter()
+        time.sleep(self.delay)
+        self._leave()
+        return self._result(config, previous_steps)
+
+    async def aexecute_step(self, step_description, previous_steps, config, **kw):
+        self._enter()
+        await asyncio.sleep(self.delay)
+        self._leave()
+        return self._result(config, previous_steps)
+
+    def delete_checkpoints(self, config):
+        pass
+
+    async def adelete_checkpoints(self, config):
+        pass
+
+
+# 1 and 2 are independent, 3 needs both, 4 needs 3
+PLAN = [
+    {"id": 1, "title": "A", "content": "Do A", "dependencies": []},
+    {"id": 2, "title": "B", "content": "Do B", "dependencies": []},
+    {"id": 3, "title": "C", "content": "Do C", "dependencies": [1, 2]},
+    {"id": 4, "title": "D", "content": "Do D", "dependencies": [3]},
+]
+
+
+def new_session(plan=PLAN) -> str:
+    thread_id = f"scheduler-{uuid.uuid4().hex[:8]}"
+    crud.create_session(thread_id, f"Objective {thread_id}", plan)
+    return thread_id
+
+
+def statuses(thread_id: str):
+    return {
+        task["id"]: task["status"]
+        for task in crud.get_session_by_thread(thread_id)["tasks"]
+    }
+
+
+def test_task_dependencies_default_to_every_earlier_task():
+    assert task_dependencies({"id": 3, "dependencies": None}, [1, 2, 3, 4]) == [1, 2]
+    assert task_dependencies({"id": 3, "dependencies": [9, 3, 1]}, [1, 2, 3]) == [1]
+
+
+def test_run_tasks_follows_dependencies_in_parallel(database):
+    thread_id = new_session()
+    executor = RecordingExecutor()
+
+    with SessionRepository(thread_id) as repo:
+        assert run_tasks(repo, PLAN, executor, [], max_workers=4)
+
+    assert statuses(thread_id) == dict.fromkeys([1, 2, 3, 4], "completed")
+    # Each task receives exactly the results of its dependencies
+    assert executor.previous == {1: [], 2: [], 3: [1, 2], 4: [3]}
+    assert executor.max_active == 2
+
+
+def test_run_tasks_stops_starting_tasks_after_a_failure(database):
+    thread_id = new_session()
+    executor = RecordingExecutor(fail={2})
+
+    with SessionRepository(thread_id) as repo:
+        assert not run_tasks(repo, PLAN, executor, [], max_workers=4)
+
+    assert statuses(thread_id) == {
+        1: "completed",
+        2: "failed",
+        3: "pending",
+        4: "pending",
+    }
+
+
+def test_arun_tasks_matches_the_sync_scheduler(database):
+    thread_id = new_session()
+    executor = RecordingExecutor()
+
+    async def run():
+        try:
+            return await arun_tasks(thread_id, PLAN, executor, [], max_workers=4)
+        finally:
+            await get_async_engine().dispose()
+
+    assert asyncio.run(run())
+    assert statuses(thread_id) == dict.fromkeys([1, 2, 3, 4], "completed")
+    assert executor.previous == {1: [], 2: [], 3: [1, 2], 4: [3]}
+    assert executor.max_active == 2
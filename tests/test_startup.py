@@ -0,0 +1,28 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+# Run in a fresh interpreter: the test session itself imports LangChain
+_CHECK = """
+import sys
+import {module}
+loaded = sorted(m for m in sys.modules if m.split(".")[0].startswith("langchain"))
+assert not loaded, loaded
+"""
+
+
+@pytest.mark.parametrize(
+    "module",
+    ["todo_agent.main", "todo_agent.session_manager", "todo_agent.scheduler"],
+)
+def test_startup_imports_no_langchain(module):
+    """The CLI entry points only load LangChain once an agent is built."""
+    result = subprocess.run(
+        [sys.executable, "-c", _CHECK.format(module=module)],
+        capture_output=True,
+        text=True,
+        env=os.environ.copy(),
+    )
+    assert result.returncode == 0, result.stderr
@@ -0,0 +1,91 @@
+import asyncio
+import threading
+import time
+
+from todo_agent.tools.cache import (
+    ToolCache,
+    normalize_extract_args,
+    normalize_search_args,
+    normalize_url,
+)
+
+
+def test_equivalent_requests_share_a_key():
+    assert normalize_url("HTTPS://Example.com:443/a/?b=2&utm_source=x&a=1#top") == (
+        "https://example.com/a?a=1&b=2"
+    )
+    assert ToolCache.key(
+        "search", normalize_search_args({"query": "  Rome   HOTELS"})
+    ) == ToolCache.key("search", normalize_search_args({"query": "rome hotels"}))
+    assert normalize_extract_args(
+        {"urls": ["https://a.com/", "https://A.com", "https://b.com"]}
+    ) == {"urls": ["https://a.com/", "https://b.com/"]}
+
+
+def test_results_are_reused_within_their_ttl(tmp_path):
+    cache = ToolCache(str(tmp_path / "tools.db"))
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return {"results": ["page"]}
+
+    assert cache.call("k", 60, fetch) == {"results": ["page"]}
+    assert cache.call("k", 60, fetch) == {"results": ["page"]}
+    assert len(calls) == 1
+    # An expired entry is fetched again
+    assert cache.call("k", -1, fetch) == {"results": ["page"]}
+    assert len(calls) == 2
+
+
+def test_errors_are_not_cached(tmp_path):
+    cache = ToolCache(str(tmp_path / "tools.db"))
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return {"error": "rate limited"}
+
+    cache.call("k", 60, fetch)
+    cache.call("k", 60, fetch)
+
+    assert len(calls) == 2
+
+
+def test_concurrent_identical_calls_are_coalesced(tmp_path):
+    cache = ToolCache(str(tmp_path / "tools.db"))
+    calls = []
+    results = []
+
+    def fetch():
+        calls.append(1)
+        time.sleep(0.2)
+        return {"results": ["page"]}
+
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.call("k", 60, fetch)))
+        for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == [{"results": ["page"]}] * 5
+
+
+def test_concurrent_identical_async_calls_are_coalesced(tmp_path):
+    cache = ToolCache(str(tmp_path / "tools.db"))
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.1)
+        return {"results": ["page"]}
+
+    async def run():
+        return await asyncio.gather(*[cache.acall("k", 60, fetch) for _ in range(5)])
+
+    assert asyncio.run(run()) == [{"results": ["page"]}] * 5
+    assert len(calls) == 1
@@ -1,12 +1,24 @@
-from typing import Dict, List, Literal
+import threading
+import time
+from typing import Awaitable, Callable, Dict, List, Literal, Optional, Tuple
 
 from langchain.agents import create_agent
-from langchain.agents.middleware import ModelCallLimitMiddleware
+from langchain.agents.middleware import AgentMiddleware, ModelCallLimitMiddleware
 from langchain.tools import BaseTool
+from langchain_core.language_models import BaseChatModel
 from langchain_openai import ChatOpenAI
+from langgraph.checkpoint.base import BaseCheckpointSaver
 from pydantic import BaseModel, Field
 
+from todo_agent.cancellation import check_cancelled
+from todo_agent.compaction import ToolOutputCompactionMiddleware
 from todo_agent.config import settings
+from todo_agent.context import estimate_tokens, format_step
+from todo_agent.llm_cache import model_cache
+from todo_agent.metrics import span, timed, with_metrics
+from todo_agent.prefetch import format_prefetched
+from todo_agent.rate_limit import ModelRateLimiter, RateLimitMiddleware
+from todo_agent.streaming import StepProgress, format_partial, printer
 
 
 class TaskResult(BaseModel):
@@ -18,35 +30,387 @@ class TaskResult(BaseModel):
     reflection: str = Field(description="One-line insight, lesson learned,")
 
 
+# Words of tasks that reason over or write up material rather than look it up
+COMPLEX_MARKERS = (
+    "analy",
+    "assess",
+    "compar",
+    "critique",
+    "design",
+    "draft",
+    "evaluat",
+    "recommend",
+    "report",
+    "synthes",
+    "write",
+)
+
+
+def classify_task(step_description: str, n_dependencies: int) -> str:
+    """
+    Guess whether a task needs the escalation model, without a model call.
+
+    A task is "complex" when it combines the results of several earlier tasks,
+    has a long description, or asks for analysis or writing; anything else
+    (lookups, extraction) is "simple".
+    """
+    if n_dependencies >= settings.routing_complex_min_dependencies:
+        return "complex"
+    if estimate_tokens(step_description) >= settings.routing_complex_min_tokens:
+        return "complex"
+    text = step_description.lower()
+    if any(marker in text for marker in COMPLEX_MARKERS):
+        return "complex"
+    return "simple"
+
+
+def needs_escalation(result) -> bool:
+    """An attempt failed: an error string, no structured result, or status failed."""
+    if not isinstance(result, dict) or "structured_response" not in result:
+        return True
+    return result["structured_response"].status == "failed"
+
+
+class CancellationMiddleware(AgentMiddleware):
+    """
+    Stops an agent between steps once its run is cancelled (see cancellation).
+
+    Threads can't be interrupted, so a task running on a pool thread checks
+    before each model and tool call instead; the agent state is checkpointed
+    up to there, and a resume continues from it. Asyncio tasks are cancelled
+    directly and never bind an event.
+    """
+
+    def wrap_model_call(self, request, handler):
+        check_cancelled()
+        return handler(request)
+
+    async def awrap_model_call(self, request, handler):
+        check_cancelled()
+        return await handler(request)
+
+    def wrap_tool_call(self, request, handler):
+        check_cancelled()
+        return handler(request)
+
+    async def awrap_tool_call(self, request, handler):
+        check_cancelled()
+        return await handler(request)
+
+
 class Executor:
-    def __init__(self, tools: List[BaseTool], model: str = "gpt-3.5-turbo"):
-        self.llm = ChatOpenAI(
-            model=model, temperature=0, api_key=settings.openai_api_key
-        )
+    def __init__(
+        self,
+        tools: List[BaseTool],
+        model: str = "gpt-3.5-turbo",
+        cache: Optional[bool] = None,
+        llm: Optional[BaseChatModel] = None,
+        stream: Optional[bool] = None,
+        checkpointer: Optional[BaseCheckpointSaver] = None,
+        escalation_model: Optional[str] = None,
+        escalation_llm: Optional[BaseChatModel] = None,
+    ):
+        """
+        Args:
+            tools: Tools available to the agent
+            model: Model every task is sent to first
+            cache: Force the LLM response cache on/off (None follows settings)
+            llm: Chat model replacing ChatOpenAI(model) (e.g. a benchmark stub)
+            stream: Force streaming execution on/off (None follows settings)
+            checkpointer: Saves the agent state after every step
+            escalation_model: Larger model for complex tasks and for retrying
+                tasks the first model failed; None disables routing
+            escalation_llm: Chat model replacing ChatOpenAI(escalation_model)
+        """
+        self.cache = cache
+        # An injected chat model (e.g. a benchmark stub) replaces ChatOpenAI
+        self.llm = llm or self._chat_model(model)
         self.tools = tools
+        # Stream tokens/tool events and save partial output while a step runs
+        self.stream = settings.stream_execution if stream is None else stream
+        # Saves the agent state after every step, so interrupted tasks can resume
+        self.checkpointer = checkpointer
 
         self.system_msg = """You are a helpful AI assistant that executes tasks step by step.
 Use the available tools to complete the given task.
+When you need the content of several web pages, pass all of their URLs to the web_scraper tool in a single call.
 Be concise and focus on getting actionable results. Provide direct answers only. Do not ask follow-up questions or request additional information."""
 
-        self.agent = create_agent(
-            model=self.llm,
+        # Shared by both routes, so its token counts cover every attempt
+        self.compaction = (
+            ToolOutputCompactionMiddleware()
+            if settings.tool_output_compaction
+            else None
+        )
+        self.agent = self._create_agent(self.llm, rate_limited=llm is None)
+        # Routes: "fast" takes every task by default, "strong" the escalations
+        self.models = {"fast": self._model_name(self.llm)}
+        self.agents = {"fast": self.agent}
+        if escalation_llm is not None or escalation_model:
+            escalation = escalation_llm or self._chat_model(escalation_model)
+            self.models["strong"] = self._model_name(escalation)
+            self.agents["strong"] = self._create_agent(
+                escalation, rate_limited=escalation_llm is None
+            )
+        self._stats_lock = threading.Lock()
+        self._route_stats = {
+            route: {"attempts": 0, "failures": 0, "total_ms": 0.0}
+            for route in self.agents
+        }
+        self.escalations = 0
+
+    def _chat_model(self, model: str) -> BaseChatModel:
+        return ChatOpenAI(
+            model=model,
+            temperature=0,
+            api_key=settings.openai_api_key,
+            cache=model_cache(self.cache),
+            # Quota is taken on cache misses only; retries go through
+            # RateLimitMiddleware
+            rate_limiter=ModelRateLimiter("openai", model),
+            max_retries=0,
+        )
+
+    @staticmethod
+    def _model_name(llm: BaseChatModel) -> str:
+        return getattr(llm, "model_name", None) or type(llm).__name__
+
+    def _create_agent(self, llm: BaseChatModel, rate_limited: bool):
+        return create_agent(
+            model=llm,
             tools=self.tools,
             middleware=[
+                # Stop at the next step once the run is cancelled (Ctrl-C)
+                CancellationMiddleware(),
                 ModelCallLimitMiddleware(
                     run_limit=15,
                     exit_behavior="error",
                 ),
+                # Compact before the limiter counts the request's tokens
+                *([self.compaction] if self.compaction else []),
+                # Only OpenAI calls count against the quota of their model
+                *(
+                    [RateLimitMiddleware("openai", self._model_name(llm))]
+                    if rate_limited
+                    else []
+                ),
             ],
             response_format=TaskResult,
             system_prompt=self.system_msg,
+            checkpointer=self.checkpointer,
         )
 
+    def first_route(
+        self, step_description: str, n_dependencies: int, complexity: Optional[str]
+    ) -> Tuple[str, str]:
+        """
+        Pick the route a task starts on.
+
+        The planner's complexity hint wins; tasks without one are classified
+        by classify_task.
+
+        Returns:
+            Tuple of the route ("fast" or "strong") and the reason for it
+        """
+        if "strong" not in self.agents:
+            return "fast", "default"
+        if complexity is None:
+            complexity = classify_task(step_description, n_dependencies)
+            reason = "classifier"
+        else:
+            reason = "planner"
+        return ("strong", reason) if complexity == "complex" else ("fast", "default")
+
+    def _report_escalation(self, config):
+        task_id = (config.get("metadata") or {}).get("task_id")
+        print(f"\n⬆️  Task #{task_id}: escalating to {self.models['strong']}")
+
+    @staticmethod
+    def _route_config(config, route: str) -> Dict:
+        """Escalated attempts checkpoint to their own executor thread."""
+        if route == "fast" or "configurable" not in config:
+            return config
+        configurable = dict(config["configurable"])
+        configurable["thread_id"] = f"{configurable['thread_id']}-{route}"
+        return {**config, "configurable": configurable}
+
+    def _record(self, route: str, elapsed_ms: float, failed: bool, escalated: bool):
+        with self._stats_lock:
+            stats = self._route_stats[route]
+            stats["attempts"] += 1
+            stats["failures"] += failed
+            stats["total_ms"] += elapsed_ms
+            self.escalations += escalated
+
+    def route_stats(self) -> Dict[str, Dict]:
+        """
+        Attempts, failures and latency per route since the executor was built.
+
+        Returns:
+            Dict keyed by route with its model, attempts, failures and mean
+            latency in ms; token cost per route is in the metrics report
+        """
+        with self._stats_lock:
+            return {
+                route: {
+                    "model": self.models[route],
+                    "attempts": stats["attempts"],
+                    "failures": stats["failures"],
+                    "mean_ms": stats["total_ms"] / stats["attempts"]
+                    if stats["attempts"]
+                    else 0.0,
+                }
+                for route, stats in self._route_stats.items()
+            }
+
+    def build_input(
+        self,
+        step_description: str,
+        previous_steps: List[Dict],
+        partial: Optional[Dict] = None,
+        prefetched: Optional[List[Dict]] = None,
+    ) -> str:
+        """Build the user message for a step from the previous steps' results.
+
+        A partial result saved by an interrupted streamed attempt and search
+        results prefetched while earlier tasks ran are included, so their tool
+        results are reused instead of fetched again.
+        """
+        if prefetched:
+            step_description = f"{format_prefetched(prefetched)}{step_description}"
+        if partial:
+            step_description = f"{format_partial(partial)}{step_description}"
+        if previous_steps:
+            # Entries from ContextStore arrive pre-rendered
+            context = "".join(
+                step.get("text") or format_step(step) for step in previous_steps
+            )
+            input_text = (
+                "Context from previous steps:\n"
+                f"{context}"
+                f"Current task to execute: {step_description}"
+            )
+        else:
+            input_text = f"Task to execute: {step_description}"
+        return input_text
+
+    def _start(self, agent, messages: Dict, config, resume: bool):
+        """
+        Decide how to start a step given its checkpointed state.
+
+        Returns:
+            Tuple of the agent input (None to continue from the last
+            checkpoint) and the finished state, if the checkpointed run had
+            already produced its result
+        """
+        if not self.checkpointer:
+            return messages, None
+        if resume:
+            state = agent.get_state(config)
+            if state.next:
+                # Interrupted mid-run: continue after the last completed step
+                return None, None
+            if "structured_response" in state.values:
+                # Finished, but the result was never stored
+                return None, state.values
+        # A fresh attempt starts from an empty conversation
+        self.checkpointer.delete_thread(config["configurable"]["thread_id"])
+        return messages, None
+
+    async def _astart(self, agent, messages: Dict, config, resume: bool):
+        """Async version of _start."""
+        if not self.checkpointer:
+            return messages, None
+        if resume:
+            state = await agent.aget_state(config)
+            if state.next:
+                return None, None
+            if "structured_response" in state.values:
+                return None, state.values
+        await self.checkpointer.adelete_thread(config["configurable"]["thread_id"])
+        return messages, None
+
+    def _checkpoint_threads(self, config) -> List[str]:
+        # Both routes: a task may have escalated in an earlier run
+        return [
+            self._route_config(config, route)["configurable"]["thread_id"]
+            for route in ("fast", "strong")
+        ]
+
+    def delete_checkpoints(self, config):
+        """
+        Delete a task's checkpoints, escalation thread included.
+
+        Called once the task's completed or failed status is stored: a resume
+        no longer needs them, and a retry starts from a fresh thread anyway.
+        """
+        if not self.checkpointer:
+            return
+        for checkpoint_thread in self._checkpoint_threads(config):
+            self.checkpointer.delete_thread(checkpoint_thread)
+
+    async def adelete_checkpoints(self, config):
+        """Async version of delete_checkpoints."""
+        if not self.checkpointer:
+            return
+        for checkpoint_thread in self._checkpoint_threads(config):
+            await self.checkpointer.adelete_thread(checkpoint_thread)
+
+    def _stream(self, agent, agent_input: Optional[Dict], config, on_progress) -> Dict:
+        """Run the agent with stream(), printing and saving progress as it goes."""
+        task_id = (config.get("metadata") or {}).get("task_id")
+        progress = StepProgress([tool.name for tool in self.tools])
+        result = None
+        for mode, payload in agent.stream(
+            agent_input, config, stream_mode=["messages", "values"]
+        ):
+            if mode == "messages":
+                printer.token(task_id, progress.add_token(payload[0]))
+            else:
+                result = payload
+                printer.events(task_id, progress.add_state(payload))
+            if on_progress and progress.due():
+                on_progress(progress.snapshot())
+        return result
+
+    async def _astream(
+        self, agent, agent_input: Optional[Dict], config, on_progress
+    ) -> Dict:
+        """Async version of _stream; on_progress is awaited."""
+        task_id = (config.get("metadata") or {}).get("task_id")
+        progress = StepProgress([tool.name for tool in self.tools])
+        result = None
+        async for mode, payload in agent.astream(
+            agent_input, config, stream_mode=["messages", "values"]
+        ):
+            if mode == "messages":
+                printer.token(task_id, progress.add_token(payload[0]))
+            else:
+                result = payload
+                printer.events(task_id, progress.add_state(payload))
+            if on_progress and progress.due():
+                await on_progress(progress.snapshot())
+        return result
+
+    @timed()
     def execute_step(
-        self, step_description: str, previous_steps: List[Dict], config
+        self,
+        step_description: str,
+        previous_steps: List[Dict],
+        config,
+        partial: Optional[Dict] = None,
+        resume: bool = False,
+        on_progress: Optional[Callable[[Dict], None]] = None,
+        complexity: Optional[str] = None,
+        prefetched: Optional[List[Dict]] = None,
+        n_dependencies: Optional[int] = None,
     ) -> Dict:
         """Execute a single step with context from previous steps.
 
+        The step starts on the fast model unless the planner's hint or the
+        classifier marks it complex; a failed, invalid or errored attempt on
+        the fast model is retried once on the escalation model.
+
         Args:
             step_description: The current task to execute
             previous_steps: List of completed steps with format:
@@ -60,25 +424,125 @@ Be concise and focus on getting actionable results. Provide direct answers only.
                     ...
                 ]
             config: LangGraph configuration dictionary with thread_id
+            partial: Partial result saved by an interrupted earlier attempt
+            resume: The task was interrupted; continue from its checkpoint if
+                there is one
+            on_progress: Called with a partial result snapshot from time to
+                time while streaming
+            complexity: Planner hint, "simple" or "complex" (None to classify)
+            prefetched: Search results gathered for the step in advance
+            n_dependencies: Number of tasks the step depends on, for routing
+                (defaults to len(previous_steps))
 
         Returns:
             Dict containing the agent's response with structured_response field
         """
-        # Build context from previous steps
-        if previous_steps:
-            input_text = "Context from previous steps:\n"
-            for step in previous_steps:
-                input_text += f"Step #{step['id']}: {step['title']}\n"
-                input_text += f"Description: {step['description']}\n"
-                input_text += f"Result: {step['result']}\n\n"
-            input_text += f"Current task to execute: {step_description}"
-            # input_text = f"Context from previous steps:\n{context}\n\nCurrent task: {step_description}"
-        else:
-            input_text = f"Task to execute: {step_description}"
-        try:
-            messages = {"messages": [{"role": "user", "content": input_text}]}
-            result = self.agent.invoke(messages, config)
-            return result
+        input_text = self.build_input(
+            step_description, previous_steps, partial, prefetched
+        )
+        messages = {"messages": [{"role": "user", "content": input_text}]}
+        config = with_metrics(config)
+        if n_dependencies is None:
+            n_dependencies = len(previous_steps)
+        route, reason = self.first_route(step_description, n_dependencies, complexity)
+        result = self._attempt(route, reason, messages, config, resume, on_progress)
+        if route == "fast" and "strong" in self.agents and needs_escalation(result):
+            self._report_escalation(config)
+            result = self._attempt(
+                "strong", "escalation", messages, config, resume, on_progress
+            )
+        return result
 
-        except Exception as e:
-            return f"Error executing step: {str(e)}"
+    def _attempt(
+        self, route: str, reason: str, messages: Dict, config, resume: bool, on_progress
+    ):
+        """Run the step on one route, recording it as an Executor.route span."""
+        agent = self.agents[route]
+        config = self._route_config(config, route)
+        start = time.perf_counter()
+        with span(
+            "Executor.route", route=route, model=self.models[route], reason=reason
+        ) as attributes:
+            try:
+                agent_input, finished = self._start(agent, messages, config, resume)
+                if finished:
+                    result = finished
+                elif self.stream:
+                    result = self._stream(agent, agent_input, config, on_progress)
+                else:
+                    result = agent.invoke(agent_input, config)
+            except Exception as e:
+                result = f"Error executing step: {str(e)}"
+            attributes["failed"] = needs_escalation(result)
+        self._record(
+            route,
+            (time.perf_counter() - start) * 1000,
+            attributes["failed"],
+            reason == "escalation",
+        )
+        return result
+
+    @timed()
+    async def aexecute_step(
+        self,
+        step_description: str,
+        previous_steps: List[Dict],
+        config,
+        partial: Optional[Dict] = None,
+        resume: bool = False,
+        on_progress: Optional[Callable[[Dict], Awaitable[None]]] = None,
+        complexity: Optional[str] = None,
+        prefetched: Optional[List[Dict]] = None,
+        n_dependencies: Optional[int] = None,
+    ) -> Dict:
+        """Async version of execute_step, built on the agent's ainvoke/astream."""
+        input_text = self.build_input(
+            step_description, previous_steps, partial, prefetched
+        )
+        messages = {"messages": [{"role": "user", "content": input_text}]}
+        config = with_metrics(config)
+        if n_dependencies is None:
+            n_dependencies = len(previous_steps)
+        route, reason = self.first_route(step_description, n_dependencies, complexity)
+        result = await self._aattempt(
+            route, reason, messages, config, resume, on_progress
+        )
+        if route == "fast" and "strong" in self.agents and needs_escalation(result):
+            self._report_escalation(config)
+            result = await self._aattempt(
+                "strong", "escalation", messages, config, resume, on_progress
+            )
+        return result
+
+    async def _aattempt(
+        self, route: str, reason: str, messages: Dict, config, resume: bool, on_progress
+    ):
+        """Async version of _attempt."""
+        agent = self.agents[route]
+        config = self._route_config(config, route)
+        start = time.perf_counter()
+        with span(
+            "Executor.route", route=route, model=self.models[route], reason=reason
+        ) as attributes:
+            try:
+                agent_input, finished = await self._astart(
+                    agent, messages, config, resume
+                )
+                if finished:
+                    result = finished
+                elif self.stream:
+                    result = await self._astream(
+                        agent, agent_input, config, on_progress
+                    )
+                else:
+                    result = await agent.ainvoke(agent_input, config)
+            except Exception as e:
+                result = f"Error executing step: {str(e)}"
+            attributes["failed"] = needs_escalation(result)
+        self._record(
+            route,
+            (time.perf_counter() - start) * 1000,
+            attributes["failed"],
+            reason == "escalation",
+        )
+        return result
@@ -2,16 +2,35 @@ from typing import List, Literal, Optional
 
 from langchain.agents import create_agent
 from langchain.agents.middleware import TodoListMiddleware
+from langchain_core.language_models import BaseChatModel
 from langchain_openai import ChatOpenAI
-from pydantic import BaseModel
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from pydantic import BaseModel, Field
 
 from todo_agent.config import settings
+from todo_agent.llm_cache import model_cache
+from todo_agent.metrics import timed, with_metrics
+from todo_agent.rate_limit import ModelRateLimiter, RateLimitMiddleware
 
 
 class Task(BaseModel):
     id: int
     title: str
     content: str
+    dependencies: List[int] = Field(
+        default_factory=list,
+        description="Ids of earlier tasks whose results this task needs",
+    )
+    complexity: Optional[Literal["simple", "complex"]] = Field(
+        default=None,
+        description="complex if the step needs reasoning over several sources "
+        "or long-form writing, simple for lookups and extraction",
+    )
+    items: List[str] = Field(
+        default_factory=list,
+        description="For a map step: the items its content is applied to, "
+        "each run as a separate parallel subtask",
+    )
     status: Literal["pending", "in_progress", "completed", "failed"] = "pending"
     result: Optional[str] = None
     reflection: Optional[str] = None
@@ -22,12 +41,34 @@ class TodoList(BaseModel):
 
 
 class Planner:
-    def __init__(self, model: str = "gpt-4"):
-        self.llm = ChatOpenAI(
-            model=model, temperature=0, api_key=settings.openai_api_key
+    def __init__(
+        self,
+        model: str = "gpt-4",
+        cache: Optional[bool] = None,
+        llm: Optional[BaseChatModel] = None,
+        checkpointer: Optional[BaseCheckpointSaver] = None,
+    ):
+        # An injected chat model (e.g. a benchmark stub) replaces ChatOpenAI
+        self.llm = llm or ChatOpenAI(
+            model=model,
+            temperature=0,
+            api_key=settings.openai_api_key,
+            cache=model_cache(cache),
+            # Quota is taken on cache misses only; retries go through
+            # RateLimitMiddleware
+            rate_limiter=ModelRateLimiter("openai", model),
+            max_retries=0,
+        )
+        # Only OpenAI calls count against the OpenAI quota
+        middleware = [RateLimitMiddleware("openai", model)] if llm is None else []
+        map_reduce = (
+            """
+5. When a step applies the same work to every item of a known list (vendors, cities, papers...), make it a single map step: write the content for one item and list the items in items. Each item runs as its own subtask, in parallel. Add a reduce step that depends on the map step and merges the per-item results. Leave items empty for every other step."""
+            if settings.map_reduce_planning
+            else ""
         )
 
-        self.system_msg = """You are an expert planner. Break down the user's objective into clear, sequential steps.
+        self.system_msg = f"""You are an expert planner. Break down the user's objective into clear, ordered steps.
 Each step should be actionable and specific. Do not add any superfluous steps. The result of the final step should be the final answer.
 Before finalizing your plan, reflect on whether the steps are necessary, logical, and sufficient to achieve the objective.
 
@@ -35,8 +76,10 @@ CRITICAL: The FINAL task must directly produce the complete deliverable requeste
 
 Your task:
 1. Convert it into a structured TODO list (JSON).
-2. Use fields: id, title, content, status.
-3. Do NOT execute the tasks.
+2. Use fields: id, title, content, dependencies, complexity, items, status.
+3. In dependencies, list the ids of the earlier tasks whose results the step needs. Leave it empty if the step can be done on its own, so independent steps can run in parallel.
+4. Set complexity to "simple" for lookups and fact extraction, and to "complex" for steps that analyze, compare or combine several results or write the final deliverable. Simple steps run on a faster, cheaper model.{map_reduce}
+{6 if map_reduce else 5}. Do NOT execute the tasks.
 
 Do not include any other text or explanations."""
 
@@ -44,11 +87,41 @@ Do not include any other text or explanations."""
             model=self.llm,
             response_format=TodoList,
             # middleware=[TodoListMiddleware()],
+            middleware=middleware,
             system_prompt=self.system_msg,
+            checkpointer=checkpointer,
         )
+        self.checkpointer = checkpointer
 
+    @timed()
     def create_todo_list(self, objective: str, config) -> TodoList:
-        """Create a plan for the given objective"""
+        """Create a plan for the given objective
+
+        With a checkpointer, a plan already produced on this planner thread
+        (e.g. before a crash, with nothing stored yet) is returned as is, and an
+        interrupted planning run continues from its last step.
+        """
+        config = with_metrics(config)
+        if self.checkpointer:
+            state = self.agent.get_state(config)
+            if state.next:
+                return self.agent.invoke(None, config)
+            if "structured_response" in state.values:
+                return state.values
         messages = {"messages": [{"role": "user", "content": objective}]}
         result = self.agent.invoke(messages, config)
         return result
+
+    @timed()
+    async def acreate_todo_list(self, objective: str, config) -> TodoList:
+        """Async version of create_todo_list, built on the agent's ainvoke"""
+        config = with_metrics(config)
+        if self.checkpointer:
+            state = await self.agent.aget_state(config)
+            if state.next:
+                return await self.agent.ainvoke(None, config)
+            if "structured_response" in state.values:
+                return state.values
+        messages = {"messages": [{"role": "user", "content": objective}]}
+        result = await self.agent.ainvoke(messages, config)
+        return result
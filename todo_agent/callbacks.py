@@ -0,0 +1,127 @@
+import datetime
+import threading
+import time
+import uuid
+from typing import Dict, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from todo_agent.metrics import _span_id, _task_id, _thread_id, recorder
+
+
+def _model_name(kwargs: Dict) -> Optional[str]:
+    params = kwargs.get("invocation_params") or {}
+    metadata = kwargs.get("metadata") or {}
+    return (
+        params.get("model") or params.get("model_name") or metadata.get("ls_model_name")
+    )
+
+
+def _token_usage(response) -> Dict[str, int]:
+    """Token counts of an LLM result; empty when it was served from the cache."""
+    if not response.llm_output:
+        # Cached results are returned without provider output
+        return {}
+    usage = response.llm_output.get("token_usage") or {}
+    if usage:
+        return {
+            "input_tokens": usage.get("prompt_tokens", 0),
+            "output_tokens": usage.get("completion_tokens", 0),
+        }
+    for generations in response.generations:
+        for generation in generations:
+            message = getattr(generation, "message", None)
+            metadata = getattr(message, "usage_metadata", None)
+            if metadata:
+                return {
+                    "input_tokens": metadata.get("input_tokens", 0),
+                    "output_tokens": metadata.get("output_tokens", 0),
+                }
+    return {}
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """
+    Records LLM calls (latency, model, tokens) and tool calls (latency) as spans.
+
+    Attach it through the run config (see with_metrics) so it propagates to the
+    chat model and every tool the agent calls. Session/task attribution is
+    taken from the context at the time the run starts.
+    """
+
+    def __init__(self):
+        self._runs: Dict[uuid.UUID, Dict] = {}
+        self._lock = threading.Lock()
+
+    def _start(self, run_id, parent_run_id, name: str, kind: str, **extra):
+        with self._lock:
+            # Nest under the parent run only if it is recorded too (a tool
+            # calling a tool); agent graph nodes are not, so fall back to the
+            # enclosing span
+            if parent_run_id in self._runs:
+                parent_id = parent_run_id.hex
+            else:
+                parent_id = _span_id.get()
+            self._runs[run_id] = {
+                "name": name,
+                "kind": kind,
+                "started_at": datetime.datetime.now(),
+                "start": time.perf_counter(),
+                "parent_id": parent_id,
+                "thread_id": _thread_id.get(),
+                "task_id": _task_id.get(),
+                **extra,
+            }
+
+    def _end(self, run_id, status: str = "ok", **fields):
+        with self._lock:
+            run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        recorder.record(
+            run["name"],
+            run["kind"],
+            run["started_at"],
+            (time.perf_counter() - run["start"]) * 1000,
+            status=status,
+            span_id=run_id.hex,
+            parent_id=run["parent_id"],
+            thread_id=run["thread_id"],
+            task_id=run["task_id"],
+            model=fields.pop("model", None) or run.get("model"),
+            **fields,
+        )
+
+    def on_chat_model_start(
+        self, serialized, messages, *, run_id, parent_run_id=None, **kwargs
+    ):
+        self._start(run_id, parent_run_id, "llm", "llm", model=_model_name(kwargs))
+
+    def on_llm_start(
+        self, serialized, prompts, *, run_id, parent_run_id=None, **kwargs
+    ):
+        self._start(run_id, parent_run_id, "llm", "llm", model=_model_name(kwargs))
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        usage = _token_usage(response)
+        self._end(
+            run_id,
+            model=(response.llm_output or {}).get("model_name"),
+            attributes={"cached": not usage},
+            **usage,
+        )
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, status="error", attributes={"error": str(error)})
+
+    def on_tool_start(
+        self, serialized, input_str, *, run_id, parent_run_id=None, **kwargs
+    ):
+        name = (serialized or {}).get("name") or kwargs.get("name") or "tool"
+        self._start(run_id, parent_run_id, f"tool.{name}", "tool")
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, status="error", attributes={"error": str(error)})
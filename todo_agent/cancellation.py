@@ -0,0 +1,39 @@
+import contextvars
+import threading
+from contextlib import contextmanager
+from typing import Optional
+
+_cancel_event: contextvars.ContextVar[Optional[threading.Event]] = (
+    contextvars.ContextVar("cancel_event", default=None)
+)
+
+
+class TaskCancelled(BaseException):
+    """
+    Raised at the next step boundary of a task whose run was cancelled.
+
+    A BaseException like KeyboardInterrupt, so the executor doesn't record it
+    as a failed attempt and escalate the task.
+    """
+
+
+@contextmanager
+def cancellable(event: threading.Event):
+    """
+    Let the agents run in this context stop once event is set.
+
+    Copies of the context made inside the block (e.g. for a thread pool
+    task) keep the event.
+    """
+    token = _cancel_event.set(event)
+    try:
+        yield
+    finally:
+        _cancel_event.reset(token)
+
+
+def check_cancelled():
+    """Raise TaskCancelled if the run of the current context was cancelled."""
+    event = _cancel_event.get()
+    if event is not None and event.is_set():
+        raise TaskCancelled()
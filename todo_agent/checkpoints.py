@@ -0,0 +1,158 @@
+import argparse
+import asyncio
+import re
+import sqlite3
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from langgraph.checkpoint.base import (
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+)
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+from todo_agent.config import settings
+from todo_agent.crud import get_finished_thread_ids
+
+# Checkpoint threads of a session: planner-<thread_id>[-v<plan version>] and
+# executor-<thread_id>-<task_id>[-strong]
+_SESSION_THREAD = re.compile(
+    r"planner-(?P<planner>.+?)(?:-v\d+)?|executor-(?P<executor>.+)-\d+(?:-strong)?"
+)
+
+
+class SqliteCheckpointer(SqliteSaver):
+    """
+    SQLite checkpoint saver usable from both the sync and the async agent APIs.
+
+    SqliteSaver only implements the sync methods, and AsyncSqliteSaver has to
+    be created inside a running event loop. The agents are compiled once and
+    used from both paths, so the async methods here run the sync ones in a
+    worker thread (the saver serializes access with its own lock).
+    """
+
+    async def aget_tuple(self, config: Dict) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[Dict],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[Dict] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        checkpoints = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for checkpoint in checkpoints:
+            yield checkpoint
+
+    async def aput(
+        self,
+        config: Dict,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> Dict:
+        return await asyncio.to_thread(
+            self.put, config, checkpoint, metadata, new_versions
+        )
+
+    async def aput_writes(
+        self,
+        config: Dict,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ):
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str):
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+    def thread_ids(self) -> List[str]:
+        """Ids of every thread with a stored checkpoint."""
+        with self.cursor(transaction=False) as cur:
+            cur.execute("SELECT DISTINCT thread_id FROM checkpoints")
+            return [row[0] for row in cur.fetchall()]
+
+    def vacuum(self):
+        """Give the space of deleted checkpoints back to the file system."""
+        with self.lock:
+            self.conn.execute("VACUUM")
+
+
+_checkpointer: Optional[SqliteCheckpointer] = None
+
+
+def get_checkpointer() -> Optional[SqliteCheckpointer]:
+    """
+    Process-wide checkpointer for the planner and executor graphs.
+
+    Returns:
+        The shared saver on settings.checkpoint_db_path, or None when
+        checkpointing is disabled
+    """
+    global _checkpointer
+    if not settings.checkpoint_enabled:
+        return None
+    if _checkpointer is None:
+        conn = sqlite3.connect(settings.checkpoint_db_path, check_same_thread=False)
+        # Readers don't block the writer while parallel tasks checkpoint
+        conn.execute("PRAGMA journal_mode=WAL")
+        _checkpointer = SqliteCheckpointer(conn)
+    return _checkpointer
+
+
+def session_of(checkpoint_thread: str) -> Optional[str]:
+    """Session thread id of a planner or executor checkpoint thread, if any."""
+    match = _SESSION_THREAD.fullmatch(checkpoint_thread)
+    if match is None:
+        return None
+    return match.group("planner") or match.group("executor")
+
+
+def purge_sessions(checkpointer: SqliteCheckpointer, thread_ids: Iterable[str]) -> int:
+    """
+    Delete every planner and executor checkpoint of the given sessions.
+
+    The scheduler deletes a task's checkpoints once its outcome is stored;
+    this cleans up sessions that finished before that, and planner threads.
+
+    Returns:
+        Number of checkpoint threads deleted
+    """
+    sessions = set(thread_ids)
+    deleted = 0
+    for checkpoint_thread in checkpointer.thread_ids():
+        if session_of(checkpoint_thread) in sessions:
+            checkpointer.delete_thread(checkpoint_thread)
+            deleted += 1
+    return deleted
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Delete the agent checkpoints of finished sessions."
+    )
+    parser.add_argument(
+        "--no-vacuum",
+        action="store_true",
+        help="Keep the freed pages in the file instead of shrinking it",
+    )
+    args = parser.parse_args(argv)
+
+    checkpointer = get_checkpointer()
+    if checkpointer is None:
+        print("Checkpointing is disabled (CHECKPOINT_ENABLED=false)")
+        return
+    deleted = purge_sessions(checkpointer, get_finished_thread_ids())
+    if deleted and not args.no_vacuum:
+        checkpointer.vacuum()
+    print(f"🧹 Deleted {deleted} checkpoint threads of finished sessions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+import json
+import re
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+
+from langchain.agents.middleware import AgentMiddleware
+from langchain_core.messages import AIMessage, AnyMessage, ToolMessage
+
+from todo_agent import metrics
+from todo_agent.config import settings
+from todo_agent.context import CHARS_PER_TOKEN, estimate_tokens, truncate
+
+GAP_MARKER = " … "
+SUPERSEDED = "[Superseded by a later {tool} call; its result follows below]"
+SEARCH_TOOL = "tavily_search"
+# Tools whose results hold the full text of the pages they were given
+EXTRACT_TOOLS = ("web_scraper", "tavily_extract")
+# String fields shorter than this are kept whole when a JSON output is compacted
+MIN_FIELD_CHARS = 200
+
+_SENTENCE = re.compile(r"(?<=[.!?])\s+|\n+")
+_WORD = re.compile(r"\w{3,}")
+_STOPWORDS = frozenset(
+    "the and for with that this from are was were what which about into your "
+    "their have has will its not but all can our you they them how use using "
+    "step task description result previous".split()
+)
+
+
+def terms(text: str) -> Set[str]:
+    """Lowercased content words of a text, used to score relevance."""
+    return set(_WORD.findall(text.lower())) - _STOPWORDS
+
+
+def task_terms(messages: List[AnyMessage]) -> Set[str]:
+    """Terms of the task message, the first human message of the history."""
+    for message in messages:
+        if message.type == "human" and isinstance(message.content, str):
+            return terms(message.content)
+    return set()
+
+
+def relevance_window(text: str, task: Set[str], max_tokens: int) -> str:
+    """
+    Extract the parts of a text most relevant to a task, within max_tokens.
+
+    Sentences sharing the most terms with the task are kept first, then the
+    sentences around them, in their original order and with a gap marker
+    where text was left out. Text without any matching sentence keeps its
+    beginning instead.
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    sentences = [s.strip() for s in _SENTENCE.split(text) if s.strip()]
+    scores = [len(task & terms(sentence)) for sentence in sentences]
+    matches = {i for i, score in enumerate(scores) if score}
+    neighbours = {j for i in matches for j in (i - 1, i + 1)} - matches
+    ranked = sorted(
+        [i for i in matches | neighbours if 0 <= i < len(sentences)],
+        key=lambda i: (i not in matches, -scores[i], i),
+    )
+
+    kept = set()
+    used = 0
+    for i in ranked:
+        cost = len(sentences[i]) + len(GAP_MARKER)
+        if used + cost <= max_chars:
+            kept.add(i)
+            used += cost
+    if not kept:
+        return truncate(text, max_tokens)
+
+    parts = []
+    previous = None
+    for i in sorted(kept):
+        if previous is not None:
+            parts.append(" " if i == previous + 1 else GAP_MARKER)
+        elif i > 0:
+            parts.append(GAP_MARKER.lstrip())
+        parts.append(sentences[i])
+        previous = i
+    if previous < len(sentences) - 1:
+        parts.append(GAP_MARKER.rstrip())
+    return "".join(parts)
+
+
+def _long_fields(data, fields: List[Tuple]):
+    """Collect (container, key) pairs of long string values, depth first."""
+    items = data.items() if isinstance(data, dict) else enumerate(data)
+    for key, value in items:
+        if isinstance(value, str) and len(value) >= MIN_FIELD_CHARS:
+            fields.append((data, key))
+        elif isinstance(value, (dict, list)):
+            _long_fields(value, fields)
+    return fields
+
+
+def compact_output(content: str, task: Set[str], max_tokens: int) -> str:
+    """
+    Compact a tool output to roughly max_tokens around what the task needs.
+
+    JSON outputs (the Tavily tools and the web scraper) keep their structure:
+    the budget left after the short fields is shared between the long text
+    fields, and each is cut to its relevance window. Smaller fields give
+    their unused share to the larger ones. Other text is windowed whole.
+    """
+    try:
+        data = json.loads(content)
+    except ValueError:
+        return relevance_window(content, task, max_tokens)
+    if not isinstance(data, (dict, list)):
+        return relevance_window(content, task, max_tokens)
+
+    fields = _long_fields(data, [])
+    texts = [container[key] for container, key in fields]
+    for container, key in fields:
+        container[key] = ""
+    remaining = max_tokens - estimate_tokens(json.dumps(data, ensure_ascii=False))
+    if remaining <= 0:
+        return truncate(content, max_tokens)
+
+    order = sorted(range(len(fields)), key=lambda i: len(texts[i]))
+    for n, i in enumerate(order):
+        share = remaining // (len(order) - n)
+        window = relevance_window(texts[i], task, share)
+        container, key = fields[i]
+        container[key] = window
+        remaining -= estimate_tokens(window)
+    # Many short fields can still exceed the budget together
+    return truncate(json.dumps(data, ensure_ascii=False), max_tokens)
+
+
+def _call_key(tool_call: Dict) -> str:
+    return f"{tool_call['name']}:{json.dumps(tool_call['args'], sort_keys=True)}"
+
+
+def _search_urls(content: str) -> Set[str]:
+    try:
+        data = json.loads(content)
+    except ValueError:
+        return set()
+    if not isinstance(data, dict):
+        return set()
+    return {
+        result["url"]
+        for result in data.get("results") or []
+        if isinstance(result, dict) and result.get("url")
+    }
+
+
+def drop_superseded(messages: List[AnyMessage]) -> Tuple[List[AnyMessage], int, int]:
+    """
+    Replace tool results that later results in the history make redundant.
+
+    A result is superseded by a later call of the same tool with the same
+    arguments, and a search result once every page it found has been
+    extracted. The tool message stays, as the model API requires an answer to
+    every tool call, but its content shrinks to a short note.
+
+    Returns:
+        Tuple of the messages, the number of results dropped and their tokens
+    """
+    calls = {
+        tool_call["id"]: tool_call
+        for message in messages
+        if isinstance(message, AIMessage)
+        for tool_call in message.tool_calls
+    }
+    seen: Dict[str, str] = {}  # call key -> tool name of the later call
+    extracted: Set[str] = set()
+    compacted = list(messages)
+    dropped = 0
+    tokens = 0
+    for index in range(len(messages) - 1, -1, -1):
+        message = messages[index]
+        tool_call = calls.get(getattr(message, "tool_call_id", None))
+        if not isinstance(message, ToolMessage) or tool_call is None:
+            continue
+        if message.status == "error" or not isinstance(message.content, str):
+            continue
+        key = _call_key(tool_call)
+        superseded_by = seen.get(key)
+        if superseded_by is None and tool_call["name"] == SEARCH_TOOL:
+            urls = _search_urls(message.content)
+            if urls and urls <= extracted:
+                superseded_by = "page extraction"
+        if superseded_by is not None:
+            note = SUPERSEDED.format(tool=superseded_by)
+            tokens += estimate_tokens(message.content) - estimate_tokens(note)
+            compacted[index] = message.model_copy(update={"content": note})
+            dropped += 1
+            continue
+        seen[key] = tool_call["name"]
+        if tool_call["name"] in EXTRACT_TOOLS:
+            extracted.update(tool_call["args"].get("urls") or [])
+    return compacted, dropped, tokens
+
+
+class ToolOutputCompactionMiddleware(AgentMiddleware):
+    """
+    Keeps tool outputs from dominating the executor's message history.
+
+    Each tool result is compacted before it enters the history: outputs over
+    the token budget are cut to the sentences relevant to the task (see
+    compact_output), so the up to 15 model calls of a step don't all re-send
+    tens of KB of page text. Before every model call, results superseded by
+    later ones are dropped from the request (see drop_superseded); the agent
+    state keeps them, so checkpoints are unaffected.
+
+    Token counts before and after compaction are recorded as
+    "compaction.tool_output" and "compaction.superseded" spans and summed in
+    stats().
+    """
+
+    def __init__(self, token_budget: Optional[int] = None):
+        super().__init__()
+        self.token_budget = token_budget or settings.tool_output_token_budget
+        self._lock = threading.Lock()
+        self._stats = {
+            "tool_outputs": 0,
+            "compacted": 0,
+            "tokens_before": 0,
+            "tokens_after": 0,
+            "superseded": 0,
+            "superseded_tokens": 0,
+        }
+
+    def _count(self, **counts: int):
+        with self._lock:
+            for name, value in counts.items():
+                self._stats[name] += value
+
+    def stats(self) -> Dict[str, int]:
+        """Tool outputs seen and compacted, and the tokens saved, so far."""
+        with self._lock:
+            return dict(self._stats)
+
+    def _compact(self, request, message):
+        if not isinstance(message, ToolMessage) or message.status == "error":
+            return message
+        if not isinstance(message.content, str):
+            return message
+        before = estimate_tokens(message.content)
+        with metrics.span("compaction.tool_output", tool=message.name) as attributes:
+            content = message.content
+            if before > self.token_budget:
+                task = task_terms(request.state["messages"])
+                content = compact_output(content, task, self.token_budget)
+            after = estimate_tokens(content)
+            attributes["tokens_before"] = before
+            attributes["tokens_after"] = after
+        self._count(
+            tool_outputs=1,
+            compacted=content != message.content,
+            tokens_before=before,
+            tokens_after=after,
+        )
+        if content == message.content:
+            return message
+        return message.model_copy(update={"content": content})
+
+    def _without_superseded(self, request):
+        messages, dropped, tokens = drop_superseded(request.messages)
+        if not dropped:
+            return request
+        with metrics.span("compaction.superseded", dropped=dropped, tokens=tokens):
+            self._count(superseded=dropped, superseded_tokens=tokens)
+        return request.override(messages=messages)
+
+    def wrap_tool_call(self, request, handler):
+        return self._compact(request, handler(request))
+
+    async def awrap_tool_call(self, request, handler):
+        return self._compact(request, await handler(request))
+
+    def wrap_model_call(self, request, handler):
+        return handler(self._without_superseded(request))
+
+    async def awrap_model_call(self, request, handler):
+        return await handler(self._without_superseded(request))
@@ -1,3 +1,5 @@
+from typing import Dict, Optional
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -5,6 +7,112 @@ class Settings(BaseSettings):
     openai_api_key: str
     tavily_api_key: str
     database_dsn: str
+    # Async driver DSN; derived from database_dsn when not set
+    async_database_dsn: Optional[str] = None
+
+    # Connection pool (todo_agent.db); pool sizes apply per engine (sync and async)
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_timeout_seconds: float = 30.0  # Wait for a free connection
+    db_pool_pre_ping: bool = True
+    db_pool_recycle_seconds: int = 1800
+    # Server-side statement timeout (PostgreSQL); None leaves the server default
+    db_statement_timeout_ms: Optional[int] = 30000
+    # SQLite pragmas applied to every new connection
+    sqlite_journal_mode: str = "WAL"
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_busy_timeout_ms: int = 30000
+
+    # Provider quotas shared by every session in the process (todo_agent.rate_limit);
+    # None disables that budget. OpenAI limits apply per model: each model gets
+    # its own buckets, sized from openai_model_limits when listed there, e.g.
+    # {"gpt-4o-mini": {"tokens_per_minute": 200000}}, else from the defaults below
+    openai_requests_per_minute: Optional[int] = 500
+    openai_tokens_per_minute: Optional[int] = 30000
+    openai_model_limits: Dict[str, Dict[str, Optional[int]]] = {}
+    tavily_requests_per_minute: Optional[int] = 100
+    # Retries of rate-limited and transient provider failures
+    retry_max_attempts: int = 6
+    retry_base_delay_seconds: float = 1.0
+    retry_max_delay_seconds: float = 60.0
+
+    # Executor model routing: tasks start on executor_model and move to
+    # executor_escalation_model when complex or after a failed attempt; an empty
+    # escalation model sends everything to executor_model
+    executor_model: str = "gpt-4o-mini"
+    executor_escalation_model: Optional[str] = "gpt-4o"
+    planner_model: str = "gpt-4o"
+    # Tasks without a planner hint are complex from this many dependencies or
+    # this many (approximate) tokens of description
+    routing_complex_min_dependencies: int = 3
+    routing_complex_min_tokens: int = 150
+
+    # Map/reduce planning: a planner step may fan out over a list of items, one
+    # subtask per item, merged for the steps depending on it (todo_agent.map_reduce)
+    map_reduce_planning: bool = True
+    map_max_items: int = 50
+
+    # Re-planning of the remaining work after a task fails (todo_agent.repair);
+    # every repair is a new plan version, at most max_replans per session
+    replan_on_failure: bool = True
+    max_replans: int = 2
+
+    # Search for upcoming tasks while the tasks they wait on run (todo_agent.prefetch)
+    speculative_prefetch: bool = False
+
+    # Maximum number of independent tasks executed at the same time
+    max_parallel_tasks: int = 4
+
+    # Executor prompt context from previous steps (approximate tokens)
+    context_token_budget: int = 6000
+    context_step_token_limit: int = 1500
+
+    # Tool outputs in the executor loop are cut to this many (approximate) tokens
+    # around the task, and superseded ones dropped (todo_agent.compaction)
+    tool_output_compaction: bool = True
+    tool_output_token_budget: int = 2000
+
+    # Persistent LLM response cache (todo_agent.llm_cache)
+    llm_cache_enabled: bool = True
+    llm_cache_ttl_seconds: int = 7 * 24 * 3600
+    llm_cache_max_entries: int = 10000
+
+    # On-disk cache for Tavily tool results (todo_agent.tools.cache)
+    tool_cache_enabled: bool = True
+    tool_cache_path: str = "tool_cache.db"
+    search_cache_ttl_seconds: int = 6 * 3600
+    extract_cache_ttl_seconds: int = 7 * 24 * 3600
+
+    # Reuse of stored plans for repeated objectives (todo_agent.plan_cache);
+    # below 1.0, near-duplicate wordings with this Jaccard similarity also match
+    plan_cache_enabled: bool = True
+    plan_cache_similarity_threshold: float = 1.0
+
+    # Reuse of completed task results across sessions (todo_agent.task_memo);
+    # results older than the freshness window are executed again
+    task_memo_enabled: bool = True
+    task_memo_freshness_seconds: int = 6 * 3600
+
+    # LangGraph checkpoints of the planner/executor graphs (todo_agent.checkpoints)
+    checkpoint_enabled: bool = True
+    checkpoint_db_path: str = "agent_state.db"
+
+    # Stream executor output live and save partial results to the task row
+    stream_execution: bool = False
+    stream_save_interval_seconds: float = 5.0
+
+    # Span/LLM/tool timings written to the metrics table (todo_agent.metrics)
+    metrics_enabled: bool = True
+
+    # Batched web scraper (todo_agent.tools.web_scraper)
+    scraper_max_concurrency: int = 5
+    scraper_max_chars_per_page: Optional[int] = 8000
+
+    # Batch worker pool (todo_agent.worker)
+    worker_concurrency: int = 8  # Sessions run concurrently per worker process
+    worker_poll_seconds: float = 2.0
+    worker_heartbeat_seconds: float = 30.0
+    worker_stale_after_seconds: float = 300.0  # Claims older than this are recovered
 
     model_config = SettingsConfigDict(env_file=".env")
 
@@ -0,0 +1,140 @@
+import hashlib
+from typing import Dict, Iterable, List, Optional
+
+from todo_agent.config import settings
+
+# Rough token estimate; good enough for budgeting without loading a tokenizer
+CHARS_PER_TOKEN = 4
+
+TRUNCATION_MARKER = "\n… [truncated]"
+# Result tokens a step keeps however small its share of the context budget
+MIN_RESULT_TOKENS = 50
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count of a string."""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def truncate(text: str, max_tokens: int) -> str:
+    """Cut text down to roughly max_tokens, keeping the beginning."""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    return text[: max_chars - len(TRUNCATION_MARKER)] + TRUNCATION_MARKER
+
+
+def format_step(step: Dict) -> str:
+    """Render a completed step as it appears in the executor prompt."""
+    return (
+        f"Step #{step['id']}: {step['title']}\n"
+        f"Description: {step['description']}\n"
+        f"Result: {step['result']}\n\n"
+    )
+
+
+class ContextStore:
+    """
+    Incremental store of completed-step context for the executor.
+
+    Each completed step is truncated and formatted once, when it is added,
+    instead of being re-rendered for every later task. steps() then fits the
+    requested dependencies into a token budget, so the prompt size per task
+    stays bounded however long the plan is.
+    """
+
+    def __init__(
+        self,
+        token_budget: Optional[int] = None,
+        step_token_limit: Optional[int] = None,
+    ):
+        self.token_budget = token_budget or settings.context_token_budget
+        self.step_token_limit = step_token_limit or settings.context_step_token_limit
+        # A map task's result merges all of its subtasks (see map_reduce), so it
+        # may take most of the budget, leaving room for the reduce step's others
+        self.map_token_limit = self.token_budget * 3 // 4
+        self._steps: Dict[int, Dict] = {}
+
+    def __contains__(self, step_id: int) -> bool:
+        return step_id in self._steps
+
+    def get(self, step_id: int) -> Optional[Dict]:
+        """Context entry of a completed step, or None."""
+        return self._steps.get(step_id)
+
+    def add(self, step: Dict):
+        """
+        Add a completed step.
+
+        Args:
+            step: Dict with id, title, description and result, plus parent_id
+                for map subtasks and items for map tasks
+        """
+        entry = dict(step)
+        # Fingerprint of the full result, before truncation (see task_memo)
+        entry["result_hash"] = hashlib.sha256(
+            (step["result"] or "").encode("utf-8")
+        ).hexdigest()
+        limit = self.map_token_limit if step.get("items") else self.step_token_limit
+        entry["result"] = truncate(step["result"] or "", limit)
+        entry["text"] = format_step(entry)
+        entry["tokens"] = estimate_tokens(entry["text"])
+        self._steps[step["id"]] = entry
+
+    def extend(self, steps: Iterable[Dict]):
+        for step in steps:
+            self.add(step)
+
+    def result_hashes(self, step_ids: Iterable[int]) -> List[str]:
+        """Full-result fingerprints of the given steps, ordered by step id."""
+        return [
+            self._steps[step_id]["result_hash"]
+            for step_id in sorted(set(step_ids))
+            if step_id in self._steps
+        ]
+
+    def steps(self, step_ids: Iterable[int]) -> List[Dict]:
+        """
+        Select context entries for the given step ids within the token budget.
+
+        Every requested step is kept. When together they exceed the budget, it
+        is shared fairly: steps smaller than their share stay whole and leave
+        the rest to the larger ones, whose results are truncated to fit (with
+        a truncation marker, so the model knows the result was cut). Entries
+        carry a pre-rendered "text" field that Executor.build_input uses as is.
+
+        Args:
+            step_ids: Ids of the steps the current task depends on
+
+        Returns:
+            Selected entries, ordered by step id
+        """
+        entries = [
+            self._steps[step_id]
+            for step_id in sorted(set(step_ids))
+            if step_id in self._steps
+        ]
+        if sum(entry["tokens"] for entry in entries) <= self.token_budget:
+            return entries
+
+        selected = {}
+        remaining = self.token_budget
+        by_size = sorted(entries, key=lambda entry: entry["tokens"])
+        for n, entry in enumerate(by_size):
+            share = remaining // (len(by_size) - n)
+            if entry["tokens"] > share:
+                entry = _shrink(entry, share)
+            selected[entry["id"]] = entry
+            remaining -= entry["tokens"]
+        return [selected[entry["id"]] for entry in entries]
+
+
+def _shrink(entry: Dict, max_tokens: int) -> Dict:
+    """Copy of a context entry with its result truncated to fit max_tokens."""
+    header = estimate_tokens(format_step({**entry, "result": ""}))
+    # Keep the start of the result even when the header alone uses the share
+    result = truncate(entry["result"], max(max_tokens - header, MIN_RESULT_TOKENS))
+    shrunk = {**entry, "result": result}
+    shrunk["text"] = format_step(shrunk)
+    shrunk["tokens"] = estimate_tokens(shrunk["text"])
+    return shrunk
@@ -1,18 +1,26 @@
 import datetime
-from typing import Dict, List, Optional
+import json
+from typing import Dict, List, Optional, Tuple
 
 from sqlalchemy import (
     Boolean,
     Column,
     DateTime,
     ForeignKey,
+    Index,
     Integer,
     String,
     Text,
+    insert,
+    select,
+    update,
 )
-from sqlalchemy.orm import relationship
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload, relationship
+from sqlalchemy.orm.attributes import flag_modified
 
-from todo_agent.db import Base, SessionLocal
+from todo_agent.db import Base, SessionLocal, get_async_sessionmaker
+from todo_agent.metrics import timed
 
 
 class Thread(Base):
@@ -21,14 +29,23 @@ class Thread(Base):
     id = Column(Integer, primary_key=True)
     thread_id = Column(String(100), unique=True, nullable=False, index=True)
     objective = Column(Text, nullable=False)
-    status = Column(String(20), default="active")  # active, completed, failed
-    created_at = Column(DateTime, default=datetime.datetime.now())
+    status = Column(
+        String(20), default="active"
+    )  # queued, running, active, completed, failed
+    worker_id = Column(String(100), nullable=True)  # Batch worker holding the claim
+    heartbeat_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.datetime.now)
     updated_at = Column(
-        DateTime, default=datetime.datetime.now(), onupdate=datetime.datetime.now()
+        DateTime, default=datetime.datetime.now, onupdate=datetime.datetime.now
     )
 
     # Relationships
-    tasks = relationship("Task", back_populates="session", cascade="all, delete-orphan")
+    tasks = relationship(
+        "Task",
+        back_populates="session",
+        cascade="all, delete-orphan",
+        order_by="Task.task_id",
+    )
 
     def to_dict(self):
         return {
@@ -42,6 +59,12 @@ class Thread(Base):
 
 class Task(Base):
     __tablename__ = "tasks"
+    __table_args__ = (
+        # A unique index rather than a constraint, so upgrade_schema can add it
+        # to existing SQLite databases. It also serves lookups by session_id
+        Index("uq_tasks_session_task", "session_id", "task_id", unique=True),
+        Index("ix_tasks_session_status", "session_id", "status"),
+    )
 
     id = Column(Integer, primary_key=True)
     session_id = Column(Integer, ForeignKey("threads.id"), nullable=False)
@@ -50,9 +73,20 @@ class Task(Base):
     content = Column(Text, nullable=False)
     status = Column(
         String(20), default="pending"
-    )  # pending, in_progress, completed, failed
+    )  # pending, in_progress, completed, failed, replaced
     result = Column(Text, nullable=True)
     reflection = Column(Text, nullable=True)
+    dependencies = Column(Text, nullable=True)  # JSON list of task ids
+    complexity = Column(String(10), nullable=True)  # Planner hint: simple, complex
+    items = Column(Text, nullable=True)  # JSON list a map task fans out over
+    parent_id = Column(Integer, nullable=True)  # task_id of a subtask's map task
+    # Plan version that added the task: 0 for the original plan, then one per
+    # repair after a failure (todo_agent.repair)
+    version = Column(Integer, nullable=True)
+    partial_result = Column(Text, nullable=True)  # JSON progress of a streamed run
+    # Content + dependency results fingerprint, for reuse across sessions
+    memo_key = Column(String(64), nullable=True, index=True)
+    reused_from = Column(String(120), nullable=True)  # "thread_id#task_id" source
     started_at = Column(DateTime, nullable=True)
     completed_at = Column(DateTime, nullable=True)
 
@@ -64,9 +98,20 @@ class Task(Base):
             "id": self.task_id,
             "title": self.title,
             "content": self.content,
+            "dependencies": json.loads(self.dependencies)
+            if self.dependencies is not None
+            else None,
+            "complexity": self.complexity,
+            "items": json.loads(self.items) if self.items else None,
+            "parent_id": self.parent_id,
+            "version": self.version or 0,
             "status": self.status,
             "result": self.result,
             "reflection": self.reflection,
+            "partial_result": json.loads(self.partial_result)
+            if self.partial_result
+            else None,
+            "reused_from": self.reused_from,
             "started_at": self.started_at.isoformat() if self.started_at else None,
             "completed_at": self.completed_at.isoformat()
             if self.completed_at
@@ -74,11 +119,118 @@ class Task(Base):
         }
 
 
+def _task_row(session_id: int, task_data: Dict) -> Dict:
+    """Column values of a pending task, for a bulk INSERT."""
+    return {
+        "session_id": session_id,
+        "task_id": task_data["id"],
+        "title": task_data["title"],
+        "content": task_data["content"],
+        "dependencies": json.dumps(task_data["dependencies"])
+        if task_data.get("dependencies") is not None
+        else None,
+        "complexity": task_data.get("complexity"),
+        "items": json.dumps(task_data["items"]) if task_data.get("items") else None,
+        "parent_id": task_data.get("parent_id"),
+        "version": task_data.get("version", 0),
+        "status": "pending",
+    }
+
+
+def _new_task_dict(task_data: Dict) -> Dict:
+    """A freshly inserted task in the format of Task.to_dict."""
+    return {
+        "id": task_data["id"],
+        "title": task_data["title"],
+        "content": task_data["content"],
+        "dependencies": task_data.get("dependencies"),
+        "complexity": task_data.get("complexity"),
+        "items": task_data.get("items") or None,
+        "parent_id": task_data.get("parent_id"),
+        "version": task_data.get("version", 0),
+        "status": "pending",
+        "result": None,
+        "reflection": None,
+        "partial_result": None,
+        "reused_from": None,
+        "started_at": None,
+        "completed_at": None,
+    }
+
+
+def _apply_task_status(
+    task: Task,
+    status: str,
+    result: Optional[str],
+    reflection: Optional[str],
+    memo_key: Optional[str] = None,
+    reused_from: Optional[str] = None,
+):
+    """Apply a status change and its timestamps to a Task row."""
+    task.status = status
+    if result:
+        task.result = result
+    if reflection:
+        task.reflection = reflection
+    if memo_key:
+        task.memo_key = memo_key
+    if reused_from:
+        task.reused_from = reused_from
+
+    if status == "in_progress" and not task.started_at:
+        task.started_at = datetime.datetime.now()
+    elif status in ["completed", "failed"]:
+        task.completed_at = datetime.datetime.now()
+    if status == "completed":
+        # Partial output is only kept to resume an unfinished attempt. It is
+        # written from another DB session, so force the column into the UPDATE
+        task.partial_result = None
+        flag_modified(task, "partial_result")
+
+
+def _partial_result_update(thread_id: str, task_id: int, partial: Dict):
+    """Single UPDATE statement storing a task's partial result."""
+    session_id = select(Thread.id).filter(Thread.thread_id == thread_id)
+    return (
+        update(Task)
+        .where(Task.session_id == session_id.scalar_subquery())
+        .where(Task.task_id == task_id)
+        .values(partial_result=json.dumps(partial))
+    )
+
+
+def _thread_tasks(thread_id: str):
+    """SELECT of a thread's tasks, joined on the thread in a single statement."""
+    return (
+        select(Task)
+        .join(Thread, Task.session_id == Thread.id)
+        .filter(Thread.thread_id == thread_id)
+    )
+
+
+def _completed_step(task: Task) -> Dict:
+    """Context entry for a completed task, as consumed by the executor."""
+    return {
+        "id": task.task_id,
+        "title": task.title,
+        "description": task.content,
+        "result": task.result,
+        "items": json.loads(task.items) if task.items else None,
+        "parent_id": task.parent_id,
+    }
+
+
+@timed(kind="db")
 def get_session_by_thread(thread_id: str) -> Optional[Dict]:
     """Retrieve session and tasks by thread_id."""
     db = SessionLocal()
     try:
-        session = db.query(Thread).filter(Thread.thread_id == thread_id).first()
+        session = (
+            db.query(Thread)
+            .options(joinedload(Thread.tasks))
+            .filter(Thread.thread_id == thread_id)
+            .first()
+        )
         if session:
             return {
                 "session": session.to_dict(),
@@ -89,27 +241,134 @@ def get_session_by_thread(thread_id: str) -> Optional[Dict]:
         db.close()
 
 
-def create_session(thread_id: str, objective: str, tasks: List[Dict]):
-    """Create a new session with initial plan."""
-    db = SessionLocal()
-    try:
-        # Create session
+def _create_session(
+    db: Session, thread_id: str, objective: str, tasks: List[Dict]
+) -> Dict:
+    """
+    Insert a session and its plan on an open (sync) DB session.
+
+    The tasks go in as one bulk INSERT, and the payload is built from what was
+    written instead of being read back.
+    """
+    # Create session, or attach the plan to a row queued for a batch worker
+    session = db.scalars(select(Thread).filter(Thread.thread_id == thread_id)).first()
+    if session is None:
         session = Thread(thread_id=thread_id, objective=objective, status="active")
         db.add(session)
         db.flush()  # Get session.id
 
-        # Create tasks
-        for task_data in tasks:
-            task = Task(
-                session_id=session.id,
-                task_id=task_data["id"],
-                title=task_data["title"],
-                content=task_data["content"],
-                status="pending",
+    if tasks:
+        db.execute(insert(Task), [_task_row(session.id, task) for task in tasks])
+    return {
+        "session": session.to_dict(),
+        "tasks": [
+            _new_task_dict(task) for task in sorted(tasks, key=lambda t: t["id"])
+        ],
+    }
+
+
+@timed(kind="db")
+def create_session(thread_id: str, objective: str, tasks: List[Dict]) -> Dict:
+    """
+    Create a new session with initial plan.
+
+    Returns:
+        The new session, in the format of get_session_by_thread
+    """
+    db = SessionLocal(expire_on_commit=False)
+    try:
+        session_data = _create_session(db, thread_id, objective, tasks)
+        db.commit()
+        return session_data
+    except Exception as e:
+        db.rollback()
+        raise e
+    finally:
+        db.close()
+
+
+# Rows per bulk statement; stays under SQLite's bound-parameter limit
+BULK_CHUNK = 500
+
+
+def _bulk_create_sessions(db: Session, plans: List[Dict]) -> int:
+    """Insert many sessions and their plans on an open (sync) DB session."""
+    by_thread = {plan["thread_id"]: plan for plan in plans}
+    thread_ids = list(by_thread)
+    existing: Dict[str, int] = {}
+    planned = set()
+    for start in range(0, len(thread_ids), BULK_CHUNK):
+        chunk = thread_ids[start : start + BULK_CHUNK]
+        existing.update(
+            db.execute(
+                select(Thread.thread_id, Thread.id).filter(Thread.thread_id.in_(chunk))
+            ).all()
+        )
+    existing_ids = list(existing.values())
+    for start in range(0, len(existing_ids), BULK_CHUNK):
+        planned.update(
+            db.scalars(
+                select(Task.session_id)
+                .filter(Task.session_id.in_(existing_ids[start : start + BULK_CHUNK]))
+                .distinct()
             )
-            db.add(task)
+        )
+
+    now = datetime.datetime.now()
+    new_threads = [
+        {
+            "thread_id": thread_id,
+            "objective": plan["objective"],
+            "status": "active",
+            "created_at": now,
+            "updated_at": now,
+        }
+        for thread_id, plan in by_thread.items()
+        if thread_id not in existing
+    ]
+    session_ids: List[Tuple[str, int]] = [
+        (thread_id, session_id)
+        for thread_id, session_id in existing.items()
+        if session_id not in planned
+    ]
+    for start in range(0, len(new_threads), BULK_CHUNK):
+        session_ids.extend(
+            db.execute(
+                insert(Thread).returning(Thread.thread_id, Thread.id),
+                new_threads[start : start + BULK_CHUNK],
+            ).all()
+        )
+
+    rows = [
+        _task_row(session_id, task)
+        for thread_id, session_id in session_ids
+        for task in by_thread[thread_id]["tasks"]
+    ]
+    for start in range(0, len(rows), BULK_CHUNK):
+        db.execute(insert(Task), rows[start : start + BULK_CHUNK])
+    return len(session_ids)
+
+
+@timed(kind="db")
+def bulk_create_sessions(plans: List[Dict]) -> int:
+    """
+    Create many sessions with their plans in one transaction.
+
+    For seeding and batch imports: threads and tasks are written with a few
+    multi-row INSERTs instead of one ORM flush per object. Threads that already
+    have a plan are skipped; threads queued without one get theirs attached.
+
+    Args:
+        plans: Dicts with thread_id, objective and tasks (plan task dicts)
+
+    Returns:
+        Number of sessions that received a plan
+    """
+    db = SessionLocal()
+    try:
+        created = _bulk_create_sessions(db, plans)
         db.commit()
-        return get_session_by_thread(thread_id)
+        return created
     except Exception as e:
         db.rollback()
         raise e
@@ -117,95 +376,404 @@ def create_session(thread_id: str, objective: str, tasks: List[Dict]):
         db.close()
 
 
+@timed(kind="db")
 def update_task_status(
     thread_id: str,
     task_id: int,
     status: str,
     result: Optional[str] = None,
     reflection: Optional[str] = None,
+    memo_key: Optional[str] = None,
+    reused_from: Optional[str] = None,
 ):
     """Update task execution status."""
     db = SessionLocal()
     try:
-        session = db.query(Thread).filter(Thread.thread_id == thread_id).first()
-        if session:
-            task = (
-                db.query(Task)
-                .filter(Task.session_id == session.id, Task.task_id == task_id)
-                .first()
-            )
-
-            if task:
-                task.status = status
-                if result:
-                    task.result = result
-                if reflection:
-                    task.reflection = reflection
+        task = db.scalars(
+            _thread_tasks(thread_id).filter(Task.task_id == task_id)
+        ).first()
+        if task:
+            _apply_task_status(task, status, result, reflection, memo_key, reused_from)
+            db.commit()
+    finally:
+        db.close()
 
-                if status == "in_progress" and not task.started_at:
-                    task.started_at = datetime.datetime.now()
-                elif status in ["completed", "failed"]:
-                    task.completed_at = datetime.datetime.now()
 
-                db.commit()
+@timed(kind="db")
+def save_partial_result(thread_id: str, task_id: int, partial: Dict):
+    """Persist the partial output of a task that is still running."""
+    db = SessionLocal()
+    try:
+        db.execute(_partial_result_update(thread_id, task_id, partial))
+        db.commit()
     finally:
         db.close()
 
 
+@timed(kind="db")
 def get_completed_tasks(thread_id: str) -> List[Dict]:
     """Get all completed tasks for context."""
     db = SessionLocal()
     try:
-        session = db.query(Thread).filter(Thread.thread_id == thread_id).first()
-        if session:
-            completed = (
-                db.query(Task)
-                .filter(Task.session_id == session.id, Task.status == "completed")
-                .order_by(Task.task_id)
-                .all()
-            )
-
-            return [
-                {
-                    "id": task.task_id,
-                    "title": task.title,
-                    "description": task.content,
-                    "result": task.result,
-                }
-                for task in completed
-            ]
-        return []
+        completed = db.scalars(
+            _thread_tasks(thread_id)
+            .filter(Task.status == "completed")
+            .order_by(Task.task_id)
+        )
+        return [_completed_step(task) for task in completed]
     finally:
         db.close()
 
 
+@timed(kind="db")
 def get_pending_tasks(thread_id: str) -> List[Dict]:
     """Get remaining pending tasks."""
     db = SessionLocal()
     try:
-        session = db.query(Thread).filter(Thread.thread_id == thread_id).first()
-        if session:
-            pending = (
-                db.query(Task)
-                .filter(Task.session_id == session.id, Task.status == "pending")
-                .order_by(Task.task_id)
-                .all()
-            )
-
-            return [task.to_dict() for task in pending]
-        return []
+        pending = db.scalars(
+            _thread_tasks(thread_id)
+            .filter(Task.status == "pending")
+            .order_by(Task.task_id)
+        )
+        return [task.to_dict() for task in pending]
     finally:
         db.close()
 
 
-def mark_session_complete(thread_id: str):
-    """Mark session as completed."""
+@timed(kind="db")
+def mark_session_complete(thread_id: str, status: str = "completed"):
+    """Mark session as finished: "completed", or "failed" if a task failed."""
     db = SessionLocal()
     try:
         session = db.query(Thread).filter(Thread.thread_id == thread_id).first()
         if session:
-            session.status = "completed"
+            session.status = status
             session.updated_at = datetime.datetime.now()
             db.commit()
     finally:
         db.close()
+
+
+@timed(kind="db")
+def get_finished_thread_ids() -> List[str]:
+    """Thread ids of the sessions marked completed or failed."""
+    db = SessionLocal()
+    try:
+        return [
+            thread_id
+            for (thread_id,) in db.query(Thread.thread_id).filter(
+                Thread.status.in_(("completed", "failed"))
+            )
+        ]
+    finally:
+        db.close()
+
+
+# Async variants, backed by the async engine in todo_agent.db
+
+
+async def _aget_thread(db: AsyncSession, thread_id: str) -> Optional[Thread]:
+    result = await db.execute(select(Thread).filter(Thread.thread_id == thread_id))
+    return result.scalars().first()
+
+
+@timed(kind="db")
+async def aget_session_by_thread(thread_id: str) -> Optional[Dict]:
+    """Retrieve session and tasks by thread_id."""
+    async with get_async_sessionmaker()() as db:
+        result = await db.execute(
+            select(Thread)
+            .options(joinedload(Thread.tasks))
+            .filter(Thread.thread_id == thread_id)
+        )
+        session = result.unique().scalars().first()
+        if session:
+            return {
+                "session": session.to_dict(),
+                "tasks": [task.to_dict() for task in session.tasks],
+            }
+        return None
+
+
+@timed(kind="db")
+async def acreate_session(thread_id: str, objective: str, tasks: List[Dict]) -> Dict:
+    """Async version of create_session."""
+    async with get_async_sessionmaker()() as db:
+        try:
+            session_data = await db.run_sync(
+                _create_session, thread_id, objective, tasks
+            )
+            await db.commit()
+            return session_data
+        except Exception as e:
+            await db.rollback()
+            raise e
+
+
+@timed(kind="db")
+async def abulk_create_sessions(plans: List[Dict]) -> int:
+    """Async version of bulk_create_sessions."""
+    async with get_async_sessionmaker()() as db:
+        try:
+            created = await db.run_sync(_bulk_create_sessions, plans)
+            await db.commit()
+            return created
+        except Exception as e:
+            await db.rollback()
+            raise e
+
+
+def _replace_tasks(
+    db: Session, thread_id: str, replaced_ids: List[int], tasks: List[Dict]
+):
+    """Mark tasks replaced and insert their replacements on an open DB session."""
+    session_id = db.scalar(select(Thread.id).filter(Thread.thread_id == thread_id))
+    db.execute(
+        update(Task)
+        .where(Task.session_id == session_id, Task.task_id.in_(replaced_ids))
+        .values(status="replaced")
+    )
+    db.execute(insert(Task), [_task_row(session_id, task) for task in tasks])
+
+
+@timed(kind="db")
+async def areplace_tasks(thread_id: str, replaced_ids: List[int], tasks: List[Dict]):
+    """
+    Swap a session's unfinished tasks for the tasks of a repaired plan.
+
+    The replaced rows keep their content and reflection under status
+    "replaced"; both changes are written in one transaction.
+    """
+    async with get_async_sessionmaker()() as db:
+        try:
+            await db.run_sync(_replace_tasks, thread_id, replaced_ids, tasks)
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            raise e
+
+
+@timed(kind="db")
+async def aupdate_task_status(
+    thread_id: str,
+    task_id: int,
+    status: str,
+    result: Optional[str] = None,
+    reflection: Optional[str] = None,
+    memo_key: Optional[str] = None,
+    reused_from: Optional[str] = None,
+):
+    """Update task execution status."""
+    async with get_async_sessionmaker()() as db:
+        task = (
+            await db.scalars(_thread_tasks(thread_id).filter(Task.task_id == task_id))
+        ).first()
+        if task:
+            _apply_task_status(task, status, result, reflection, memo_key, reused_from)
+            await db.commit()
+
+
+@timed(kind="db")
+async def asave_partial_result(thread_id: str, task_id: int, partial: Dict):
+    """Persist the partial output of a task that is still running."""
+    async with get_async_sessionmaker()() as db:
+        await db.execute(_partial_result_update(thread_id, task_id, partial))
+        await db.commit()
+
+
+@timed(kind="db")
+async def aget_completed_tasks(thread_id: str) -> List[Dict]:
+    """Get all completed tasks for context."""
+    async with get_async_sessionmaker()() as db:
+        completed = await db.scalars(
+            _thread_tasks(thread_id)
+            .filter(Task.status == "completed")
+            .order_by(Task.task_id)
+        )
+        return [_completed_step(task) for task in completed]
+
+
+@timed(kind="db")
+async def aget_pending_tasks(thread_id: str) -> List[Dict]:
+    """Get remaining pending tasks."""
+    async with get_async_sessionmaker()() as db:
+        pending = await db.scalars(
+            _thread_tasks(thread_id)
+            .filter(Task.status == "pending")
+            .order_by(Task.task_id)
+        )
+        return [task.to_dict() for task in pending]
+
+
+@timed(kind="db")
+async def amark_session_complete(thread_id: str, status: str = "completed"):
+    """Async version of mark_session_complete."""
+    async with get_async_sessionmaker()() as db:
+        session = await _aget_thread(db, thread_id)
+        if session:
+            session.status = status
+            session.updated_at = datetime.datetime.now()
+            await db.commit()
+
+
+# Batch queue: threads enqueued with status "queued" and claimed by workers
+
+
+@timed(kind="db")
+async def aenqueue_objectives(objectives: Dict[str, str]) -> int:
+    """
+    Queue objectives for batch workers, skipping threads that already exist.
+
+    Args:
+        objectives: Mapping of thread_id to objective
+
+    Returns:
+        Number of newly queued threads
+    """
+    thread_ids = list(objectives)
+    async with get_async_sessionmaker()() as db:
+        existing = set()
+        # Chunked so the IN list stays under SQLite's bound-parameter limit
+        for start in range(0, len(thread_ids), BULK_CHUNK):
+            chunk = thread_ids[start : start + BULK_CHUNK]
+            existing.update(
+                (
+                    await db.execute(
+                        select(Thread.thread_id).filter(Thread.thread_id.in_(chunk))
+                    )
+                ).scalars()
+            )
+        now = datetime.datetime.now()
+        queued = [
+            Thread(
+                thread_id=thread_id,
+                objective=objective,
+                status="queued",
+                created_at=now,
+                updated_at=now,
+            )
+            for thread_id, objective in objectives.items()
+            if thread_id not in existing
+        ]
+        db.add_all(queued)
+        await db.commit()
+        return len(queued)
+
+
+@timed(kind="db")
+async def aclaim_next_thread(worker_id: str) -> Optional[Dict]:
+    """
+    Atomically claim the oldest queued thread for a worker.
+
+    The claim is a conditional UPDATE on status, so when several workers race
+    for the same row exactly one of them wins; the others move on to the next.
+
+    Args:
+        worker_id: Identifier of the claiming worker
+
+    Returns:
+        Claimed thread as a dict, or None if the queue is empty
+    """
+    async with get_async_sessionmaker()() as db:
+        while True:
+            candidate = (
+                await db.execute(
+                    select(Thread.id)
+                    .filter(Thread.status == "queued")
+                    .order_by(Thread.id)
+                    .limit(1)
+                )
+            ).scalar()
+            if candidate is None:
+                return None
+
+            now = datetime.datetime.now()
+            claimed = await db.execute(
+                update(Thread)
+                .where(Thread.id == candidate, Thread.status == "queued")
+                .values(
+                    status="running",
+                    worker_id=worker_id,
+                    heartbeat_at=now,
+                    updated_at=now,
+                )
+            )
+            await db.commit()
+            if claimed.rowcount == 1:
+                session = await db.get(Thread, candidate)
+                return session.to_dict()
+
+
+@timed(kind="db")
+async def aheartbeat(thread_id: str, worker_id: str):
+    """Refresh a worker's claim on a thread so it is not recovered as abandoned."""
+    async with get_async_sessionmaker()() as db:
+        await db.execute(
+            update(Thread)
+            .where(Thread.thread_id == thread_id, Thread.worker_id == worker_id)
+            .values(heartbeat_at=datetime.datetime.now())
+        )
+        await db.commit()
+
+
+@timed(kind="db")
+async def arelease_thread(thread_id: str, worker_id: str, status: str):
+    """
+    Release a worker's claim on a thread.
+
+    Args:
+        thread_id: Claimed thread identifier
+        worker_id: Worker releasing the claim
+        status: Final status of the session, "completed" or "failed"; it
+            replaces the status the session marked itself with
+    """
+    async with get_async_sessionmaker()() as db:
+        # A thread requeued as abandoned no longer has this worker's id
+        await db.execute(
+            update(Thread)
+            .where(Thread.thread_id == thread_id, Thread.worker_id == worker_id)
+            .values(
+                status=status,
+                worker_id=None,
+                heartbeat_at=None,
+                updated_at=datetime.datetime.now(),
+            )
+        )
+        await db.commit()
+
+
+@timed(kind="db")
+async def arecover_abandoned_threads(stale_after: datetime.timedelta) -> int:
+    """
+    Requeue threads whose worker stopped sending heartbeats.
+
+    Their in_progress tasks are left as they are, so the next worker to claim
+    the thread continues them from their last checkpoint.
+
+    Args:
+        stale_after: How long a claim may go without a heartbeat
+
+    Returns:
+        Number of recovered threads
+    """
+    cutoff = datetime.datetime.now() - stale_after
+    async with get_async_sessionmaker()() as db:
+        abandoned = list(
+            (
+                await db.execute(
+                    select(Thread.id).filter(
+                        Thread.status == "running", Thread.heartbeat_at < cutoff
+                    )
+                )
+            ).scalars()
+        )
+        if not abandoned:
+            return 0
+
+        await db.execute(
+            update(Thread)
+            .where(Thread.id.in_(abandoned), Thread.status == "running")
+            .values(status="queued", worker_id=None, heartbeat_at=None)
+        )
+        await db.commit()
+        return len(abandoned)
@@ -1,12 +1,130 @@
-from sqlalchemy import create_engine
+from functools import lru_cache
+from typing import Dict
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.pool import QueuePool
 
 from todo_agent.config import settings
 
-engine = create_engine(settings.database_dsn)
+# Async drivers used for the sync DSNs we support
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+
+def async_dsn(dsn: str) -> str:
+    """Translate a sync database DSN into the equivalent async-driver DSN."""
+    url = make_url(dsn)
+    driver = ASYNC_DRIVERS.get(url.get_backend_name())
+    if driver is None or url.drivername in ASYNC_DRIVERS.values():
+        return dsn
+    return url.set(drivername=driver).render_as_string(hide_password=False)
+
+
+def engine_options(dsn: str) -> Dict:
+    """
+    create_engine/create_async_engine keyword arguments for a DSN.
+
+    Pool sizing only applies to queue pools; SQLite in-memory databases use
+    single-connection pools that take no size. PostgreSQL connections get the
+    statement timeout, SQLite connections a busy timeout (the pragmas are set
+    by set_sqlite_pragmas).
+    """
+    url = make_url(dsn)
+    options = {"pool_pre_ping": settings.db_pool_pre_ping}
+    if issubclass(url.get_dialect().get_pool_class(url), QueuePool):
+        options.update(
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout_seconds,
+            pool_recycle=settings.db_pool_recycle_seconds,
+        )
+
+    backend = url.get_backend_name()
+    if backend == "sqlite":
+        options["connect_args"] = {"timeout": settings.sqlite_busy_timeout_ms / 1000}
+    elif backend == "postgresql" and settings.db_statement_timeout_ms:
+        timeout = str(settings.db_statement_timeout_ms)
+        if url.get_driver_name() == "asyncpg":
+            options["connect_args"] = {
+                "server_settings": {"statement_timeout": timeout}
+            }
+        else:
+            options["connect_args"] = {"options": f"-c statement_timeout={timeout}"}
+    return options
+
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """
+    Configure a new SQLite connection for concurrent use.
+
+    WAL lets readers run while a writer commits, busy_timeout makes a writer
+    wait for the lock instead of failing with "database is locked", and
+    synchronous=NORMAL is durable in WAL mode with far fewer fsyncs.
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={settings.sqlite_journal_mode}")
+    cursor.execute(f"PRAGMA synchronous={settings.sqlite_synchronous}")
+    cursor.execute(f"PRAGMA busy_timeout={settings.sqlite_busy_timeout_ms}")
+    cursor.close()
+
+
+def configure_engine(engine: Engine):
+    """Install per-connection setup on a (sync) engine."""
+    if engine.dialect.name == "sqlite":
+        event.listen(engine, "connect", set_sqlite_pragmas)
+
+
+engine = create_engine(settings.database_dsn, **engine_options(settings.database_dsn))
+configure_engine(engine)
 
 # SQLAlchemy ORM session factory bound to this engine
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 # Base class for the classes (tables) definitions
 Base = declarative_base()
+
+
+@lru_cache
+def get_async_engine() -> AsyncEngine:
+    """Async engine, created on first use so sync-only runs never load the driver."""
+    dsn = settings.async_database_dsn or async_dsn(settings.database_dsn)
+    async_engine = create_async_engine(dsn, **engine_options(dsn))
+    configure_engine(async_engine.sync_engine)
+    return async_engine
+
+
+@lru_cache
+def get_async_sessionmaker() -> async_sessionmaker:
+    """Async ORM session factory bound to the async engine."""
+    return async_sessionmaker(
+        bind=get_async_engine(), autoflush=False, expire_on_commit=False
+    )
+
+
+def _pool_stats(pool) -> Dict:
+    stats = {"pool": type(pool).__name__}
+    # Only queue pools keep counters; other pools just report their type
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        counter = getattr(pool, name, None)
+        if counter is not None:
+            stats[name] = counter()
+    return stats
+
+
+def pool_status() -> Dict[str, Dict]:
+    """
+    Connection pool readout for the sync engine and, if created, the async one.
+
+    Returns:
+        Dict keyed by "sync"/"async" with the pool class and its size,
+        checked-in, checked-out and overflow connection counts
+    """
+    status = {"sync": _pool_stats(engine.pool)}
+    if get_async_engine.cache_info().currsize:
+        status["async"] = _pool_stats(get_async_engine().sync_engine.pool)
+    return status
@@ -0,0 +1,276 @@
+import argparse
+import datetime
+import gzip
+import io
+import json
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import DateTime, create_engine, insert, select
+from sqlalchemy.engine import Connection, Engine
+
+from todo_agent import db
+from todo_agent.crud import BULK_CHUNK, Task, Thread
+from todo_agent.migrations import upgrade_schema
+
+FORMAT = "todo-agent-sessions"
+VERSION = 1
+
+# Worker claims are transient; database ids are reassigned on import
+THREAD_COLUMNS = [
+    column
+    for column in Thread.__table__.columns
+    if column.name not in ("id", "worker_id", "heartbeat_at")
+]
+TASK_COLUMNS = [
+    column
+    for column in Task.__table__.columns
+    if column.name not in ("id", "session_id")
+]
+
+
+def _open(path: str, mode: str) -> io.TextIOBase:
+    """Text file, gzip-compressed when the name ends in .gz."""
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def _encode(value):
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot export {type(value).__name__}")
+
+
+def _thread_chunks(
+    conn: Connection,
+    statuses: Optional[List[str]],
+    since: Optional[datetime.datetime],
+    until: Optional[datetime.datetime],
+    chunk_size: int,
+) -> Iterator[List]:
+    """Matching thread rows, chunk_size at a time, by keyset pagination on id."""
+    query = select(Thread.id, *THREAD_COLUMNS).order_by(Thread.id).limit(chunk_size)
+    if statuses:
+        query = query.filter(Thread.status.in_(statuses))
+    if since:
+        query = query.filter(Thread.created_at >= since)
+    if until:
+        query = query.filter(Thread.created_at < until)
+
+    last_id = 0
+    while True:
+        rows = conn.execute(query.filter(Thread.id > last_id)).all()
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1].id
+
+
+def export_sessions(
+    path: str,
+    statuses: Optional[List[str]] = None,
+    since: Optional[datetime.datetime] = None,
+    until: Optional[datetime.datetime] = None,
+    chunk_size: int = 1000,
+    engine: Optional[Engine] = None,
+) -> Tuple[int, int]:
+    """
+    Stream sessions and their tasks to a newline-delimited JSON file.
+
+    The first line is a header naming the thread and task columns; every
+    following line is one session as ``[thread_values, [task_values, ...]]``,
+    so column names are not repeated per row. Rows are read with plain
+    SELECTs, chunk_size sessions at a time, without building ORM objects.
+
+    Args:
+        path: Output file; gzip-compressed if it ends in .gz
+        statuses: Only export threads with one of these statuses
+        since: Only export threads created at or after this time
+        until: Only export threads created before this time
+        chunk_size: Sessions read per round trip
+        engine: Source database (defaults to the configured one)
+
+    Returns:
+        Number of sessions and tasks written
+    """
+    engine = engine or db.engine
+    sessions = tasks = 0
+    with engine.connect() as conn, _open(path, "w") as out:
+        header = {
+            "format": FORMAT,
+            "version": VERSION,
+            "thread_columns": [column.name for column in THREAD_COLUMNS],
+            "task_columns": [column.name for column in TASK_COLUMNS],
+        }
+        out.write(json.dumps(header) + "\n")
+        for threads in _thread_chunks(conn, statuses, since, until, chunk_size):
+            by_session: Dict[int, List] = {row.id: [] for row in threads}
+            task_rows = conn.execute(
+                select(Task.session_id, *TASK_COLUMNS)
+                .filter(Task.session_id.in_(list(by_session)))
+                .order_by(Task.session_id, Task.task_id)
+            )
+            for row in task_rows:
+                by_session[row[0]].append(list(row[1:]))
+            for row in threads:
+                record = [list(row[1:]), by_session[row.id]]
+                out.write(json.dumps(record, default=_encode) + "\n")
+                tasks += len(by_session[row.id])
+            sessions += len(threads)
+    return sessions, tasks
+
+
+def _decoder(names: List[str], columns) -> List:
+    """Per exported column: the target column name and a value converter."""
+    by_name = {column.name: column for column in columns}
+    decoders = []
+    for name in names:
+        column = by_name.get(name)
+        if column is None:
+            decoders.append(None)  # Column no longer exists; dropped
+        elif isinstance(column.type, DateTime):
+            decoders.append(
+                (name, lambda v: datetime.datetime.fromisoformat(v) if v else None)
+            )
+        else:
+            decoders.append((name, lambda v: v))
+    return decoders
+
+
+def _decode(decoders: List, values: List) -> Dict:
+    return {
+        decoder[0]: decoder[1](value)
+        for decoder, value in zip(decoders, values)
+        if decoder is not None
+    }
+
+
+def _import_chunk(conn: Connection, records: List[Tuple[Dict, List[Dict]]]) -> int:
+    """Insert a chunk of sessions, skipping thread ids that already exist."""
+    thread_ids = [thread["thread_id"] for thread, _ in records]
+    existing = set(
+        conn.scalars(select(Thread.thread_id).filter(Thread.thread_id.in_(thread_ids)))
+    )
+    new = [
+        (thread, tasks)
+        for thread, tasks in records
+        if thread["thread_id"] not in existing
+    ]
+    if not new:
+        return 0
+    session_ids = dict(
+        conn.execute(
+            insert(Thread).returning(Thread.thread_id, Thread.id),
+            [thread for thread, _ in new],
+        ).all()
+    )
+    task_rows = [
+        {**task, "session_id": session_ids[thread["thread_id"]]}
+        for thread, tasks in new
+        for task in tasks
+    ]
+    for start in range(0, len(task_rows), BULK_CHUNK):
+        conn.execute(insert(Task), task_rows[start : start + BULK_CHUNK])
+    return len(new)
+
+
+def import_sessions(
+    path: str, chunk_size: int = BULK_CHUNK, engine: Optional[Engine] = None
+) -> Tuple[int, int]:
+    """
+    Load sessions written by export_sessions into a database.
+
+    Sessions whose thread id already exists in the target are skipped, so an
+    interrupted import can simply be run again. Columns the target schema no
+    longer has are dropped; columns missing from the file get their defaults.
+
+    Args:
+        path: File written by export_sessions
+        chunk_size: Sessions inserted per transaction
+        engine: Target database (defaults to the configured one)
+
+    Returns:
+        Number of sessions imported and skipped
+    """
+    engine = engine or db.engine
+    upgrade_schema(engine)
+    imported = skipped = 0
+    with _open(path, "r") as source:
+        header = json.loads(source.readline())
+        if header.get("format") != FORMAT or header.get("version", 0) > VERSION:
+            raise ValueError(f"{path} is not a session export this version can read")
+        thread_decoders = _decoder(header["thread_columns"], THREAD_COLUMNS)
+        task_decoders = _decoder(header["task_columns"], TASK_COLUMNS)
+
+        chunk = []
+        for line in source:
+            thread_values, task_values = json.loads(line)
+            chunk.append(
+                (
+                    _decode(thread_decoders, thread_values),
+                    [_decode(task_decoders, values) for values in task_values],
+                )
+            )
+            if len(chunk) == chunk_size:
+                with engine.begin() as conn:
+                    added = _import_chunk(conn, chunk)
+                imported, skipped = imported + added, skipped + len(chunk) - added
+                chunk = []
+        if chunk:
+            with engine.begin() as conn:
+                added = _import_chunk(conn, chunk)
+            imported, skipped = imported + added, skipped + len(chunk) - added
+    return imported, skipped
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Export or import sessions and tasks as (gzipped) NDJSON."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export = commands.add_parser("export", help="Write sessions to a file")
+    export.add_argument("path", help="Output file, gzip-compressed if it ends in .gz")
+    export.add_argument(
+        "--status",
+        action="append",
+        help="Only sessions with this status (repeatable)",
+    )
+    export.add_argument(
+        "--since",
+        type=datetime.datetime.fromisoformat,
+        help="Only sessions created at or after this ISO date/time",
+    )
+    export.add_argument(
+        "--until",
+        type=datetime.datetime.fromisoformat,
+        help="Only sessions created before this ISO date/time",
+    )
+    export.add_argument("--chunk-size", type=int, default=1000)
+    export.add_argument("--dsn", help="Source database (default: DATABASE_DSN)")
+
+    load = commands.add_parser("import", help="Load sessions from an export file")
+    load.add_argument("path", help="File written by the export command")
+    load.add_argument("--chunk-size", type=int, default=BULK_CHUNK)
+    load.add_argument("--dsn", help="Target database (default: DATABASE_DSN)")
+    args = parser.parse_args(argv)
+
+    engine = None
+    if args.dsn:
+        engine = create_engine(args.dsn, **db.engine_options(args.dsn))
+        db.configure_engine(engine)
+    if args.command == "export":
+        sessions, tasks = export_sessions(
+            args.path, args.status, args.since, args.until, args.chunk_size, engine
+        )
+        print(f"📦 Exported {sessions} sessions ({tasks} tasks) to {args.path}")
+    else:
+        imported, skipped = import_sessions(args.path, args.chunk_size, engine)
+        print(
+            f"📥 Imported {imported} sessions from {args.path}"
+            f" ({skipped} already present)"
+        )
+
+
+if __name__ == "__main__":
+    main()
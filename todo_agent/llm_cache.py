@@ -0,0 +1,52 @@
+from typing import TYPE_CHECKING, Optional
+
+from sqlalchemy import Column, DateTime, String, Text
+
+from todo_agent.config import settings
+from todo_agent.db import Base
+
+if TYPE_CHECKING:
+    from todo_agent.response_cache import ResponseCache
+
+
+class LLMCacheEntry(Base):
+    __tablename__ = "llm_cache"
+
+    key = Column(String(64), primary_key=True)  # SHA-256 of model + prompt
+    response = Column(Text, nullable=False)  # JSON list of serialized generations
+    created_at = Column(DateTime, nullable=False)
+    accessed_at = Column(DateTime, nullable=False, index=True)
+
+
+_response_cache: Optional["ResponseCache"] = None
+
+
+def get_response_cache() -> "ResponseCache":
+    """
+    Process-wide response cache shared by the planner and the executor.
+
+    The cache class is a LangChain BaseCache, so it is imported on first use;
+    the table above can be created and upgraded without loading LangChain.
+    """
+    global _response_cache
+    if _response_cache is None:
+        from todo_agent.response_cache import ResponseCache
+
+        _response_cache = ResponseCache()
+    return _response_cache
+
+
+def model_cache(use_cache: Optional[bool]):
+    """
+    Value for a chat model's ``cache`` field.
+
+    Args:
+        use_cache: True/False to force the cache on or off for this run; None
+            to follow the llm_cache_enabled setting
+
+    Returns:
+        The shared ResponseCache, or False to bypass caching entirely
+    """
+    if use_cache is None:
+        use_cache = settings.llm_cache_enabled
+    return get_response_cache() if use_cache else False
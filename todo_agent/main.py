@@ -1,32 +1,211 @@
+import argparse
 import hashlib
+import threading
+from typing import Any, Callable, Optional
 
-from todo_agent.agents.executor import Executor
-from todo_agent.agents.planner import Planner
-from todo_agent.db import Base, engine
+from todo_agent import crud
+from todo_agent.config import settings
+from todo_agent.db import engine
+from todo_agent.migrations import upgrade_schema
+from todo_agent.plan_cache import get_plan_cache, normalize_objective
 from todo_agent.session_manager import handle_user_input
-from todo_agent.tools.search import create_search_tool
-from todo_agent.tools.web_scraper import web_scraper
 
 
-def main():
-    # Initialize components
-    # db_manager = DatabaseManager("agent_state.db")
-    Base.metadata.create_all(engine)
-    planner = Planner(model="gpt-4o")
-    executor = Executor(model="gpt-4o", tools=[create_search_tool(), web_scraper()])
-    objective = input("\n🎯 Enter your objective: ").strip()
+def make_thread_id(objective: str) -> str:
+    """
+    Thread id for an objective: the SHA-256 hash of its normalized text.
 
+    Objectives differing only in case, punctuation or spacing share a thread,
+    so re-entering one resumes the existing session.
+    """
     # Encode the string to bytes and create SHA-256 hash
-    hash_object = hashlib.sha256(objective.encode("utf-8"))
+    hash_object = hashlib.sha256(normalize_objective(objective).encode("utf-8"))
     # Return the hexadecimal representation
-    thread_id = hash_object.hexdigest()
-    handle_user_input(
-        thread_id=thread_id,
-        objective=objective,
-        planner_agent=planner,
-        executor_agent=executor,
+    return hash_object.hexdigest()
+
+
+def resolve_thread_id(objective: str) -> str:
+    """
+    Thread id to use for an objective, keeping sessions created before
+    objectives were normalized (their id hashes the raw text) resumable.
+    """
+    legacy_id = hashlib.sha256(objective.encode("utf-8")).hexdigest()
+    if crud.get_session_by_thread(legacy_id):
+        return legacy_id
+    return make_thread_id(objective)
+
+
+class LazyAgent:
+    """
+    Builds an agent the first time it is used.
+
+    Attribute access is forwarded to the agent, so a LazyAgent can be passed
+    wherever a Planner or Executor is expected. A run that never plans or
+    executes, such as resuming a completed session, never builds it and never
+    imports LangChain.
+    """
+
+    def __init__(self, factory: Callable[[], Any]):
+        self._factory = factory
+        self._agent = None
+        self._lock = threading.Lock()
+
+    @property
+    def built(self) -> bool:
+        return self._agent is not None
+
+    def get(self):
+        """The agent, built on the first call."""
+        with self._lock:
+            if self._agent is None:
+                self._agent = self._factory()
+        return self._agent
+
+    def __getattr__(self, name: str):
+        return getattr(self.get(), name)
+
+
+def _build_planner(cache: Optional[bool]):
+    from todo_agent.agents.planner import Planner
+    from todo_agent.checkpoints import get_checkpointer
+
+    return Planner(
+        model=settings.planner_model, cache=cache, checkpointer=get_checkpointer()
+    )
+
+
+def _build_executor(cache: Optional[bool], stream: Optional[bool]):
+    from todo_agent.agents.executor import Executor
+    from todo_agent.checkpoints import get_checkpointer
+    from todo_agent.tools.search import create_search_tool
+    from todo_agent.tools.web_scraper import web_scraper
+
+    return Executor(
+        model=settings.executor_model,
+        escalation_model=settings.executor_escalation_model or None,
+        tools=[create_search_tool(cache=cache), web_scraper(cache=cache)],
+        cache=cache,
+        stream=stream,
+        checkpointer=get_checkpointer(),
     )
 
 
+def build_agents(cache: Optional[bool] = None, stream: Optional[bool] = None):
+    """
+    Create the planner and executor agents used for a run.
+
+    Both are LazyAgents: each is built, and LangChain imported, only when the
+    session first needs to plan or execute.
+
+    Args:
+        cache: Force the LLM response and tool caches on/off (None follows settings)
+        stream: Force streaming execution on/off (None follows settings)
+    """
+    planner = LazyAgent(lambda: _build_planner(cache))
+    executor = LazyAgent(lambda: _build_executor(cache, stream))
+    return planner, executor
+
+
+def print_run_stats(planner: LazyAgent, executor: LazyAgent, cache: bool):
+    """Print cache, rate limit, routing and compaction counters of the agents."""
+    agents_ran = planner.built or executor.built
+    if agents_ran and cache and settings.llm_cache_enabled:
+        from todo_agent.llm_cache import get_response_cache
+
+        stats = get_response_cache().stats()
+        print(f"\n🗄️  LLM cache: {stats['hits']} hits, {stats['misses']} misses")
+
+    plan_cache = get_plan_cache()
+    if plan_cache is not None and plan_cache.hits + plan_cache.misses:
+        stats = plan_cache.stats()
+        print(
+            f"🗺️  Plan cache: {stats['hits']} hits, {stats['misses']} misses "
+            f"({stats['hit_rate']:.0%} hit rate)"
+        )
+
+    if not agents_ran:
+        return
+    from todo_agent.rate_limit import limiters
+
+    for limiter in limiters():
+        stats = limiter.stats()
+        if stats["throttled"] or stats["retries"]:
+            print(
+                f"⏱️  {limiter.name}: {stats['throttled']} calls throttled, "
+                f"{stats['retries']} retries"
+            )
+
+    if executor.built:
+        routes = executor.route_stats()
+        if len(routes) > 1:
+            print(f"🧭 Executor routes ({executor.escalations} escalations):")
+            for route, stats in routes.items():
+                print(
+                    f"   {route} ({stats['model']}): {stats['attempts']} attempts, "
+                    f"{stats['failures']} failed, {stats['mean_ms'] / 1000:.1f}s mean"
+                )
+        if executor.compaction is not None:
+            stats = executor.compaction.stats()
+            if stats["compacted"] or stats["superseded"]:
+                print(
+                    f"✂️  Tool outputs: {stats['tokens_before']} → "
+                    f"{stats['tokens_after']} tokens ({stats['compacted']} compacted), "
+                    f"{stats['superseded_tokens']} tokens of superseded results "
+                    f"not re-sent"
+                )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Plan and execute an objective.")
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Bypass the LLM response, tool and plan caches and task result reuse "
+        "for this run",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Show executor tokens and tool calls live and save partial results",
+    )
+    parser.add_argument(
+        "--speculate",
+        action="store_true",
+        help="Run the next tasks' first searches while earlier tasks execute",
+    )
+    args = parser.parse_args(argv)
+
+    if args.speculate:
+        settings.speculative_prefetch = True
+    if args.no_cache:
+        # A fresh run plans and executes every task from scratch too
+        settings.plan_cache_enabled = False
+        settings.task_memo_enabled = False
+
+    # Initialize components
+    upgrade_schema(engine)
+    planner, executor = build_agents(
+        cache=False if args.no_cache else None, stream=True if args.stream else None
+    )
+    objective = input("\n🎯 Enter your objective: ").strip()
+
+    thread_id = resolve_thread_id(objective)
+    try:
+        handle_user_input(
+            thread_id=thread_id,
+            objective=objective,
+            planner_agent=planner,
+            executor_agent=executor,
+        )
+    except KeyboardInterrupt:
+        # Interrupted tasks stay in_progress; the same objective resumes them
+        print("⏸️  Interrupted: enter the same objective again to resume")
+        return
+
+    print_run_stats(planner, executor, cache=not args.no_cache)
+    if settings.metrics_enabled:
+        print(f"📊 Performance report: python -m todo_agent.report {thread_id}")
+
+
 if __name__ == "__main__":
     main()
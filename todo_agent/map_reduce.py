@@ -0,0 +1,87 @@
+from typing import Dict, List
+
+from todo_agent.config import settings
+from todo_agent.context import ContextStore, truncate
+
+
+def is_map_task(task: Dict) -> bool:
+    """Whether a task fans out over a list of items instead of running itself."""
+    return bool(task.get("items"))
+
+
+def expand_map_tasks(tasks: List[Dict]) -> List[Dict]:
+    """
+    Turn every map task of a plan into a parent task plus one subtask per item.
+
+    Subtasks get ids after the last id of the plan, the map task's
+    dependencies and complexity, and parent_id set to the map task. They are
+    independent of each other, so the scheduler runs them in parallel. The map
+    task itself then depends on its subtasks: once they all completed it only
+    merges their results (see merge_results), which the tasks depending on
+    it, the reduce steps, receive as context.
+
+    Items beyond settings.map_max_items are dropped.
+
+    Args:
+        tasks: Plan task dicts; map tasks carry a non-empty "items" list
+
+    Returns:
+        Task dicts to store, subtasks included
+    """
+    next_id = max((task["id"] for task in tasks), default=0) + 1
+    expanded = []
+    subtasks = []
+    for task in tasks:
+        if not is_map_task(task):
+            expanded.append(task)
+            continue
+        items = list(dict.fromkeys(task["items"]))
+        if len(items) > settings.map_max_items:
+            print(
+                f"⚠️  Task #{task['id']}: keeping the first {settings.map_max_items} "
+                f"of {len(items)} items"
+            )
+            items = items[: settings.map_max_items]
+        children = [
+            {
+                "id": next_id + n,
+                "title": f"{task['title']}: {item}",
+                "content": f"{task['content']}\n\nItem: {item}",
+                "dependencies": list(task.get("dependencies") or []),
+                "complexity": task.get("complexity"),
+                "parent_id": task["id"],
+            }
+            for n, item in enumerate(items)
+        ]
+        next_id += len(children)
+        expanded.append(
+            {
+                **task,
+                "items": items,
+                "dependencies": sorted(
+                    {*(task.get("dependencies") or []), *(c["id"] for c in children)}
+                ),
+            }
+        )
+        subtasks.extend(children)
+    return expanded + subtasks
+
+
+def merge_results(task: Dict, context: ContextStore) -> str:
+    """
+    Merge the results of a map task's subtasks, in item order.
+
+    Every subtask gets an equal share of ContextStore.map_token_limit, so the
+    merged result fits a reduce step's prompt however many items there are.
+    """
+    subtasks = [
+        entry
+        for step_id in task["dependencies"]
+        if (entry := context.get(step_id)) and entry.get("parent_id") == task["id"]
+    ]
+    # Leave room for the "### title" line of every subtask
+    share = max(context.map_token_limit // max(len(subtasks), 1) - 20, 10)
+    return "\n\n".join(
+        f"### {entry['title']}\n{truncate(entry['result'], share)}"
+        for entry in subtasks
+    )
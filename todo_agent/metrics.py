@@ -0,0 +1,399 @@
+import contextvars
+import datetime
+import functools
+import hashlib
+import inspect
+import json
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Float,
+    Integer,
+    String,
+    Text,
+    insert,
+    or_,
+    select,
+)
+
+from todo_agent.config import settings
+from todo_agent.db import Base, SessionLocal, get_async_sessionmaker
+
+# USD per million (input, output) tokens, matched by longest model name prefix
+MODEL_PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1": (2.00, 8.00),
+    "gpt-4-turbo": (10.00, 30.00),
+    "gpt-4": (30.00, 60.00),
+    "gpt-3.5-turbo": (0.50, 1.50),
+}
+
+_thread_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    "metrics_thread_id", default=None
+)
+_task_id: contextvars.ContextVar[Optional[int]] = contextvars.ContextVar(
+    "metrics_task_id", default=None
+)
+_span_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    "metrics_span_id", default=None
+)
+
+
+class Metric(Base):
+    __tablename__ = "metrics"
+
+    id = Column(Integer, primary_key=True)
+    thread_id = Column(String(100), nullable=True, index=True)
+    task_id = Column(Integer, nullable=True)  # None for session-level work
+    span_id = Column(String(32), nullable=False)
+    parent_id = Column(String(32), nullable=True)
+    name = Column(String(200), nullable=False)  # e.g. Executor.execute_step
+    kind = Column(String(20), nullable=False)  # span, llm, tool, db
+    status = Column(String(20), nullable=False, default="ok")  # ok, error
+    started_at = Column(DateTime, nullable=False)
+    duration_ms = Column(Float, nullable=False)
+    model = Column(String(100), nullable=True)
+    input_tokens = Column(Integer, nullable=True)
+    output_tokens = Column(Integer, nullable=True)
+    attributes = Column(Text, nullable=True)  # JSON object
+
+    def to_dict(self):
+        return {
+            "thread_id": self.thread_id,
+            "task_id": self.task_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "status": self.status,
+            "started_at": self.started_at.isoformat(),
+            "duration_ms": self.duration_ms,
+            "model": self.model,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "attributes": json.loads(self.attributes) if self.attributes else {},
+        }
+
+
+class Recorder:
+    """
+    In-memory buffer of finished spans.
+
+    Recording only appends to a list, so instrumentation stays cheap on the
+    hot path; the buffer is written to the metrics table in one batch by
+    flush() / aflush(), typically once per session.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._records: List[Dict] = []
+
+    def record(
+        self,
+        name: str,
+        kind: str,
+        started_at: datetime.datetime,
+        duration_ms: float,
+        status: str = "ok",
+        span_id: Optional[str] = None,
+        parent_id: Optional[str] = None,
+        thread_id: Optional[str] = None,
+        task_id: Optional[int] = None,
+        model: Optional[str] = None,
+        input_tokens: Optional[int] = None,
+        output_tokens: Optional[int] = None,
+        attributes: Optional[Dict] = None,
+    ):
+        if not settings.metrics_enabled:
+            return
+        row = {
+            "thread_id": thread_id or _thread_id.get(),
+            "task_id": task_id if task_id is not None else _task_id.get(),
+            "span_id": span_id or uuid.uuid4().hex,
+            "parent_id": parent_id or _span_id.get(),
+            "name": name,
+            "kind": kind,
+            "status": status,
+            "started_at": started_at,
+            "duration_ms": duration_ms,
+            "model": model,
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "attributes": json.dumps(attributes) if attributes else None,
+        }
+        with self._lock:
+            self._records.append(row)
+
+    def drain(self) -> List[Dict]:
+        with self._lock:
+            records, self._records = self._records, []
+        return records
+
+    def flush(self):
+        """Write buffered records to the metrics table."""
+        records = self.drain()
+        if not records:
+            return
+        db = SessionLocal()
+        try:
+            db.execute(insert(Metric), records)
+            db.commit()
+        finally:
+            db.close()
+
+    async def aflush(self):
+        """Async version of flush."""
+        records = self.drain()
+        if not records:
+            return
+        async with get_async_sessionmaker()() as db:
+            await db.execute(insert(Metric), records)
+            await db.commit()
+
+
+recorder = Recorder()
+
+
+@contextmanager
+def bind(thread_id: Optional[str] = None, task_id: Optional[int] = None):
+    """Attribute every span recorded inside the block to a session and/or task."""
+    tokens = []
+    if thread_id is not None:
+        tokens.append((_thread_id, _thread_id.set(thread_id)))
+    if task_id is not None:
+        tokens.append((_task_id, _task_id.set(task_id)))
+    try:
+        yield
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+
+
+@contextmanager
+def session(thread_id: str):
+    """Bind a session for the block and flush its metrics when it ends."""
+    with bind(thread_id=thread_id):
+        try:
+            yield
+        finally:
+            recorder.flush()
+
+
+@asynccontextmanager
+async def asession(thread_id: str):
+    """Async version of session."""
+    with bind(thread_id=thread_id):
+        try:
+            yield
+        finally:
+            await recorder.aflush()
+
+
+@contextmanager
+def span(name: str, kind: str = "span", **attributes):
+    """
+    Time a block of code as a span.
+
+    Spans nest: LLM calls, tool calls and inner spans started inside the block
+    record it as their parent.
+
+    Args:
+        name: Span name, e.g. "Planner.create_todo_list"
+        kind: One of span, llm, tool, db
+        **attributes: Extra JSON-serializable attributes to store with the span
+
+    Yields:
+        The attributes dict, so the block can add results known only at the end
+    """
+    span_id = uuid.uuid4().hex
+    parent_id = _span_id.get()
+    token = _span_id.set(span_id)
+    started_at = datetime.datetime.now()
+    start = time.perf_counter()
+    status = "ok"
+    try:
+        yield attributes
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        _span_id.reset(token)
+        recorder.record(
+            name,
+            kind,
+            started_at,
+            (time.perf_counter() - start) * 1000,
+            status=status,
+            span_id=span_id,
+            parent_id=parent_id,
+            attributes=attributes,
+        )
+
+
+def timed(name: Optional[str] = None, kind: str = "span"):
+    """
+    Decorator that records every call of a function (sync or async) as a span.
+
+    The span name defaults to the qualified name, prefixed with the module for
+    plain functions, e.g. "crud.create_session" or "Executor.execute_step".
+    """
+
+    def decorator(fn):
+        span_name = name or fn.__qualname__
+        if "." not in span_name:
+            span_name = f"{fn.__module__.rsplit('.', 1)[-1]}.{span_name}"
+
+        if inspect.iscoroutinefunction(fn):
+
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(span_name, kind):
+                    return await fn(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(span_name, kind):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+@functools.lru_cache
+def callback_handler():
+    """
+    The shared LangChain callback handler.
+
+    Created on first use, so only runs that call an agent import LangChain.
+    """
+    from todo_agent.callbacks import MetricsCallbackHandler
+
+    return MetricsCallbackHandler()
+
+
+def with_metrics(config: Optional[Dict]) -> Dict:
+    """Copy of a run config with the metrics callback handler attached."""
+    config = dict(config or {})
+    if not settings.metrics_enabled:
+        return config
+    handler = callback_handler()
+    callbacks = config.get("callbacks")
+    if callbacks is None:
+        config["callbacks"] = [handler]
+    elif isinstance(callbacks, list):
+        config["callbacks"] = [*callbacks, handler]
+    else:
+        # A callback manager: add the handler as inheritable
+        callbacks = callbacks.copy()
+        callbacks.add_handler(handler, inherit=True)
+        config["callbacks"] = callbacks
+    return config
+
+
+def cost(model: Optional[str], input_tokens: int, output_tokens: int) -> float:
+    """Estimated USD cost of a model call, 0 for unknown models."""
+    if not model:
+        return 0.0
+    matches = [prefix for prefix in MODEL_PRICES if model.startswith(prefix)]
+    if not matches:
+        return 0.0
+    input_price, output_price = MODEL_PRICES[max(matches, key=len)]
+    return (input_tokens * input_price + output_tokens * output_price) / 1_000_000
+
+
+def get_metrics(thread_id: str) -> List[Dict]:
+    """All recorded spans of a session, oldest first."""
+    db = SessionLocal()
+    try:
+        rows = db.scalars(
+            select(Metric)
+            .filter(Metric.thread_id == thread_id)
+            .order_by(Metric.started_at, Metric.id)
+        )
+        return [row.to_dict() for row in rows]
+    finally:
+        db.close()
+
+
+def get_route_metrics() -> List[Dict]:
+    """Executor route spans of every session and the LLM calls made in them."""
+    db = SessionLocal()
+    try:
+        routes = select(Metric.span_id).filter(Metric.name == "Executor.route")
+        rows = db.scalars(
+            select(Metric)
+            .filter(or_(Metric.name == "Executor.route", Metric.parent_id.in_(routes)))
+            .order_by(Metric.started_at, Metric.id)
+        )
+        return [row.to_dict() for row in rows]
+    finally:
+        db.close()
+
+
+def to_otel(thread_id: str, records: List[Dict]) -> Dict:
+    """
+    Convert spans into an OTLP/JSON trace export (ExportTraceServiceRequest).
+
+    The trace id is derived from the thread id, so all spans of a session form
+    one trace.
+    """
+    trace_id = hashlib.sha256(thread_id.encode("utf-8")).hexdigest()[:32]
+
+    def attribute(key: str, value: Any) -> Dict:
+        if isinstance(value, bool):
+            return {"key": key, "value": {"boolValue": value}}
+        if isinstance(value, int):
+            return {"key": key, "value": {"intValue": str(value)}}
+        if isinstance(value, float):
+            return {"key": key, "value": {"doubleValue": value}}
+        return {"key": key, "value": {"stringValue": str(value)}}
+
+    spans = []
+    for record in records:
+        start = datetime.datetime.fromisoformat(record["started_at"]).timestamp()
+        start_ns = int(start * 1e9)
+        attributes = {
+            "todo_agent.thread_id": thread_id,
+            "todo_agent.task_id": record["task_id"],
+            "todo_agent.kind": record["kind"],
+            "gen_ai.request.model": record["model"],
+            "gen_ai.usage.input_tokens": record["input_tokens"],
+            "gen_ai.usage.output_tokens": record["output_tokens"],
+            **record["attributes"],
+        }
+        spans.append(
+            {
+                "traceId": trace_id,
+                "spanId": record["span_id"][:16],
+                "parentSpanId": (record["parent_id"] or "")[:16],
+                "name": record["name"],
+                "kind": 3 if record["kind"] in ("llm", "tool") else 1,
+                "startTimeUnixNano": str(start_ns),
+                "endTimeUnixNano": str(start_ns + int(record["duration_ms"] * 1e6)),
+                "attributes": [
+                    attribute(key, value)
+                    for key, value in attributes.items()
+                    if value is not None
+                ],
+                "status": {"code": 2 if record["status"] == "error" else 1},
+            }
+        )
+    return {
+        "resourceSpans": [
+            {
+                "resource": {"attributes": [attribute("service.name", "todo-agent")]},
+                "scopeSpans": [{"scope": {"name": "todo_agent"}, "spans": spans}],
+            }
+        ]
+    }
@@ -0,0 +1,52 @@
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+
+from todo_agent import (  # noqa: F401  (registers the models on Base)
+    crud,
+    llm_cache,
+    metrics,
+    plan_cache,
+)
+from todo_agent.db import Base
+
+
+def upgrade_schema(engine: Engine):
+    """
+    Bring an existing database up to date with the current models.
+
+    Creates missing tables and adds columns and indexes that were introduced
+    after the database was first created. Columns are added as nullable, so
+    existing rows keep working. Every step checks the current schema first,
+    so running it again is a no-op.
+
+    A unique index that existing rows violate is skipped with a warning
+    instead of failing the upgrade; remove the duplicates and run it again.
+
+    Args:
+        engine: SQLAlchemy engine bound to the database to upgrade
+    """
+    Base.metadata.create_all(engine)
+
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(
+                    text(
+                        f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"
+                    )
+                )
+
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            # One transaction per index, so a failing one doesn't undo the rest
+            try:
+                with engine.begin() as conn:
+                    index.create(conn, checkfirst=True)
+            except IntegrityError as e:
+                print(f"⚠️  Could not create unique index {index.name}: {e.orig}")
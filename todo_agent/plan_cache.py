@@ -0,0 +1,317 @@
+import hashlib
+import random
+import re
+import threading
+import unicodedata
+from typing import TYPE_CHECKING, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import Column, Integer, String, insert, select
+
+from todo_agent import metrics
+from todo_agent.config import settings
+from todo_agent.crud import BULK_CHUNK, Task, Thread
+from todo_agent.db import Base, SessionLocal
+
+if TYPE_CHECKING:
+    from todo_agent.agents.planner import TodoList
+
+# MinHash signature length, split into LSH bands of ROWS values each
+NUM_PERM = 64
+ROWS = 4
+_MERSENNE_PRIME = (1 << 61) - 1
+_rng = random.Random(1303)
+_PERMUTATIONS = [
+    (_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME))
+    for _ in range(NUM_PERM)
+]
+
+
+class PlanIndexEntry(Base):
+    __tablename__ = "plan_index"
+
+    id = Column(Integer, primary_key=True)
+    # Hash of the normalized objective or of one LSH band of its MinHash
+    key = Column(String(32), nullable=False, index=True)
+    thread_id = Column(String(100), nullable=False, index=True)
+
+
+def normalize_objective(objective: str) -> str:
+    """
+    Canonical form of an objective: case, accents-compatibility, punctuation
+    and whitespace differences are dropped ("Plan a 3-day trip to Rome!" and
+    "plan a 3 day trip to rome" normalize the same). Symbols that change the
+    meaning of a term, like "C++" or "C#", are kept.
+    """
+    text = unicodedata.normalize("NFKC", objective).lower()
+    text = re.sub(r"[^\w\s+#$%&@]", " ", text)
+    return " ".join(text.split())
+
+
+def shingles(normalized: str) -> Set[str]:
+    """Word unigrams and bigrams of a normalized objective."""
+    words = normalized.split()
+    return set(words) | {f"{a} {b}" for a, b in zip(words, words[1:])}
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def minhash(items: Set[str]) -> List[int]:
+    """MinHash signature of a shingle set."""
+    hashes = [
+        int.from_bytes(hashlib.blake2b(item.encode("utf-8"), digest_size=8).digest())
+        for item in items
+    ] or [0]
+    return [
+        min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in _PERMUTATIONS
+    ]
+
+
+class PlanCache:
+    """
+    Index of stored plans by objective, for reusing a plan instead of planning.
+
+    Sessions of the same normalized objective already share a thread id (see
+    main.make_thread_id), so they resume rather than re-plan. This cache covers
+    the rest: near-duplicate wordings ("plan a 3 day trip to rome please") and
+    sessions stored before objectives were normalized. Candidates come from a
+    MinHash/LSH index over word shingles, stored in the plan_index table so a
+    lookup only reads the sessions sharing a band with the objective, and are
+    accepted when their exact Jaccard similarity reaches the threshold; with
+    threshold 1.0 only identical normalized objectives match.
+
+    Only plans whose sessions had no failed task are reused.
+    """
+
+    def __init__(self, threshold: Optional[float] = None):
+        self.threshold = (
+            settings.plan_cache_similarity_threshold if threshold is None else threshold
+        )
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._indexed = False
+
+    @staticmethod
+    def _exact_key(normalized: str) -> str:
+        return hashlib.blake2b(
+            f"={normalized}".encode("utf-8"), digest_size=16
+        ).hexdigest()
+
+    @staticmethod
+    def _band_keys(signature: List[int]) -> List[str]:
+        return [
+            hashlib.blake2b(
+                repr((i, *signature[i : i + ROWS])).encode("utf-8"), digest_size=16
+            ).hexdigest()
+            for i in range(0, len(signature), ROWS)
+        ]
+
+    def _keys(self, objective: str) -> List[str]:
+        normalized = normalize_objective(objective)
+        return [
+            self._exact_key(normalized),
+            *self._band_keys(minhash(shingles(normalized))),
+        ]
+
+    def _index_stored(self):
+        """
+        Index stored sessions that have a plan, no failed task and no index
+        rows yet, e.g. ones written before the index existed or by bulk
+        imports. Runs once per process; afterwards there is nothing left to
+        index unless sessions are added behind the cache's back.
+        """
+        with self._lock:
+            if self._indexed:
+                return
+            failed = select(Task.session_id).filter(Task.status == "failed")
+            planned = select(Task.session_id)
+            indexed = select(PlanIndexEntry.thread_id)
+            db = SessionLocal()
+            try:
+                rows = db.execute(
+                    select(Thread.thread_id, Thread.objective).filter(
+                        Thread.id.in_(planned),
+                        Thread.id.not_in(failed),
+                        Thread.thread_id.not_in(indexed),
+                    )
+                ).all()
+                entries = [
+                    {"key": key, "thread_id": thread_id}
+                    for thread_id, objective in rows
+                    for key in self._keys(objective)
+                ]
+                for start in range(0, len(entries), BULK_CHUNK):
+                    db.execute(
+                        insert(PlanIndexEntry), entries[start : start + BULK_CHUNK]
+                    )
+                db.commit()
+            finally:
+                db.close()
+            self._indexed = True
+
+    def add(self, thread_id: str, objective: str):
+        """Index a session whose plan just ran successfully."""
+        db = SessionLocal()
+        try:
+            if db.scalar(
+                select(PlanIndexEntry.id)
+                .filter(PlanIndexEntry.thread_id == thread_id)
+                .limit(1)
+            ):
+                return
+            db.execute(
+                insert(PlanIndexEntry),
+                [{"key": key, "thread_id": thread_id} for key in self._keys(objective)],
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    def match(
+        self, objective: str, exclude: Optional[str] = None
+    ) -> Optional[Tuple[str, float]]:
+        """
+        Find the stored session whose objective is most similar to this one.
+
+        Only the sessions sharing the objective's exact key or one of its LSH
+        bands are read from the database.
+
+        Args:
+            objective: Objective to plan
+            exclude: Thread id to ignore (the session being planned)
+
+        Returns:
+            Tuple of thread id and Jaccard similarity, or None below the threshold
+        """
+        self._index_stored()
+        normalized = normalize_objective(objective)
+        items = shingles(normalized)
+        keys = [self._exact_key(normalized)]
+        if self.threshold < 1.0:
+            keys += self._band_keys(minhash(items))
+
+        # A session whose plan failed since it was indexed is no longer reused
+        failed = select(Task.session_id).filter(Task.status == "failed")
+        db = SessionLocal()
+        try:
+            rows = db.execute(
+                select(Thread.thread_id, Thread.objective)
+                .join(PlanIndexEntry, PlanIndexEntry.thread_id == Thread.thread_id)
+                .filter(PlanIndexEntry.key.in_(keys), Thread.id.not_in(failed))
+                .group_by(Thread.id)
+                .order_by(Thread.id.desc())
+            ).all()
+        finally:
+            db.close()
+        candidates = {
+            thread_id: objective
+            for thread_id, objective in rows
+            if thread_id != exclude
+        }
+        # Newest session first among exact matches
+        for thread_id, objective in candidates.items():
+            if normalize_objective(objective) == normalized:
+                return thread_id, 1.0
+        if self.threshold >= 1.0:
+            return None
+
+        scored = [
+            (jaccard(items, shingles(normalize_objective(objective))), thread_id)
+            for thread_id, objective in candidates.items()
+        ]
+        if not scored:
+            return None
+        similarity, thread_id = max(scored)
+        if similarity < self.threshold:
+            return None
+        return thread_id, similarity
+
+    def lookup(self, objective: str, exclude: Optional[str] = None) -> Optional[Dict]:
+        """
+        Stored plan for an objective, in the shape of a planner response.
+
+        Counts hits and misses and records the lookup as a metrics span.
+
+        Returns:
+            Dict with "structured_response" (a TodoList) and "reused_from" (the
+            source thread id), or None on a miss
+        """
+        with metrics.span("plan_cache.lookup") as attributes:
+            found = self.match(objective, exclude)
+            plan = load_plan(found[0]) if found else None
+            attributes["hit"] = plan is not None
+            with self._lock:
+                if plan is None:
+                    self.misses += 1
+                    return None
+                self.hits += 1
+            attributes["similarity"] = found[1]
+            attributes["reused_from"] = found[0]
+        return {"structured_response": plan, "reused_from": found[0]}
+
+    def stats(self) -> Dict[str, float]:
+        """Hits, misses and hit rate for this process."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+def load_plan(thread_id: str) -> Optional["TodoList"]:
+    """The TodoList stored for a session, or None if it has no tasks."""
+    # The planner module loads LangChain; only import it once a plan is reused
+    from todo_agent.agents.planner import Task as PlanTask
+    from todo_agent.agents.planner import TodoList
+
+    db = SessionLocal()
+    try:
+        rows = db.scalars(
+            select(Task)
+            .join(Thread, Task.session_id == Thread.id)
+            .filter(Thread.thread_id == thread_id, Task.status != "replaced")
+            .order_by(Task.task_id)
+        ).all()
+        tasks = [task.to_dict() for task in rows]
+    finally:
+        db.close()
+    # Map subtasks are expanded again from their map task's items
+    subtask_ids = {task["id"] for task in tasks if task["parent_id"] is not None}
+    tasks = [task for task in tasks if task["parent_id"] is None]
+    if not tasks:
+        return None
+    plan_ids = [task["id"] for task in tasks]
+    return TodoList(
+        tasks=[
+            PlanTask(
+                id=task["id"],
+                title=task["title"],
+                content=task["content"],
+                # Plans stored before dependencies existed ran sequentially
+                dependencies=[d for d in task["dependencies"] if d not in subtask_ids]
+                if task["dependencies"] is not None
+                else [i for i in plan_ids if i < task["id"]],
+                complexity=task["complexity"],
+                items=task["items"] or [],
+            )
+            for task in tasks
+        ]
+    )
+
+
+_plan_cache: Optional[PlanCache] = None
+
+
+def get_plan_cache() -> Optional[PlanCache]:
+    """Process-wide plan cache, or None when it is disabled."""
+    global _plan_cache
+    if not settings.plan_cache_enabled:
+        return None
+    if _plan_cache is None:
+        _plan_cache = PlanCache()
+    return _plan_cache
@@ -0,0 +1,167 @@
+import asyncio
+import contextvars
+import json
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Union
+
+from todo_agent import metrics
+from todo_agent.config import settings
+from todo_agent.context import ContextStore, truncate
+
+SEARCH_TOOL = "tavily_search"
+# Tavily rejects longer queries
+MAX_QUERY_CHARS = 400
+PREFETCH_HEADER = "Search results gathered in advance for this task"
+
+
+def search_query(task: Dict) -> str:
+    """Search query for a task, derived from its content."""
+    return " ".join(task["content"].split())[:MAX_QUERY_CHARS]
+
+
+def upcoming_tasks(
+    remaining: Dict[int, Dict],
+    dependencies: Dict[int, List[int]],
+    completed: ContextStore,
+    running: Iterable[int],
+) -> List[Dict]:
+    """
+    Remaining tasks that become ready once the running tasks complete.
+
+    These are the tasks worth prefetching: each waits on at least one running
+    task and on nothing that hasn't started yet. Map tasks are left out, as
+    they only merge their subtasks' results.
+    """
+    running = set(running)
+    return [
+        task
+        for task_id, task in remaining.items()
+        if not task.get("items")
+        and any(d in running for d in dependencies[task_id])
+        and all(d in completed or d in running for d in dependencies[task_id])
+    ]
+
+
+def format_prefetched(results: List[Dict]) -> str:
+    """Render prefetched tool results for the executor prompt."""
+    lines = [
+        f"{PREFETCH_HEADER}.",
+        "Use them instead of repeating these searches; search again only for "
+        "anything they don't cover:",
+    ]
+    for result in results:
+        lines.append(f"- {result['tool']}({result['query']!r}) returned:")
+        lines.append(result["content"])
+    return "\n".join(lines) + "\n\n"
+
+
+def _usable(result) -> bool:
+    return isinstance(result, dict) and "error" not in result
+
+
+class Prefetcher:
+    """
+    Speculatively runs the first search of upcoming tasks.
+
+    While a task executes, the tasks waiting on it are already known from the
+    plan, so their search can run in the background, hiding the tool latency
+    behind the running task's model calls. When a task starts, a finished,
+    successful search is committed: it goes into the task's prompt. One still
+    in flight, failed, or belonging to a task that never runs is discarded;
+    through the tool cache, an identical search by the agent still reuses it.
+    """
+
+    def __init__(self, tools: List, max_workers: Optional[int] = None):
+        self.tool = next((tool for tool in tools if tool.name == SEARCH_TOOL), None)
+        self.max_workers = max_workers or settings.max_parallel_tasks
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._searches: Dict[int, Union[Future, asyncio.Task]] = {}
+        self.started = 0
+        self.used = 0
+        self.discarded = 0
+
+    def _pending(self, tasks: List[Dict]) -> List[Dict]:
+        if self.tool is None:
+            return []
+        return [task for task in tasks if task["id"] not in self._searches]
+
+    def _search(self, task: Dict) -> Dict:
+        query = search_query(task)
+        with metrics.span("prefetch.search", query=query) as attributes:
+            result = self.tool.invoke({"query": query})
+            attributes["ok"] = _usable(result)
+        return result
+
+    async def _asearch(self, task: Dict) -> Dict:
+        query = search_query(task)
+        with metrics.span("prefetch.search", query=query) as attributes:
+            result = await self.tool.ainvoke({"query": query})
+            attributes["ok"] = _usable(result)
+        return result
+
+    def start(self, tasks: List[Dict]):
+        """Start searches for the given tasks on a background thread pool."""
+        for task in self._pending(tasks):
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers)
+            with metrics.bind(task_id=task["id"]):
+                context = contextvars.copy_context()
+            self._searches[task["id"]] = self._pool.submit(
+                context.run, self._search, task
+            )
+            self.started += 1
+
+    def astart(self, tasks: List[Dict]):
+        """Start searches for the given tasks as asyncio tasks."""
+        for task in self._pending(tasks):
+            with metrics.bind(task_id=task["id"]):
+                self._searches[task["id"]] = asyncio.create_task(self._asearch(task))
+            self.started += 1
+
+    def take(self, task: Dict) -> Optional[List[Dict]]:
+        """
+        Commit or discard the prefetched search of a task that is starting.
+
+        Returns:
+            Tool results for the executor prompt, or None if there is no
+            finished, successful search
+        """
+        search = self._searches.pop(task["id"], None)
+        if search is None:
+            return None
+        if not search.done() or search.cancelled() or search.exception():
+            search.cancel()
+            self.discarded += 1
+            return None
+        result = search.result()
+        if not _usable(result):
+            self.discarded += 1
+            return None
+        self.used += 1
+        return [
+            {
+                "tool": SEARCH_TOOL,
+                "query": search_query(task),
+                "content": truncate(
+                    json.dumps(result, default=str), settings.context_step_token_limit
+                ),
+            }
+        ]
+
+    def close(self):
+        """Discard every search whose task never started."""
+        for search in self._searches.values():
+            search.cancel()
+            if search.done() and not search.cancelled():
+                # Retrieve the outcome, so failures aren't reported as unhandled
+                search.exception()
+        self.discarded += len(self._searches)
+        self._searches.clear()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def report(self):
+        if self.started:
+            print(
+                f"🔮 Prefetched searches: {self.used} used, {self.discarded} discarded"
+            )
@@ -0,0 +1,386 @@
+import asyncio
+import contextvars
+import email.utils
+import random
+import re
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import openai
+from langchain.agents.middleware import AgentMiddleware
+from langchain_core.rate_limiters import BaseRateLimiter
+from langchain_core.tools import BaseTool
+
+from todo_agent.config import settings
+from todo_agent.context import estimate_tokens
+
+# Error statuses worth retrying: rate limits and transient server failures
+RETRYABLE_STATUSES = {408, 429, 500, 502, 503, 504}
+RETRYABLE_ERRORS = (openai.APIConnectionError, openai.APITimeoutError)
+# Tavily tools report HTTP failures as "Error <status>: <detail>"
+_STATUS_IN_MESSAGE = re.compile(r"\bError (\d{3})\b")
+# Approximate tokens of the model request being sent (see RateLimitMiddleware)
+_request_tokens: contextvars.ContextVar[int] = contextvars.ContextVar(
+    "request_tokens", default=0
+)
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled continuously at rate_per_minute.
+
+    Callers reserve what they need and sleep until it is available; the balance
+    may go negative, so concurrent callers queue up behind each other instead
+    of all waking at the same moment.
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float = 1.0) -> float:
+        """Take amount tokens; returns the seconds to wait before using them."""
+        amount = min(amount, self.capacity)
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            self._tokens -= amount
+            return max(0.0, -self._tokens / self.rate)
+
+
+class ProviderLimiter:
+    """
+    Request and token budgets for one provider or provider model, shared by the
+    whole process.
+
+    Besides the buckets, a rate-limit response pauses every caller of the
+    provider until its Retry-After has passed, so concurrent sessions back off
+    together instead of each discovering the limit on its own.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        requests_per_minute: Optional[int] = None,
+        tokens_per_minute: Optional[int] = None,
+    ):
+        self.name = name
+        self.requests = (
+            TokenBucket(requests_per_minute) if requests_per_minute else None
+        )
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self.throttled = 0  # Calls that had to wait for the buckets or a pause
+        self.retries = 0
+
+    def _wait(self, tokens: int) -> float:
+        wait = max(0.0, self._paused_until - time.monotonic())
+        if self.requests:
+            wait = max(wait, self.requests.reserve())
+        if self.tokens and tokens:
+            wait = max(wait, self.tokens.reserve(tokens))
+        if wait:
+            self.throttled += 1
+        return wait
+
+    def acquire(self, tokens: int = 0):
+        """Block until a request using about this many tokens may be sent."""
+        wait = self._wait(tokens)
+        if wait:
+            time.sleep(wait)
+
+    async def aacquire(self, tokens: int = 0):
+        """Async version of acquire."""
+        wait = self._wait(tokens)
+        if wait:
+            await asyncio.sleep(wait)
+
+    def pause(self, seconds: float):
+        """Hold back every caller for the given time (after a 429)."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def stats(self) -> Dict[str, int]:
+        return {"throttled": self.throttled, "retries": self.retries}
+
+
+_limiters: Dict[Tuple[str, Optional[str]], ProviderLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def _limit(provider: str, model: Optional[str], budget: str) -> Optional[int]:
+    """A model's budget from <provider>_model_limits, else the provider default."""
+    limits = getattr(settings, f"{provider}_model_limits", {}).get(model, {})
+    if budget in limits:
+        return limits[budget]
+    return getattr(settings, f"{provider}_{budget}", None)
+
+
+def get_limiter(provider: str, model: Optional[str] = None) -> ProviderLimiter:
+    """
+    Process-wide limiter for "openai" or "tavily", sized from settings.
+
+    Providers that limit each model separately (OpenAI) get one limiter per
+    model, so a busy model doesn't hold back calls to another.
+    """
+    key = (provider, model)
+    with _limiters_lock:
+        if key not in _limiters:
+            _limiters[key] = ProviderLimiter(
+                f"{provider} {model}" if model else provider,
+                _limit(provider, model, "requests_per_minute"),
+                _limit(provider, model, "tokens_per_minute"),
+            )
+        return _limiters[key]
+
+
+def limiters() -> List[ProviderLimiter]:
+    """Every limiter created so far in this process."""
+    with _limiters_lock:
+        return list(_limiters.values())
+
+
+def error_status(error: Any) -> Optional[int]:
+    """HTTP status of a provider error, if it carries one."""
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    if status is None:
+        match = _STATUS_IN_MESSAGE.search(str(error))
+        status = int(match.group(1)) if match else None
+    return status
+
+
+def is_retryable(error: Any) -> bool:
+    return isinstance(error, RETRYABLE_ERRORS) or error_status(error) in (
+        RETRYABLE_STATUSES
+    )
+
+
+def retry_after(error: Any) -> Optional[float]:
+    """Seconds the provider asked us to wait, from Retry-After(-ms) headers."""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    if headers.get("retry-after-ms"):
+        try:
+            return float(headers["retry-after-ms"]) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        # An HTTP date
+        date = email.utils.parsedate_to_datetime(value)
+        return max(0.0, date.timestamp() - time.time())
+
+
+def backoff_delay(attempt: int, error: Any) -> float:
+    """
+    Delay before retry number attempt (0-based).
+
+    Honors Retry-After when present, with a little jitter so callers paused
+    together don't all retry at the same instant; otherwise exponential backoff
+    with full jitter.
+    """
+    base = settings.retry_base_delay_seconds
+    requested = retry_after(error)
+    if requested is not None:
+        return min(requested, settings.retry_max_delay_seconds) + random.uniform(
+            0, base
+        )
+    return random.uniform(0, min(settings.retry_max_delay_seconds, base * 2**attempt))
+
+
+def _failure(result: Any) -> Optional[Any]:
+    """The error in a result, for tools that return errors instead of raising."""
+    if isinstance(result, dict) and "error" in result:
+        return result["error"]
+    return None
+
+
+def _backoff(limiter: ProviderLimiter, attempt: int, error: Any) -> float:
+    """Delay before the next attempt; a 429 also pauses the whole provider."""
+    delay = backoff_delay(attempt, error)
+    if error_status(error) == 429:
+        limiter.pause(delay)
+    limiter.retries += 1
+    return delay
+
+
+def call_with_retry(
+    provider: str,
+    call: Callable[[], Any],
+    tokens: int = 0,
+    raise_errors: bool = True,
+    model: Optional[str] = None,
+    acquire: bool = True,
+) -> Any:
+    """
+    Run a provider call under its rate limiter, retrying transient failures.
+
+    Args:
+        provider: Limiter name ("openai", "tavily")
+        call: Zero-argument function making one request
+        tokens: Approximate tokens the request uses, for the token bucket
+        raise_errors: False for tools that return {"error": ...} instead of
+            raising; such results are retried like exceptions
+        model: Model the request goes to, for providers limited per model
+        acquire: False when the call takes its quota itself, like a chat model
+            with a ModelRateLimiter, so that cache hits don't use any
+
+    Returns:
+        The call's result (the last one, once the attempts are used up)
+    """
+    limiter = get_limiter(provider, model)
+    for attempt in range(settings.retry_max_attempts):
+        last = attempt == settings.retry_max_attempts - 1
+        if acquire:
+            limiter.acquire(tokens)
+        try:
+            result = call()
+        except Exception as e:
+            if last or not is_retryable(e):
+                raise
+            error = e
+        else:
+            error = None if raise_errors else _failure(result)
+            if last or error is None or not is_retryable(error):
+                return result
+        time.sleep(_backoff(limiter, attempt, error))
+
+
+async def acall_with_retry(
+    provider: str,
+    call: Callable[[], Awaitable[Any]],
+    tokens: int = 0,
+    raise_errors: bool = True,
+    model: Optional[str] = None,
+    acquire: bool = True,
+) -> Any:
+    """Async version of call_with_retry; call is a zero-argument coroutine function."""
+    limiter = get_limiter(provider, model)
+    for attempt in range(settings.retry_max_attempts):
+        last = attempt == settings.retry_max_attempts - 1
+        if acquire:
+            await limiter.aacquire(tokens)
+        try:
+            result = await call()
+        except Exception as e:
+            if last or not is_retryable(e):
+                raise
+            error = e
+        else:
+            error = None if raise_errors else _failure(result)
+            if last or error is None or not is_retryable(error):
+                return result
+        await asyncio.sleep(_backoff(limiter, attempt, error))
+
+
+def request_tokens(request) -> int:
+    """Rough prompt size of an agent model request, for the token bucket."""
+    text = (request.system_prompt or "") + "".join(
+        str(message.content) for message in request.messages
+    )
+    return estimate_tokens(text)
+
+
+class ModelRateLimiter(BaseRateLimiter):
+    """
+    Takes a chat model's quota from the shared limiter of its model.
+
+    Set as the model's rate_limiter: LangChain calls it after the response
+    cache missed, right before the API request, so cache hits never wait or
+    use quota. The token count comes from RateLimitMiddleware.
+    """
+
+    def __init__(self, provider: str, model: Optional[str] = None):
+        self.provider = provider
+        self.model = model
+
+    def acquire(self, *, blocking: bool = True) -> bool:
+        get_limiter(self.provider, self.model).acquire(_request_tokens.get())
+        return True
+
+    async def aacquire(self, *, blocking: bool = True) -> bool:
+        await get_limiter(self.provider, self.model).aacquire(_request_tokens.get())
+        return True
+
+
+class RateLimitMiddleware(AgentMiddleware):
+    """
+    Retries the model calls of an agent under its model's limiter.
+
+    The quota itself is taken by the model's ModelRateLimiter, only once its
+    response cache missed; the middleware passes it the request's size.
+    """
+
+    def __init__(self, provider: str = "openai", model: Optional[str] = None):
+        super().__init__()
+        self.provider = provider
+        self.model = model
+
+    def wrap_model_call(self, request, handler):
+        token = _request_tokens.set(request_tokens(request))
+        try:
+            return call_with_retry(
+                self.provider, lambda: handler(request), model=self.model, acquire=False
+            )
+        finally:
+            _request_tokens.reset(token)
+
+    async def awrap_model_call(self, request, handler):
+        token = _request_tokens.set(request_tokens(request))
+        try:
+            return await acall_with_retry(
+                self.provider, lambda: handler(request), model=self.model, acquire=False
+            )
+        finally:
+            _request_tokens.reset(token)
+
+
+class RateLimitedTool(BaseTool):
+    """
+    Wraps a provider tool with the provider's limiter and retries.
+
+    Exposes the wrapped tool's name, description and argument schema
+    unchanged, so the model sees the same tool.
+    """
+
+    tool: BaseTool
+    provider: str
+
+    @classmethod
+    def wrap(cls, tool: BaseTool, provider: str) -> "RateLimitedTool":
+        return cls(
+            name=tool.name,
+            description=tool.description,
+            args_schema=tool.args_schema,
+            tool=tool,
+            provider=provider,
+        )
+
+    def _run(self, run_manager=None, **kwargs) -> Any:
+        config = {"callbacks": run_manager.get_child()} if run_manager else None
+        return call_with_retry(
+            self.provider, lambda: self.tool.invoke(kwargs, config), raise_errors=False
+        )
+
+    async def _arun(self, run_manager=None, **kwargs) -> Any:
+        config = {"callbacks": run_manager.get_child()} if run_manager else None
+        return await acall_with_retry(
+            self.provider,
+            lambda: self.tool.ainvoke(kwargs, config),
+            raise_errors=False,
+        )
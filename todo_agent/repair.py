@@ -0,0 +1,130 @@
+from typing import Dict, List, Optional
+
+from todo_agent.config import settings
+from todo_agent.context import ContextStore
+
+# Tasks still to run or retry; a repair replaces all of them
+UNFINISHED = ("failed", "pending", "in_progress")
+
+
+def plan_version(tasks: List[Dict]) -> int:
+    """Current plan version of a session: 0 until its plan was first repaired."""
+    return max((task.get("version") or 0 for task in tasks), default=0)
+
+
+def can_repair(tasks: List[Dict]) -> bool:
+    """
+    Whether a session's remaining work should be re-planned.
+
+    Only sessions with a failed task are repaired (an interrupted run just
+    resumes), and at most settings.max_replans times.
+    """
+    if not settings.replan_on_failure:
+        return False
+    if not any(task["status"] == "failed" for task in tasks):
+        return False
+    if plan_version(tasks) >= settings.max_replans:
+        print(f"⚠️  Not re-planning again: {settings.max_replans} repairs already")
+        return False
+    return True
+
+
+def _describe(task: Dict) -> str:
+    return f"- Step #{task['id']}: {task['title']}\n  Description: {task['content']}"
+
+
+def repair_request(objective: str, tasks: List[Dict]) -> str:
+    """
+    Planner input for re-planning the unfinished part of a session.
+
+    Lists the completed steps with their results (within the ContextStore
+    budget), the failed steps with their reflection and the steps not started
+    yet, and asks for replacement steps numbered after every existing one.
+    """
+    context = ContextStore()
+    context.extend(
+        {
+            "id": task["id"],
+            "title": task["title"],
+            "description": task["content"],
+            "result": task["result"],
+            "items": task.get("items"),
+            "parent_id": task.get("parent_id"),
+        }
+        for task in tasks
+        if task["status"] == "completed"
+    )
+    completed = context.steps(task["id"] for task in tasks)
+    failed = [task for task in tasks if task["status"] == "failed"]
+    # Subtasks not started yet are covered by their map step
+    not_started = [
+        task
+        for task in tasks
+        if task["status"] in ("pending", "in_progress") and task["parent_id"] is None
+    ]
+    first_id = max(task["id"] for task in tasks) + 1
+
+    sections = [
+        f"Objective: {objective}",
+        "Part of the plan for this objective failed. Plan only the remaining work.",
+        "Completed steps, whose results are available (do not plan them again):\n"
+        + ("".join(step["text"] for step in completed) or "None\n"),
+        "Failed steps:\n"
+        + "\n".join(
+            f"{_describe(task)}\n  Reason: {task['reflection'] or task['result']}"
+            for task in failed
+        ),
+    ]
+    if not_started:
+        sections.append(
+            "Steps not started yet (replace them as needed):\n"
+            + "\n".join(_describe(task) for task in not_started)
+        )
+    sections.append(
+        f"Number the new steps from {first_id}. In dependencies, use the ids of "
+        "completed steps or of new steps. Work around the cause of each failure, "
+        "e.g. with a different approach or source, and make sure the final step "
+        "still produces the complete deliverable."
+    )
+    return "\n\n".join(sections)
+
+
+def renumber_plan(planner_response: Dict, tasks: List[Dict]) -> Optional[Dict]:
+    """
+    Number the steps of a repair plan after every existing task of the session.
+
+    Dependencies on other new steps follow their renumbering, dependencies on
+    completed tasks are kept and any other id is dropped, so a new step never
+    waits on a replaced one.
+
+    Returns:
+        Planner-shaped response with the renumbered TodoList, or None if the
+        planner returned no steps
+    """
+    todo_list = planner_response["structured_response"]
+    if not todo_list.tasks:
+        return None
+    first_id = max(task["id"] for task in tasks) + 1
+    completed = {task["id"] for task in tasks if task["status"] == "completed"}
+    new_ids = {step.id: first_id + n for n, step in enumerate(todo_list.tasks)}
+    steps = [
+        step.model_copy(
+            update={
+                "id": new_ids[step.id],
+                "dependencies": sorted(
+                    {
+                        new_ids[d] if d in new_ids else d
+                        for d in step.dependencies
+                        if d in new_ids or d in completed
+                    }
+                ),
+            }
+        )
+        for step in todo_list.tasks
+    ]
+    return {"structured_response": type(todo_list)(tasks=steps)}
+
+
+def replaced_ids(tasks: List[Dict]) -> List[int]:
+    """Ids of the unfinished tasks a repair plan replaces."""
+    return [task["id"] for task in tasks if task["status"] in UNFINISHED]
@@ -0,0 +1,252 @@
+import argparse
+import datetime
+import json
+from collections import defaultdict
+from typing import Dict, List
+
+from todo_agent import crud
+from todo_agent.metrics import cost, get_metrics, get_route_metrics, to_otel
+
+
+def summarize(records: List[Dict]) -> Dict:
+    """
+    Aggregate a session's spans per task and per span name.
+
+    Args:
+        records: Spans as returned by metrics.get_metrics
+
+    Returns:
+        Dict with "tasks" (keyed by task id, None for planning/session work),
+        "spans" (keyed by span name), "routes" (keyed by executor route and
+        model), "compaction" (tool output tokens before/after compaction) and
+        "total" aggregates
+    """
+
+    def bucket():
+        return {
+            "llm_calls": 0,
+            "cached_llm_calls": 0,
+            "llm_ms": 0.0,
+            "tool_calls": 0,
+            "tool_ms": 0.0,
+            "db_ms": 0.0,
+            "input_tokens": 0,
+            "output_tokens": 0,
+            "cost": 0.0,
+        }
+
+    tasks = defaultdict(bucket)
+    total = bucket()
+    spans = defaultdict(lambda: {"count": 0, "errors": 0, "total_ms": 0.0})
+    routes = defaultdict(
+        lambda: {
+            "attempts": 0,
+            "failed": 0,
+            "escalations": 0,
+            "total_ms": 0.0,
+            "llm_calls": 0,
+            "input_tokens": 0,
+            "output_tokens": 0,
+            "cost": 0.0,
+        }
+    )
+    compaction = {
+        "tool_outputs": 0,
+        "tokens_before": 0,
+        "tokens_after": 0,
+        "superseded_tokens": 0,
+    }
+    # Executor attempts by span id, so their LLM calls can be charged to them
+    route_spans = {}
+    for record in records:
+        if record["name"] == "Executor.route":
+            attributes = record["attributes"]
+            route = routes[f"{attributes['route']} ({attributes['model']})"]
+            route_spans[record["span_id"]] = route
+            route["attempts"] += 1
+            route["failed"] += bool(attributes.get("failed"))
+            route["escalations"] += attributes.get("reason") == "escalation"
+            route["total_ms"] += record["duration_ms"]
+
+    for record in records:
+        attributes = record["attributes"]
+        if record["name"] == "compaction.tool_output":
+            compaction["tool_outputs"] += 1
+            compaction["tokens_before"] += attributes.get("tokens_before", 0)
+            compaction["tokens_after"] += attributes.get("tokens_after", 0)
+        elif record["name"] == "compaction.superseded":
+            compaction["superseded_tokens"] += attributes.get("tokens", 0)
+
+        span = spans[record["name"]]
+        span["count"] += 1
+        span["total_ms"] += record["duration_ms"]
+        span["errors"] += record["status"] == "error"
+
+        for entry in (tasks[record["task_id"]], total):
+            if record["kind"] == "llm":
+                input_tokens = record["input_tokens"] or 0
+                output_tokens = record["output_tokens"] or 0
+                entry["llm_calls"] += 1
+                entry["cached_llm_calls"] += bool(record["attributes"].get("cached"))
+                entry["llm_ms"] += record["duration_ms"]
+                entry["input_tokens"] += input_tokens
+                entry["output_tokens"] += output_tokens
+                entry["cost"] += cost(record["model"], input_tokens, output_tokens)
+                route = route_spans.get(record["parent_id"])
+                if route is not None and entry is total:
+                    route["llm_calls"] += 1
+                    route["input_tokens"] += input_tokens
+                    route["output_tokens"] += output_tokens
+                    route["cost"] += cost(record["model"], input_tokens, output_tokens)
+            elif record["kind"] == "tool":
+                entry["tool_calls"] += 1
+                entry["tool_ms"] += record["duration_ms"]
+            elif record["kind"] == "db":
+                entry["db_ms"] += record["duration_ms"]
+
+    return {
+        "tasks": dict(tasks),
+        "spans": dict(spans),
+        "routes": dict(routes),
+        "compaction": compaction,
+        "total": total,
+    }
+
+
+def print_routes(routes: Dict):
+    """Print latency, failures and cost per executor route."""
+    print("\n🧭 Per route")
+    header = (
+        f"{'route':<28} {'tries':>5} {'failed':>6} {'escal':>5} {'mean s':>7} "
+        f"{'llm':>5} {'in tok':>9} {'out tok':>8} {'cost $':>8} {'$/try':>7}"
+    )
+    print(header)
+    print("-" * len(header))
+    for name, route in sorted(routes.items()):
+        print(
+            f"{name[:28]:<28} {route['attempts']:>5} {route['failed']:>6} "
+            f"{route['escalations']:>5} "
+            f"{route['total_ms'] / route['attempts'] / 1000:>7.2f} "
+            f"{route['llm_calls']:>5} {route['input_tokens']:>9} "
+            f"{route['output_tokens']:>8} {route['cost']:>8.4f} "
+            f"{route['cost'] / route['attempts']:>7.4f}"
+        )
+
+
+def print_report(thread_id: str, records: List[Dict]):
+    """Print the per-session breakdown of latency, tokens and cost."""
+    session_data = crud.get_session_by_thread(thread_id)
+    summary = summarize(records)
+
+    if session_data:
+        print(f"🎯 Objective: {session_data['session']['objective']}")
+        print(f"   Status: {session_data['session']['status']}")
+    titles = {}
+    durations = {}
+    for task in session_data["tasks"] if session_data else []:
+        titles[task["id"]] = task["title"]
+        if task["started_at"] and task["completed_at"]:
+            durations[task["id"]] = (
+                datetime.datetime.fromisoformat(task["completed_at"])
+                - datetime.datetime.fromisoformat(task["started_at"])
+            ).total_seconds()
+
+    print("\n📊 Per task")
+    header = (
+        f"{'task':<28} {'wall s':>7} {'llm':>4} {'llm s':>7} {'tools':>5} "
+        f"{'tool s':>7} {'db ms':>7} {'in tok':>8} {'out tok':>8} {'cost $':>8}"
+    )
+    print(header)
+    print("-" * len(header))
+    rows = sorted(
+        summary["tasks"].items(), key=lambda item: (item[0] is not None, item[0] or 0)
+    )
+    for task_id, entry in [*rows, ("total", summary["total"])]:
+        if task_id is None:
+            label = "planning / session"
+        elif task_id == "total":
+            print("-" * len(header))
+            label = "total"
+        else:
+            label = f"#{task_id} {titles.get(task_id, '')}"
+        wall = durations.get(task_id)
+        wall = f"{wall:.1f}" if wall is not None else ""
+        print(
+            f"{label[:28]:<28} {wall:>7} "
+            f"{entry['llm_calls']:>4} {entry['llm_ms'] / 1000:>7.2f} "
+            f"{entry['tool_calls']:>5} {entry['tool_ms'] / 1000:>7.2f} "
+            f"{entry['db_ms']:>7.1f} {entry['input_tokens']:>8} "
+            f"{entry['output_tokens']:>8} {entry['cost']:>8.4f}"
+        )
+    if summary["total"]["cached_llm_calls"]:
+        print(f"({summary['total']['cached_llm_calls']} LLM calls served from cache)")
+
+    if summary["routes"]:
+        print_routes(summary["routes"])
+
+    compaction = summary["compaction"]
+    if compaction["tool_outputs"]:
+        saved = compaction["tokens_before"] - compaction["tokens_after"]
+        print(
+            f"\n✂️  Tool outputs: {compaction['tokens_before']} → "
+            f"{compaction['tokens_after']} tokens "
+            f"({saved / max(compaction['tokens_before'], 1):.0%} saved); "
+            f"{compaction['superseded_tokens']} tokens of superseded results "
+            f"not re-sent"
+        )
+
+    print("\n⏱️  Per span")
+    print(f"{'name':<40} {'count':>6} {'errors':>6} {'total s':>8} {'mean ms':>9}")
+    for name, span in sorted(
+        summary["spans"].items(), key=lambda item: -item[1]["total_ms"]
+    ):
+        print(
+            f"{name[:40]:<40} {span['count']:>6} {span['errors']:>6} "
+            f"{span['total_ms'] / 1000:>8.2f} {span['total_ms'] / span['count']:>9.1f}"
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Show the recorded latency, token usage and cost of a session."
+    )
+    parser.add_argument("thread_id", nargs="?", help="Thread id of the session")
+    output = parser.add_mutually_exclusive_group()
+    output.add_argument(
+        "--json", action="store_true", help="Print the raw spans as JSON"
+    )
+    output.add_argument(
+        "--otel",
+        action="store_true",
+        help="Print the spans as an OpenTelemetry (OTLP/JSON) trace export",
+    )
+    output.add_argument(
+        "--routes",
+        action="store_true",
+        help="Summarize the executor routes of every recorded session",
+    )
+    args = parser.parse_args(argv)
+
+    if args.routes:
+        routes = summarize(get_route_metrics())["routes"]
+        if routes:
+            print_routes(routes)
+        else:
+            print("No executor routes recorded")
+        return
+    if args.thread_id is None:
+        parser.error("a thread id is required unless --routes is given")
+
+    records = get_metrics(args.thread_id)
+    if args.json:
+        print(json.dumps(records, indent=2))
+    elif args.otel:
+        print(json.dumps(to_otel(args.thread_id, records), indent=2))
+    elif not records:
+        print(f"No metrics recorded for thread {args.thread_id}")
+    else:
+        print_report(args.thread_id, records)
+
+
+if __name__ == "__main__":
+    main()
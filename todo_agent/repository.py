@@ -0,0 +1,129 @@
+import datetime
+from typing import Dict, List, Optional
+
+from todo_agent.crud import (
+    Task,
+    Thread,
+    _apply_task_status,
+    _completed_step,
+    _task_row,
+)
+from todo_agent.db import SessionLocal
+from todo_agent.metrics import timed
+
+
+class SessionRepository:
+    """
+    Unit of work for a single session run.
+
+    The crud helpers open a new DB session and look the thread up again on
+    every call. The repository instead keeps one DB session open for the
+    whole run: the thread is resolved once, every task row is loaded into an
+    identity map up front, and status changes are applied in memory and
+    written together by flush().
+
+    Not thread-safe: use it from the thread that drives the scheduler.
+
+    Usage:
+        with SessionRepository(thread_id) as repo:
+            repo.update_task_status(1, "in_progress")
+            repo.flush()
+    """
+
+    @timed("SessionRepository.load", kind="db")
+    def __init__(self, thread_id: str):
+        self.thread_id = thread_id
+        # Keep loaded rows usable after commit instead of re-selecting them
+        self.db = SessionLocal(expire_on_commit=False)
+        self.thread = (
+            self.db.query(Thread).filter(Thread.thread_id == thread_id).first()
+        )
+        if self.thread is None:
+            self.db.close()
+            raise LookupError(f"No session for thread {thread_id}")
+        self.session_id = self.thread.id
+        self.tasks: Dict[int, Task] = {
+            task.task_id: task
+            for task in self.db.query(Task)
+            .filter(Task.session_id == self.session_id)
+            .order_by(Task.task_id)
+        }
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # Keep whatever was applied, including before e.g. a KeyboardInterrupt
+        try:
+            self.flush()
+        finally:
+            self.close()
+
+    def get_session(self) -> Dict:
+        """Session and tasks, in the format of crud.get_session_by_thread."""
+        return {
+            "session": self.thread.to_dict(),
+            "tasks": [task.to_dict() for task in self.tasks.values()],
+        }
+
+    def get_completed_tasks(self) -> List[Dict]:
+        """Get all completed tasks for context."""
+        return [
+            _completed_step(task)
+            for task in self.tasks.values()
+            if task.status == "completed"
+        ]
+
+    def get_pending_tasks(self) -> List[Dict]:
+        """Get remaining pending tasks."""
+        return [
+            task.to_dict() for task in self.tasks.values() if task.status == "pending"
+        ]
+
+    def update_task_status(
+        self,
+        task_id: int,
+        status: str,
+        result: Optional[str] = None,
+        reflection: Optional[str] = None,
+        memo_key: Optional[str] = None,
+        reused_from: Optional[str] = None,
+    ):
+        """Update task execution status. Written to the DB on the next flush()."""
+        task = self.tasks.get(task_id)
+        if task:
+            _apply_task_status(task, status, result, reflection, memo_key, reused_from)
+
+    def replace_tasks(self, replaced_ids: List[int], tasks: List[Dict]):
+        """
+        Swap unfinished tasks for the tasks of a repaired plan.
+
+        The replaced rows keep their content and reflection under status
+        "replaced". Written to the DB right away, in one transaction.
+        """
+        for task_id in replaced_ids:
+            self.tasks[task_id].status = "replaced"
+        for task_data in tasks:
+            task = Task(**_task_row(self.session_id, task_data))
+            self.db.add(task)
+            self.tasks[task.task_id] = task
+        self.flush()
+
+    def mark_session_complete(self, status: str = "completed"):
+        """Mark session as finished and write all pending changes."""
+        self.thread.status = status
+        self.thread.updated_at = datetime.datetime.now()
+        self.flush()
+
+    @timed(kind="db")
+    def flush(self):
+        """Write all pending changes in one transaction."""
+        if self.db.dirty or self.db.new:
+            try:
+                self.db.commit()
+            except Exception as e:
+                self.db.rollback()
+                raise e
+
+    def close(self):
+        self.db.close()
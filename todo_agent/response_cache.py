@@ -0,0 +1,144 @@
+import datetime
+import hashlib
+import json
+import threading
+from typing import Dict, Optional
+
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.load import dumps, loads
+from sqlalchemy import delete, func, select
+
+from todo_agent.config import settings
+from todo_agent.db import SessionLocal
+from todo_agent.llm_cache import LLMCacheEntry
+
+
+def _is_failed_result(generation) -> bool:
+    """True if a generation carries a structured result with status "failed".
+
+    Failed task results are not cached, so retrying a failed session asks the
+    model again instead of replaying the failure.
+    """
+    message = getattr(generation, "message", None)
+    payloads = [
+        tool_call.get("args") for tool_call in getattr(message, "tool_calls", [])
+    ]
+    if isinstance(getattr(message, "content", None), str):
+        try:
+            payloads.append(json.loads(message.content))
+        except ValueError:
+            pass
+    return any(
+        isinstance(payload, dict) and payload.get("status") == "failed"
+        for payload in payloads
+    )
+
+
+class ResponseCache(BaseCache):
+    """
+    Persistent, content-addressed cache of chat model responses.
+
+    Plugs into LangChain's model-level cache hook, so the key covers the model
+    and its parameters, the full message list (system prompt included) and
+    the bound tools / response schema. Entries are stored in the configured
+    database, expire after a TTL and are evicted least-recently-used once the
+    table grows beyond max_entries.
+    """
+
+    def __init__(
+        self, ttl_seconds: Optional[int] = None, max_entries: Optional[int] = None
+    ):
+        self.ttl = datetime.timedelta(
+            seconds=ttl_seconds or settings.llm_cache_ttl_seconds
+        )
+        self.max_entries = max_entries or settings.llm_cache_max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(prompt: str, llm_string: str) -> str:
+        return hashlib.sha256(f"{llm_string}\n{prompt}".encode("utf-8")).hexdigest()
+
+    def _count(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        """Look up a cached response, refreshing its LRU timestamp on a hit."""
+        key = self._key(prompt, llm_string)
+        now = datetime.datetime.now()
+        db = SessionLocal()
+        try:
+            entry = db.get(LLMCacheEntry, key)
+            if entry is None:
+                self._count(hit=False)
+                return None
+            if entry.created_at < now - self.ttl:
+                db.delete(entry)
+                db.commit()
+                self._count(hit=False)
+                return None
+
+            entry.accessed_at = now
+            db.commit()
+            self._count(hit=True)
+            return [loads(generation) for generation in json.loads(entry.response)]
+        finally:
+            db.close()
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE):
+        """Store a response and evict the least recently used entries over the limit."""
+        if any(_is_failed_result(generation) for generation in return_val):
+            return
+
+        now = datetime.datetime.now()
+        db = SessionLocal()
+        try:
+            db.merge(
+                LLMCacheEntry(
+                    key=self._key(prompt, llm_string),
+                    response=json.dumps(
+                        [dumps(generation) for generation in return_val]
+                    ),
+                    created_at=now,
+                    accessed_at=now,
+                )
+            )
+            db.flush()
+
+            count = db.scalar(select(func.count()).select_from(LLMCacheEntry))
+            excess = count - self.max_entries
+            if excess > 0:
+                oldest = (
+                    select(LLMCacheEntry.key)
+                    .order_by(LLMCacheEntry.accessed_at)
+                    .limit(excess)
+                )
+                db.execute(
+                    delete(LLMCacheEntry).where(
+                        LLMCacheEntry.key.in_(oldest.scalar_subquery())
+                    )
+                )
+            db.commit()
+        except Exception:
+            # A cache write must never fail the model call
+            db.rollback()
+        finally:
+            db.close()
+
+    def clear(self, **kwargs):
+        """Delete every cached response."""
+        db = SessionLocal()
+        try:
+            db.execute(delete(LLMCacheEntry))
+            db.commit()
+        finally:
+            db.close()
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counters for this process."""
+        return {"hits": self.hits, "misses": self.misses}
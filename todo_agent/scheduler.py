@@ -0,0 +1,460 @@
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from todo_agent import crud, metrics
+from todo_agent.cancellation import cancellable
+from todo_agent.config import settings
+from todo_agent.context import ContextStore
+from todo_agent.map_reduce import is_map_task, merge_results
+from todo_agent.prefetch import Prefetcher, upcoming_tasks
+from todo_agent.repository import SessionRepository
+from todo_agent.task_memo import afind_memo, find_memo, memo_key
+
+if TYPE_CHECKING:
+    from todo_agent.agents.executor import Executor
+
+
+def task_dependencies(task: Dict, plan_ids: List[int]) -> List[int]:
+    """
+    Resolve the ids of the tasks a task depends on.
+
+    Tasks stored before dependencies existed have ``dependencies`` set to None;
+    they keep their original sequential behaviour and depend on every earlier task.
+
+    Args:
+        task: Task dict with "id" and optional "dependencies"
+        plan_ids: Ids of every task in the plan
+
+    Returns:
+        Sorted list of dependency ids that exist in the plan
+    """
+    dependencies = task.get("dependencies")
+    if dependencies is None:
+        return [task_id for task_id in plan_ids if task_id < task["id"]]
+    return sorted(
+        task_id
+        for task_id in set(dependencies)
+        if task_id in plan_ids and task_id != task["id"]
+    )
+
+
+def ready_tasks(
+    remaining: Dict[int, Dict],
+    dependencies: Dict[int, List[int]],
+    completed: ContextStore,
+    running: int,
+) -> List[Dict]:
+    """
+    Pick the remaining tasks whose dependencies are all completed.
+
+    If nothing is ready and nothing is running, the dependencies can no longer
+    be satisfied (e.g. a cycle in the plan); the first remaining task is then
+    returned so execution falls back to plan order with whatever context exists.
+    """
+    ready = [
+        task
+        for task_id, task in remaining.items()
+        if all(d in completed for d in dependencies[task_id])
+    ]
+    if not ready and not running and remaining:
+        ready = [next(iter(remaining.values()))]
+    return ready
+
+
+def task_outcome(task_id: int, task_result) -> Tuple[str, str, str]:
+    """
+    Translate an executor return value into (status, result, reflection).
+
+    Args:
+        task_id: Task number, used for the status output
+        task_result: Agent response dict, error string or raised exception
+
+    Returns:
+        Tuple of status, result and reflection to store on the task
+    """
+    if isinstance(task_result, Exception):
+        print(f"Task #{task_id} failed: {str(task_result)}")
+        return "failed", str(task_result), "Task execution failed"
+
+    if isinstance(task_result, str):
+        # It's an error string
+        print(f"❌ Task #{task_id} failed: {task_result}")
+        return "failed", task_result, "Executor returned error"
+
+    response = task_result["structured_response"]
+    print(f"→ task #{task_id} status: {response.status}")
+    print(f"→ task #{task_id} reflection: {response.reflection}")
+    return str(response.status), response.result, response.reflection
+
+
+def completed_step(task: Dict, result: str) -> Dict:
+    """Context entry for a task that just completed."""
+    return {
+        "id": task["id"],
+        "title": task["title"],
+        "description": task["content"],
+        "result": result,
+        "items": task.get("items"),
+        "parent_id": task.get("parent_id"),
+    }
+
+
+def report_reuse(task: Dict, memo: Dict):
+    """Print that a task was answered from the memo instead of executed."""
+    thread_id, source_task = memo["reused_from"].rsplit("#", 1)
+    print(
+        f"\n♻️  Task #{task['id']}: {task['title']} — reusing the result of "
+        f"task #{source_task} in session {thread_id[:12]}"
+    )
+
+
+def merge_map_task(task: Dict, context: ContextStore) -> Tuple[str, str]:
+    """Merge a map task's subtask results; returns its result and reflection."""
+    print(
+        f"\n🧩 Task #{task['id']}: {task['title']} — merging the results of "
+        f"{len(task['items'])} subtasks"
+    )
+    return merge_results(task, context), f"Merged {len(task['items'])} subtasks"
+
+
+def executor_config(thread_id: str, task_id: int) -> Dict:
+    """Each task gets its own executor thread so concurrent runs never share state."""
+    return {
+        "configurable": {"thread_id": f"executor-{thread_id}-{task_id}"},
+        "metadata": {"session_thread_id": thread_id, "task_id": task_id},
+    }
+
+
+def run_tasks(
+    repo: SessionRepository,
+    tasks: List[Dict],
+    executor_agent: "Executor",
+    completed_steps: List[Dict],
+    max_workers: Optional[int] = None,
+) -> bool:
+    """
+    Execute tasks on a bounded thread pool, running independent tasks concurrently.
+
+    A task is started as soon as all of its dependencies are completed, and it
+    receives only the results of those dependencies as context, within the
+    ContextStore token budget. A task whose content and dependency results
+    match a fresh completed task of any session reuses that result instead of
+    running (see task_memo). All database writes go through the session
+    repository on the calling thread, and status changes are flushed once per
+    scheduling round. A map task runs no agent: once its subtasks completed,
+    it merges their results (see map_reduce). With settings.speculative_prefetch, the first search of
+    each task waiting on running tasks starts in the background (see
+    prefetch.Prefetcher). After the first failure no new tasks are started;
+    tasks already running are allowed to finish. On KeyboardInterrupt the
+    running tasks stop at their next model or tool call (see cancellation),
+    and the pool is shut down before the repository is flushed.
+
+    Args:
+        repo: Repository for the session being executed
+        tasks: Task dicts still to execute (id, title, content, dependencies)
+        executor_agent: Executor agent used to run each task
+        completed_steps: Steps already completed in this session, in the format
+            returned by SessionRepository.get_completed_tasks
+        max_workers: Maximum number of concurrent tasks (defaults to settings)
+
+    Returns:
+        True if every task completed, False if a task failed
+
+    Raises:
+        KeyboardInterrupt: Re-raised once the repository is flushed; the
+            interrupted tasks stay in_progress, so a resume continues them
+    """
+    thread_id = repo.thread_id
+    max_workers = max_workers or settings.max_parallel_tasks
+    context = ContextStore()
+    context.extend(completed_steps)
+    remaining = {task["id"]: task for task in sorted(tasks, key=lambda t: t["id"])}
+    plan_ids = sorted({step["id"] for step in completed_steps} | set(remaining))
+    dependencies = {
+        task_id: task_dependencies(task, plan_ids)
+        for task_id, task in remaining.items()
+    }
+    running: Dict[Future, Dict] = {}
+    failed = False
+    prefetcher: Optional[Prefetcher] = None
+    cancelled = threading.Event()
+
+    pool = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        while remaining or running:
+            reused = False
+            if not failed:
+                ready = ready_tasks(remaining, dependencies, context, len(running))
+                for task in ready[: max_workers - len(running)]:
+                    task_id = task["id"]
+                    del remaining[task_id]
+                    if is_map_task(task):
+                        result, reflection = merge_map_task(task, context)
+                        repo.update_task_status(
+                            task_id, "completed", result=result, reflection=reflection
+                        )
+                        context.add(completed_step(task, result))
+                        reused = True
+                        continue
+                    key = memo_key(
+                        task["content"], context.result_hashes(dependencies[task_id])
+                    )
+                    memo = find_memo(key)
+                    if memo is not None:
+                        report_reuse(task, memo)
+                        repo.update_task_status(
+                            task_id,
+                            "completed",
+                            result=memo["result"],
+                            reflection=memo["reflection"],
+                            memo_key=key,
+                            reused_from=memo["reused_from"],
+                        )
+                        context.add(completed_step(task, memo["result"]))
+                        reused = True
+                        continue
+                    print(f"\n🔄 Executing task #{task_id}: {task['title']}")
+                    # Mark as in progress
+                    repo.update_task_status(task_id, "in_progress", memo_key=key)
+                    # Run in a copy of this context so metrics go to the task
+                    with metrics.bind(task_id=task_id), cancellable(cancelled):
+                        task_context = contextvars.copy_context()
+                    future = pool.submit(
+                        task_context.run,
+                        executor_agent.execute_step,
+                        step_description=task["content"],
+                        previous_steps=context.steps(dependencies[task_id]),
+                        config=executor_config(thread_id, task_id),
+                        partial=task.get("partial_result"),
+                        resume=task.get("status") == "in_progress",
+                        complexity=task.get("complexity"),
+                        prefetched=prefetcher.take(task) if prefetcher else None,
+                        n_dependencies=len(dependencies[task_id]),
+                        # Runs on the pool thread, with its own DB session
+                        on_progress=functools.partial(
+                            crud.save_partial_result, thread_id, task_id
+                        ),
+                    )
+                    running[future] = task
+                repo.flush()
+
+                if settings.speculative_prefetch and running:
+                    # Search for the next tasks while the running ones execute
+                    prefetcher = prefetcher or Prefetcher(
+                        executor_agent.tools, max_workers
+                    )
+                    prefetcher.start(
+                        upcoming_tasks(
+                            remaining,
+                            dependencies,
+                            context,
+                            [task["id"] for task in running.values()],
+                        )
+                    )
+
+            if not running:
+                if reused:
+                    # Reused and merged results may have unblocked further tasks
+                    continue
+                break
+
+            done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            done_tasks = {future: running.pop(future) for future in done}
+            for future, task in done_tasks.items():
+                try:
+                    task_result = future.result()
+                except Exception as e:
+                    task_result = e
+                status, result, reflection = task_outcome(task["id"], task_result)
+                repo.update_task_status(
+                    task["id"], status, result=result, reflection=reflection
+                )
+                if status == "completed":
+                    context.add(completed_step(task, result))
+                else:
+                    failed = True
+            repo.flush()
+            # The outcomes are stored: their checkpoints are no longer needed
+            for task in done_tasks.values():
+                executor_agent.delete_checkpoints(
+                    executor_config(thread_id, task["id"])
+                )
+
+        if prefetcher:
+            prefetcher.close()
+            prefetcher.report()
+        if failed:
+            print("Ending processing objective ...")
+        pool.shutdown(wait=True)
+        return not failed
+
+    except KeyboardInterrupt:
+        # Handle keyboard interruption
+        print("\n\nKeyboard interruption detected!")
+        # Running tasks stop at their next step; no thread writes after the flush
+        cancelled.set()
+        print("Waiting for running tasks to stop at their next step ...")
+        pool.shutdown(wait=True, cancel_futures=True)
+        # Tasks stay in_progress: resume continues them from their last checkpoint
+        repo.flush()
+        raise
+
+    finally:
+        if prefetcher:
+            prefetcher.close()
+
+
+async def arun_tasks(
+    thread_id: str,
+    tasks: List[Dict],
+    executor_agent: "Executor",
+    completed_steps: List[Dict],
+    max_workers: Optional[int] = None,
+) -> bool:
+    """
+    Async version of run_tasks: independent tasks run as concurrent asyncio tasks.
+
+    Uses Executor.aexecute_step and the async crud functions, so no OS thread is
+    held per in-flight LLM call. Takes the thread id instead of a repository;
+    otherwise arguments and return value match run_tasks. Cancellation is
+    re-raised like the sync KeyboardInterrupt, with running tasks cancelled.
+    """
+    max_workers = max_workers or settings.max_parallel_tasks
+    context = ContextStore()
+    context.extend(completed_steps)
+    remaining = {task["id"]: task for task in sorted(tasks, key=lambda t: t["id"])}
+    plan_ids = sorted({step["id"] for step in completed_steps} | set(remaining))
+    dependencies = {
+        task_id: task_dependencies(task, plan_ids)
+        for task_id, task in remaining.items()
+    }
+    running: Dict[asyncio.Task, Dict] = {}
+    failed = False
+    prefetcher: Optional[Prefetcher] = None
+
+    try:
+        while remaining or running:
+            reused = False
+            if not failed:
+                ready = ready_tasks(remaining, dependencies, context, len(running))
+                for task in ready[: max_workers - len(running)]:
+                    task_id = task["id"]
+                    del remaining[task_id]
+                    if is_map_task(task):
+                        result, reflection = merge_map_task(task, context)
+                        await crud.aupdate_task_status(
+                            thread_id,
+                            task_id,
+                            "completed",
+                            result=result,
+                            reflection=reflection,
+                        )
+                        context.add(completed_step(task, result))
+                        reused = True
+                        continue
+                    key = memo_key(
+                        task["content"], context.result_hashes(dependencies[task_id])
+                    )
+                    memo = await afind_memo(key)
+                    if memo is not None:
+                        report_reuse(task, memo)
+                        await crud.aupdate_task_status(
+                            thread_id,
+                            task_id,
+                            "completed",
+                            result=memo["result"],
+                            reflection=memo["reflection"],
+                            memo_key=key,
+                            reused_from=memo["reused_from"],
+                        )
+                        context.add(completed_step(task, memo["result"]))
+                        reused = True
+                        continue
+                    print(f"\n🔄 Executing task #{task_id}: {task['title']}")
+                    await crud.aupdate_task_status(
+                        thread_id, task_id, "in_progress", memo_key=key
+                    )
+                    # The asyncio task copies the context, task id included
+                    with metrics.bind(task_id=task_id):
+                        future = asyncio.create_task(
+                            executor_agent.aexecute_step(
+                                step_description=task["content"],
+                                previous_steps=context.steps(dependencies[task_id]),
+                                config=executor_config(thread_id, task_id),
+                                partial=task.get("partial_result"),
+                                resume=task.get("status") == "in_progress",
+                                complexity=task.get("complexity"),
+                                prefetched=prefetcher.take(task)
+                                if prefetcher
+                                else None,
+                                n_dependencies=len(dependencies[task_id]),
+                                on_progress=functools.partial(
+                                    crud.asave_partial_result, thread_id, task_id
+                                ),
+                            )
+                        )
+                    running[future] = task
+
+                if settings.speculative_prefetch and running:
+                    prefetcher = prefetcher or Prefetcher(
+                        executor_agent.tools, max_workers
+                    )
+                    prefetcher.astart(
+                        upcoming_tasks(
+                            remaining,
+                            dependencies,
+                            context,
+                            [task["id"] for task in running.values()],
+                        )
+                    )
+
+            if not running:
+                if reused:
+                    continue
+                break
+
+            done, _ = await asyncio.wait(
+                list(running), return_when=asyncio.FIRST_COMPLETED
+            )
+            for future in done:
+                task = running.pop(future)
+                exception = future.exception()
+                if exception is not None and not isinstance(exception, Exception):
+                    # e.g. SystemExit: stop like the sync path, tasks stay in_progress
+                    for other in running:
+                        other.cancel()
+                    raise exception
+                task_result = exception or future.result()
+                status, result, reflection = task_outcome(task["id"], task_result)
+                await crud.aupdate_task_status(
+                    thread_id, task["id"], status, result=result, reflection=reflection
+                )
+                # The outcome is stored: its checkpoints are no longer needed
+                await executor_agent.adelete_checkpoints(
+                    executor_config(thread_id, task["id"])
+                )
+                if status == "completed":
+                    context.add(completed_step(task, result))
+                else:
+                    failed = True
+
+        if prefetcher:
+            prefetcher.close()
+            prefetcher.report()
+        if failed:
+            print("Ending processing objective ...")
+        return not failed
+
+    except asyncio.CancelledError:
+        # Tasks stay in_progress: resume continues them from their last checkpoint
+        for future in running:
+            future.cancel()
+        raise
+
+    finally:
+        if prefetcher:
+            prefetcher.close()
@@ -1,149 +1,113 @@
-from typing import Optional
-
-from todo_agent import crud
-from todo_agent.agents.executor import Executor
-from todo_agent.agents.planner import Planner
-
-
-def start_new_session(
-    thread_id: str, objective: str, planner_agent: Planner, executor_agent: Executor
-):
+import asyncio
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from todo_agent import crud, metrics
+from todo_agent.map_reduce import expand_map_tasks
+from todo_agent.plan_cache import get_plan_cache
+from todo_agent.repair import (
+    can_repair,
+    plan_version,
+    renumber_plan,
+    repair_request,
+    replaced_ids,
+)
+from todo_agent.repository import SessionRepository
+from todo_agent.scheduler import arun_tasks, run_tasks
+
+if TYPE_CHECKING:
+    # Only for annotations: the agents (and LangChain) load when first built
+    from todo_agent.agents.executor import Executor
+    from todo_agent.agents.planner import Planner
+
+
+def plan_tasks(planner_response: Dict) -> List[Dict]:
     """
-    Start a new session: create plan and store in database.
+    Print the proposed TODO list and convert it into task dicts for storage.
+
+    Map steps are expanded into one subtask per item (see map_reduce).
 
     Args:
-        thread_id: Unique thread identifier
-        objective: User's high-level goal
-        planner_agent: LangChain planner agent
-        executor_agent: LangChain executor agent
-    """
-    session_id = thread_id
-    planner_thread = f"planner-{session_id}"
-    executor_thread = f"executor-{session_id}"
-    print("🔧 Planning tasks...")
+        planner_response: Planner agent response with structured_response field
 
-    # Use planner agent to create TODO list
-    planner_config = {"configurable": {"thread_id": planner_thread}}
-    planner_response = planner_agent.create_todo_list(objective, planner_config)
+    Returns:
+        List of task dicts (id, title, content, dependencies, complexity, items,
+        parent_id)
+    """
     todo_list = planner_response["structured_response"].tasks
     print("\nProposed TODO List:")
     tasks = []
     for task in todo_list:
         print(f"- #{task.id} {task.title}: {task.content}")
-        tasks.append({"id": task.id, "title": task.title, "content": task.content})
-
-    # Store session and plan in database
-    session_data = crud.create_session(thread_id, objective, tasks)
-    failed = False
-    # Execute each pending task
-    for task in todo_list:
-        task_id = task.id
-        title = task.title
-
-        print(f"\n🔄 Executing task #{task_id}: {title}")
-
-        # Mark as in progress
-        crud.update_task_status(thread_id, task_id, "in_progress")
-
-        # Prepare executor config
-        executor_config = {"configurable": {"thread_id": executor_thread}}
-        # Get completed tasks for context
-        completed_steps = crud.get_completed_tasks(thread_id)
-
-        # Execute task with executor agent
-        try:
-            # Execute with previous steps context
-            task_result = executor_agent.execute_step(
-                step_description=task.content,
-                previous_steps=completed_steps,
-                config=executor_config,
-            )
-            # Only proceed if it's a dict
-            if isinstance(task_result, str):
-                # It's an error string
-                crud.update_task_status(
-                    thread_id,
-                    task_id,
-                    "failed",
-                    result=task_result,  # The error message
-                    reflection="Executor returned error",
-                )
-                failed = True
-                print(f"❌ Task #{task_id} failed: {task_result}")
-                break
-            # Update task as completed
-            crud.update_task_status(
-                thread_id,
-                task_id,
-                str(task_result["structured_response"].status),
-                result=task_result["structured_response"].result,
-                reflection=task_result["structured_response"].reflection,
-            )
-
-            print(f"→ status: {task_result['structured_response'].status}")
-            # print(f"→ result: {task_result['structured_response'].result}")
-            print(f"→ reflection: {task_result['structured_response'].reflection}")
-            if str(task_result["structured_response"].status) == "failed":
-                failed = True
-                print("Ending processing objective ...")
-                break
-
-        except KeyboardInterrupt:
-            # Handle keyboard interruption
-            print("\n\nKeyboard interruption detected!")
-            failed = True
-            # Reset any in_progress tasks back to pending for future resume
-            session_data = crud.get_session_by_thread(thread_id)
-            for t in session_data["tasks"]:
-                if t["status"] == "in_progress":
-                    crud.update_task_status(thread_id, t["id"], "pending")
-            break
-
-        except Exception as e:
-            # Mark as failed
-            crud.update_task_status(
-                thread_id,
-                task_id,
-                "failed",
-                result=str(e),
-                reflection="Task execution failed",
-            )
-            failed = True
-            print(f"Task #{task_id} failed: {str(e)}")
-            break
-
-    if not failed:
-        # Print final result
-        all_completed = crud.get_completed_tasks(thread_id)
-        if all_completed:
-            last_task = all_completed[-1]
-            print("\n📝 FINAL RESULT:")
-            print(last_task.get("result", "No result available"))
+        if task.items:
+            print(f"    ↳ map over {len(task.items)} items: {', '.join(task.items)}")
+        tasks.append(
+            {
+                "id": task.id,
+                "title": task.title,
+                "content": task.content,
+                "dependencies": task.dependencies,
+                "complexity": task.complexity,
+                "items": task.items,
+            }
+        )
+    return expand_map_tasks(tasks)
+
+
+def reuse_plan(thread_id: str, objective: str) -> Optional[Dict]:
+    """
+    Look up a stored plan for the objective in the plan cache.
 
-    # Mark session as complete
-    crud.mark_session_complete(thread_id)
+    Returns:
+        Planner-shaped response with the stored TodoList, or None to plan afresh
+    """
+    plan_cache = get_plan_cache()
+    if plan_cache is None:
+        return None
+    cached = plan_cache.lookup(objective, exclude=thread_id)
+    if cached is not None:
+        print(
+            f"♻️  Reusing the plan of a previous session ({cached['reused_from'][:12]})"
+        )
+    return cached
+
+
+def remember_plan(thread_id: str, objective: str):
+    """Make a plan that ran without failures available to the plan cache."""
+    plan_cache = get_plan_cache()
+    if plan_cache is not None:
+        plan_cache.add(thread_id, objective)
+
+
+def print_final_result(completed: List[Dict]):
+    """Print the result of the last completed task, which holds the deliverable."""
+    # Map subtasks are numbered after the plan; the deliverable is a plan step
+    completed = [task for task in completed if task.get("parent_id") is None]
+    if completed:
+        last_task = completed[-1]
+        print("\n📝 FINAL RESULT:")
+        print(last_task.get("result", "No result available"))
 
 
-def resume_session(thread_id: str, executor_agent: Executor):
+def report_resume(session_data: Dict) -> Dict[str, List[Dict]]:
     """
-    Resume an existing session from database.
+    Print the state of a session being resumed and group its tasks by status.
 
     Args:
-        thread_id: Existing thread identifier
-        executor_agent: Executor agent to continue execution
-    """
-
-    session_id = thread_id
-    executor_thread = f"executor-{session_id}"
-    # Retrieve session from database
-    session_data = crud.get_session_by_thread(thread_id)
+        session_data: Session payload as returned by crud.get_session_by_thread
 
+    Returns:
+        Dict with "completed", "failed" and "pending" task lists
+    """
     print(f"🔄 Resuming objective: {session_data['session']['objective']}")
 
     # Get tasks by status
     completed = [t for t in session_data["tasks"] if t["status"] == "completed"]
     failed = [t for t in session_data["tasks"] if t["status"] == "failed"]
-    pending = [t for t in session_data["tasks"] if t["status"] == "pending"]
+    # Tasks left in_progress were interrupted by a crash; run them again,
+    # reusing whatever partial result was saved
+    pending = [
+        t for t in session_data["tasks"] if t["status"] in ("pending", "in_progress")
+    ]
 
     if completed:
         print(f"Already completed: {len(completed)} tasks")
@@ -154,111 +118,179 @@ def resume_session(thread_id: str, executor_agent: Executor):
         for task in failed:
             print(f"  Task #{task['id']}: {task['title']}")
             print(f"    → Reason: {task.get('reflection', 'No reflection available')}")
-        return
 
     # Check if all tasks are completed
-    if not pending and not failed:
+    elif not pending:
         print("\nAll tasks already completed!")
 
         # Print final result from last completed task
-        if completed:
-            last_task = completed[-1]
-            print("\n📝 FINAL RESULT:")
-            print(last_task.get("result", "No result available"))
+        print_final_result(completed)
 
-    # If there are pending tasks, continue execution
-    if pending:
+    else:
         print(f"\n⏳ Resuming execution: {len(pending)} pending tasks")
-        failed = False
-        # Execute each pending task
-        for task in pending:
-            task_id = task["id"]
-            title = task["title"]
-
-            print(f"\n🔄 Executing task #{task_id}: {title}")
-            # Mark as in progress
-            crud.update_task_status(thread_id, task_id, "in_progress")
-
-            # Prepare executor config
-            executor_config = {"configurable": {"thread_id": executor_thread}}
-            # Get completed tasks for context
-            completed_steps = crud.get_completed_tasks(thread_id)
-            # Execute task with executor agent
-            try:
-                # Execute with previous steps context
-                task_result = executor_agent.execute_step(
-                    step_description=task["content"],
-                    previous_steps=completed_steps,
-                    config=executor_config,
-                )
-                # Only proceed if it's a dict
-                if isinstance(task_result, str):
-                    # It's an error string
-                    crud.update_task_status(
-                        thread_id,
-                        task_id,
-                        "failed",
-                        result=task_result,  # The error message
-                        reflection="Executor returned error",
-                    )
-                    failed = True
-                    print(f"❌ Task #{task_id} failed: {task_result}")
-                    break
-
-                # Update task as completed
-                crud.update_task_status(
-                    thread_id,
-                    task_id,
-                    str(task_result["structured_response"].status),
-                    result=task_result["structured_response"].result,
-                    reflection=task_result["structured_response"].reflection,
-                )
-
-                print(f"→ status: {task_result['structured_response'].status}")
-                # print(f"→ result: {task_result.result}")
-                print(f"→ reflection: {task_result['structured_response'].reflection}")
-                if str(task_result["structured_response"].status) == "failed":
-                    failed = True
-                    print("Ending processing objective ...")
-                    break
-
-            except KeyboardInterrupt:
-                # Handle keyboard interruption
-                print("\n\nKeyboard interruption detected!")
-                failed = True
-                # Reset any in_progress tasks back to pending for future resume
-                session_data = crud.get_session_by_thread(thread_id)
-                for t in session_data["tasks"]:
-                    if t["status"] == "in_progress" and t["id"] != task_id:
-                        crud.update_task_status(thread_id, t["id"], "pending")
-                break
-
-            except Exception as e:
-                # Mark as failed
-                crud.update_task_status(
-                    thread_id,
-                    task_id,
-                    "failed",
-                    result=str(e),
-                    reflection="Task execution failed",
-                )
-                failed = True
-                print(f"Task #{task_id} failed: {str(e)}")
-                break
+        partial = [t for t in pending if t.get("partial_result")]
+        if partial:
+            print(f"   Reusing partial results of {len(partial)} interrupted tasks")
+
+    return {"completed": completed, "failed": failed, "pending": pending}
+
+
+def _repair_tasks(
+    planner_response: Dict, tasks: List[Dict], version: int
+) -> Optional[Tuple[List[int], List[Dict]]]:
+    response = renumber_plan(planner_response, tasks)
+    if response is None:
+        print("⚠️  The planner returned no steps for the remaining work")
+        return None
+    new_tasks = plan_tasks(response)
+    for task in new_tasks:
+        task["version"] = version
+    return replaced_ids(tasks), new_tasks
+
+
+def repair_plan(
+    thread_id: str, session_data: Dict, planner_agent: Optional["Planner"]
+) -> Optional[Tuple[List[int], List[Dict]]]:
+    """
+    Re-plan the unfinished work of a session in which a task failed.
+
+    The planner gets the objective, the completed results and the failure
+    reflections (see repair.repair_request), on a planner thread of its own
+    for every plan version.
+
+    Args:
+        thread_id: Thread identifier of the session
+        session_data: Session payload as returned by crud.get_session_by_thread
+        planner_agent: Planner agent; None disables repairs
+
+    Returns:
+        Tuple of the ids of the tasks to replace and the new task dicts, or
+        None if the session is not to be repaired
+    """
+    tasks = session_data["tasks"]
+    if planner_agent is None or not can_repair(tasks):
+        return None
+    version = plan_version(tasks) + 1
+    print(f"\n🛠️  Re-planning the remaining work (plan version {version})...")
+    request = repair_request(session_data["session"]["objective"], tasks)
+    planner_config = {"configurable": {"thread_id": f"planner-{thread_id}-v{version}"}}
+    planner_response = planner_agent.create_todo_list(request, planner_config)
+    return _repair_tasks(planner_response, tasks, version)
+
+
+def run_with_repair(
+    repo: SessionRepository,
+    tasks: List[Dict],
+    planner_agent: Optional["Planner"],
+    executor_agent: "Executor",
+    completed_steps: List[Dict],
+) -> bool:
+    """
+    Execute tasks; when one fails, re-plan the remaining work and continue.
+
+    Completed tasks are never run again: the replacement tasks receive their
+    results as context. Stops when a repair isn't possible (see repair_plan).
+    An interrupted run is never repaired: the KeyboardInterrupt raised by
+    run_tasks propagates, and the interrupted tasks stay in_progress for a
+    resume instead of being replaced while their threads still run.
+
+    Returns:
+        True if every task completed
+    """
+    while True:
+        if tasks and run_tasks(repo, tasks, executor_agent, completed_steps):
+            return True
+        repair = repair_plan(repo.thread_id, repo.get_session(), planner_agent)
+        if repair is None:
+            return False
+        replaced, tasks = repair
+        repo.replace_tasks(replaced, tasks)
+        completed_steps = repo.get_completed_tasks()
+
+
+def start_new_session(
+    thread_id: str, objective: str, planner_agent: "Planner", executor_agent: "Executor"
+):
+    """
+    Start a new session: create plan and store in database.
+
+    Args:
+        thread_id: Unique thread identifier
+        objective: User's high-level goal
+        planner_agent: LangChain planner agent
+        executor_agent: LangChain executor agent
+    """
+    session_id = thread_id
+    planner_thread = f"planner-{session_id}"
+    print("🔧 Planning tasks...")
+
+    # Reuse the plan of an equivalent objective, else ask the planner agent
+    planner_response = reuse_plan(thread_id, objective)
+    if planner_response is None:
+        planner_config = {"configurable": {"thread_id": planner_thread}}
+        planner_response = planner_agent.create_todo_list(objective, planner_config)
+    tasks = plan_tasks(planner_response)
+
+    # Store session and plan in database
+    crud.create_session(thread_id, objective, tasks)
+
+    with SessionRepository(thread_id) as repo:
+        # Execute the plan, running independent tasks concurrently
+        failed = not run_with_repair(
+            repo, tasks, planner_agent, executor_agent, completed_steps=[]
+        )
 
         if not failed:
             # Print final result
-            all_completed = crud.get_completed_tasks(thread_id)
-            if all_completed:
-                last_task = all_completed[-1]
-                print("\n📝 FINAL RESULT:")
-                print(last_task.get("result", "No result available"))
+            print_final_result(repo.get_completed_tasks())
+            remember_plan(thread_id, objective)
+
+        # Mark session as finished
+        repo.mark_session_complete("failed" if failed else "completed")
+
+
+def resume_session(
+    thread_id: str,
+    executor_agent: "Executor",
+    planner_agent: Optional["Planner"] = None,
+):
+    """
+    Resume an existing session from database.
+
+    A session with failed tasks has its remaining work re-planned first, when
+    a planner is given and repairs are left (see repair_plan).
+
+    Args:
+        thread_id: Existing thread identifier
+        executor_agent: Executor agent to continue execution
+        planner_agent: Planner agent used to repair a failed session
+    """
+
+    with SessionRepository(thread_id) as repo:
+        # Retrieve session from database
+        session_data = repo.get_session()
+        tasks = report_resume(session_data)
+        repairable = planner_agent is not None and can_repair(session_data["tasks"])
+
+        # If there are pending tasks, continue execution
+        if (tasks["pending"] and not tasks["failed"]) or repairable:
+            failed = not run_with_repair(
+                repo,
+                [] if tasks["failed"] else tasks["pending"],
+                planner_agent,
+                executor_agent,
+                completed_steps=repo.get_completed_tasks(),
+            )
+
+            if not failed:
+                # Print final result
+                print_final_result(repo.get_completed_tasks())
 
-        crud.mark_session_complete(thread_id)
+            repo.mark_session_complete("failed" if failed else "completed")
 
 
 def handle_user_input(
-    thread_id: str, objective: str, planner_agent: Planner, executor_agent: Executor
+    thread_id: str, objective: str, planner_agent: "Planner", executor_agent: "Executor"
 ):
     """
     Main entry point: decide whether to start new or resume session.
@@ -269,14 +301,132 @@ def handle_user_input(
         planner_agent: LangChain planner agent
         executor_agent: LangChain executor agent
     """
-    # Check if session exists
-    existing_session = crud.get_session_by_thread(thread_id)
+    # Spans recorded for this session are written to the metrics table at the end
+    with metrics.session(thread_id):
+        # Check if session exists (a thread queued for a batch worker has no plan yet)
+        existing_session = crud.get_session_by_thread(thread_id)
+
+        if existing_session and existing_session["tasks"]:
+            # Session exists
+            print("🔄 Resuming existing session...")
+            resume_session(thread_id, executor_agent, planner_agent)
+        else:
+            # New session
+            print("✨ Starting new session...")
+            start_new_session(thread_id, objective, planner_agent, executor_agent)
+
+
+async def arepair_plan(
+    thread_id: str, session_data: Dict, planner_agent: Optional["Planner"]
+) -> Optional[Tuple[List[int], List[Dict]]]:
+    """Async version of repair_plan."""
+    tasks = session_data["tasks"]
+    if planner_agent is None or not can_repair(tasks):
+        return None
+    version = plan_version(tasks) + 1
+    print(f"\n🛠️  Re-planning the remaining work (plan version {version})...")
+    request = repair_request(session_data["session"]["objective"], tasks)
+    planner_config = {"configurable": {"thread_id": f"planner-{thread_id}-v{version}"}}
+    planner_response = await planner_agent.acreate_todo_list(request, planner_config)
+    return _repair_tasks(planner_response, tasks, version)
+
+
+async def arun_with_repair(
+    thread_id: str,
+    tasks: List[Dict],
+    planner_agent: Optional["Planner"],
+    executor_agent: "Executor",
+    completed_steps: List[Dict],
+) -> bool:
+    """
+    Async version of run_with_repair, taking the thread id.
 
-    if existing_session:
-        # Session exists
-        print("🔄 Resuming existing session...")
-        resume_session(thread_id, executor_agent)
-    else:
-        # New session
-        print("✨ Starting new session...")
-        start_new_session(thread_id, objective, planner_agent, executor_agent)
+    Cancellation propagates from arun_tasks without a repair, like the sync
+    KeyboardInterrupt.
+    """
+    while True:
+        if tasks and await arun_tasks(
+            thread_id, tasks, executor_agent, completed_steps
+        ):
+            return True
+        session_data = await crud.aget_session_by_thread(thread_id)
+        repair = await arepair_plan(thread_id, session_data, planner_agent)
+        if repair is None:
+            return False
+        replaced, tasks = repair
+        await crud.areplace_tasks(thread_id, replaced, tasks)
+        completed_steps = await crud.aget_completed_tasks(thread_id)
+
+
+async def astart_new_session(
+    thread_id: str, objective: str, planner_agent: "Planner", executor_agent: "Executor"
+):
+    """Async version of start_new_session."""
+    print("🔧 Planning tasks...")
+    # The lookup is a couple of small sync queries, kept off the event loop
+    planner_response = await asyncio.to_thread(reuse_plan, thread_id, objective)
+    if planner_response is None:
+        planner_config = {"configurable": {"thread_id": f"planner-{thread_id}"}}
+        planner_response = await planner_agent.acreate_todo_list(
+            objective, planner_config
+        )
+    tasks = plan_tasks(planner_response)
+
+    await crud.acreate_session(thread_id, objective, tasks)
+
+    failed = not await arun_with_repair(
+        thread_id, tasks, planner_agent, executor_agent, completed_steps=[]
+    )
+    if not failed:
+        print_final_result(await crud.aget_completed_tasks(thread_id))
+        remember_plan(thread_id, objective)
+
+    await crud.amark_session_complete(thread_id, "failed" if failed else "completed")
+
+
+async def aresume_session(
+    thread_id: str,
+    executor_agent: "Executor",
+    planner_agent: Optional["Planner"] = None,
+):
+    """Async version of resume_session."""
+    session_data = await crud.aget_session_by_thread(thread_id)
+    tasks = report_resume(session_data)
+    repairable = planner_agent is not None and can_repair(session_data["tasks"])
+
+    if (tasks["pending"] and not tasks["failed"]) or repairable:
+        failed = not await arun_with_repair(
+            thread_id,
+            [] if tasks["failed"] else tasks["pending"],
+            planner_agent,
+            executor_agent,
+            completed_steps=await crud.aget_completed_tasks(thread_id),
+        )
+        if not failed:
+            print_final_result(await crud.aget_completed_tasks(thread_id))
+
+        await crud.amark_session_complete(
+            thread_id, "failed" if failed else "completed"
+        )
+
+
+async def ahandle_user_input(
+    thread_id: str, objective: str, planner_agent: "Planner", executor_agent: "Executor"
+):
+    """
+    Async entry point: decide whether to start new or resume session.
+
+    Runs entirely on the event loop (ainvoke, async CRUD), so many sessions can
+    be driven concurrently from one process. Arguments match handle_user_input.
+    """
+    async with metrics.asession(thread_id):
+        existing_session = await crud.aget_session_by_thread(thread_id)
+
+        if existing_session and existing_session["tasks"]:
+            print("🔄 Resuming existing session...")
+            await aresume_session(thread_id, executor_agent, planner_agent)
+        else:
+            print("✨ Starting new session...")
+            await astart_new_session(
+                thread_id, objective, planner_agent, executor_agent
+            )
@@ -0,0 +1,151 @@
+import json
+import threading
+import time
+from typing import Dict, List, Optional
+
+from langchain_core.messages import AIMessage, AIMessageChunk, ToolMessage
+
+from todo_agent.config import settings
+from todo_agent.context import truncate
+
+
+class StepProgress:
+    """
+    Partial output of a step being streamed.
+
+    Collects the model text and every tool result seen so far, and decides when
+    a snapshot is worth saving: after each new tool result, or once the save
+    interval has passed with new text.
+    """
+
+    def __init__(self, tool_names: List[str], save_interval: Optional[float] = None):
+        # Only real tools count; the structured response is also a tool call
+        self.tool_names = set(tool_names)
+        self.save_interval = save_interval or settings.stream_save_interval_seconds
+        self.text = ""
+        self.tool_results: List[Dict] = []
+        self._seen_messages = set()
+        self._last_save = time.monotonic()
+        self._dirty = False
+        self._new_tool_result = False
+
+    def add_token(self, chunk) -> str:
+        """Record a streamed model chunk; returns its text (empty if none)."""
+        if not isinstance(chunk, AIMessageChunk) or not isinstance(chunk.content, str):
+            return ""
+        self.text += chunk.content
+        self._dirty = self._dirty or bool(chunk.content)
+        return chunk.content
+
+    def add_state(self, state: Dict) -> List[Dict]:
+        """
+        Record a full agent state.
+
+        Returns:
+            Tool events not seen before, as dicts with "tool" and either
+            "args" (a call) or "content" (a result)
+        """
+        events = []
+        for message in state.get("messages", []):
+            key = message.id or id(message)
+            if key in self._seen_messages:
+                continue
+            self._seen_messages.add(key)
+            if isinstance(message, AIMessage):
+                events.extend(
+                    {"tool": tool_call["name"], "args": tool_call["args"]}
+                    for tool_call in message.tool_calls
+                    if tool_call["name"] in self.tool_names
+                )
+            elif isinstance(message, ToolMessage) and message.name in self.tool_names:
+                events.append({"tool": message.name, "content": str(message.content)})
+                self.tool_results.append(
+                    {
+                        "tool": message.name,
+                        "content": truncate(
+                            str(message.content), settings.context_step_token_limit
+                        ),
+                    }
+                )
+                self._dirty = self._new_tool_result = True
+        return events
+
+    def due(self) -> bool:
+        if not self._dirty:
+            return False
+        return (
+            self._new_tool_result
+            or time.monotonic() - self._last_save >= self.save_interval
+        )
+
+    def snapshot(self) -> Dict:
+        """Partial result to persist, and mark it as saved."""
+        self._last_save = time.monotonic()
+        self._dirty = self._new_tool_result = False
+        return {"text": self.text, "tool_results": list(self.tool_results)}
+
+
+def format_partial(partial: Dict) -> str:
+    """Render a saved partial result for the executor prompt on resume."""
+    lines = [
+        "Partial progress from an interrupted earlier attempt at this task.",
+        "Reuse these tool results instead of calling the tools again:",
+    ]
+    for result in partial.get("tool_results", []):
+        lines.append(f"- {result['tool']} returned:\n{result['content']}")
+    if partial.get("text"):
+        lines.append(f"Draft output so far:\n{partial['text']}")
+    return "\n".join(lines) + "\n\n"
+
+
+class StreamPrinter:
+    """
+    Prints streamed tokens and tool events as they arrive.
+
+    Output from parallel tasks interleaves, so every line starts with a
+    "[#N]" prefix naming the task that produced it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Task whose token line is still open, if any
+        self._open_line: Optional[int] = None
+        self._line_open = False
+
+    @staticmethod
+    def _prefix(task_id: Optional[int]) -> str:
+        return f"[#{task_id}] " if task_id is not None else ""
+
+    def _end_line(self):
+        if self._line_open:
+            print(flush=True)
+            self._line_open = False
+
+    def token(self, task_id: Optional[int], text: str):
+        if not text:
+            return
+        with self._lock:
+            if not self._line_open or self._open_line != task_id:
+                self._end_line()
+                print(self._prefix(task_id), end="")
+                self._open_line, self._line_open = task_id, True
+            print(text, end="", flush=True)
+
+    def events(self, task_id: Optional[int], events: List[Dict]):
+        """Print tool calls and tool results as returned by StepProgress.add_state."""
+        if not events:
+            return
+        with self._lock:
+            self._end_line()
+            for event in events:
+                if "args" in event:
+                    args = json.dumps(event["args"], default=str)[:120]
+                    print(f"{self._prefix(task_id)}🔧 {event['tool']}({args})")
+                else:
+                    print(
+                        f"{self._prefix(task_id)}📥 {event['tool']} returned "
+                        f"{len(event['content'])} chars"
+                    )
+
+
+printer = StreamPrinter()
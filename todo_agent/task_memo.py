@@ -0,0 +1,87 @@
+import datetime
+import hashlib
+from typing import Dict, List, Optional
+
+from sqlalchemy import select
+
+from todo_agent.config import settings
+from todo_agent.crud import Task, Thread
+from todo_agent.db import SessionLocal, get_async_sessionmaker
+from todo_agent.metrics import timed
+from todo_agent.plan_cache import normalize_objective
+
+
+def memo_key(content: str, dependency_hashes: List[str]) -> str:
+    """
+    Memo key of a task: its normalized content plus the results it builds on.
+
+    Two tasks share a key only if they ask for the same thing and their
+    dependencies produced exactly the same results, so a stored result is
+    never reused on top of different inputs.
+
+    Args:
+        content: Task description
+        dependency_hashes: ContextStore.result_hashes of the task's dependencies
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    fingerprint = "\n".join([normalize_objective(content), *dependency_hashes])
+    return hashlib.sha256(fingerprint.encode("utf-8")).hexdigest()
+
+
+def _memo_query(key: str):
+    """Most recent completed task with this key, within the freshness window."""
+    fresh_after = datetime.datetime.now() - datetime.timedelta(
+        seconds=settings.task_memo_freshness_seconds
+    )
+    return (
+        select(Task.result, Task.reflection, Task.task_id, Thread.thread_id)
+        .join(Thread, Task.session_id == Thread.id)
+        .filter(
+            Task.memo_key == key,
+            Task.status == "completed",
+            Task.completed_at >= fresh_after,
+            # Only original executions: freshness counts from when it ran
+            Task.reused_from.is_(None),
+        )
+        .order_by(Task.completed_at.desc())
+        .limit(1)
+    )
+
+
+def _memo(row) -> Optional[Dict]:
+    if row is None:
+        return None
+    return {
+        "result": row.result,
+        "reflection": row.reflection,
+        "reused_from": f"{row.thread_id}#{row.task_id}",
+    }
+
+
+@timed("task_memo.find", kind="db")
+def find_memo(key: str) -> Optional[Dict]:
+    """
+    Look up a fresh completed result for a memo key.
+
+    Returns:
+        Dict with result, reflection and reused_from ("thread_id#task_id"),
+        or None if there is none or the memo is disabled
+    """
+    if not settings.task_memo_enabled:
+        return None
+    db = SessionLocal()
+    try:
+        return _memo(db.execute(_memo_query(key)).first())
+    finally:
+        db.close()
+
+
+@timed("task_memo.afind", kind="db")
+async def afind_memo(key: str) -> Optional[Dict]:
+    """Async version of find_memo."""
+    if not settings.task_memo_enabled:
+        return None
+    async with get_async_sessionmaker()() as db:
+        return _memo((await db.execute(_memo_query(key))).first())
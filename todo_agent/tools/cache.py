@@ -0,0 +1,211 @@
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from langchain_core.tools import BaseTool
+
+from todo_agent.config import settings
+
+# Query parameters that only track the visitor and never change the page
+TRACKING_PARAMS = ("utm_", "fbclid", "gclid")
+
+
+def normalize_query(query: str) -> str:
+    """Case- and whitespace-insensitive form of a search query."""
+    return " ".join(query.lower().split())
+
+
+def normalize_url(url: str) -> str:
+    """
+    Canonical form of a URL for cache keys.
+
+    Lowercases scheme and host, drops default ports, fragments, tracking
+    parameters and trailing slashes, and sorts the query string.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower() or "https"
+    host = (parts.hostname or "").lower()
+    if parts.port and (scheme, parts.port) not in (("http", 80), ("https", 443)):
+        host = f"{host}:{parts.port}"
+    query = sorted(
+        (k, v)
+        for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith(TRACKING_PARAMS)
+    )
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((scheme, host, path, urlencode(query), ""))
+
+
+def normalize_search_args(args: Dict) -> Dict:
+    args = dict(args)
+    args["query"] = normalize_query(args.get("query", ""))
+    return args
+
+
+def normalize_extract_args(args: Dict) -> Dict:
+    args = dict(args)
+    args["urls"] = sorted({normalize_url(url) for url in args.get("urls", [])})
+    return args
+
+
+def is_cacheable(result: Any) -> bool:
+    """Only successful, JSON-serializable tool results are cached."""
+    return isinstance(result, dict) and "error" not in result
+
+
+class ToolCache:
+    """
+    Local on-disk store for tool results with in-flight request coalescing.
+
+    Results are kept in a small SQLite file, keyed by a hash of the tool name
+    and its normalized arguments. While a call for a key is running, identical
+    calls wait for its result instead of hitting the API again.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS tool_cache "
+            "(key TEXT PRIMARY KEY, result TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+        self._inflight: Dict[str, Future] = {}
+        self._ainflight: Dict[str, asyncio.Future] = {}
+
+    @staticmethod
+    def key(tool_name: str, args: Dict) -> str:
+        payload = json.dumps(
+            {k: v for k, v in args.items() if v is not None}, sort_keys=True
+        )
+        return hashlib.sha256(f"{tool_name}\n{payload}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str, ttl_seconds: float) -> Optional[Any]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT result, created_at FROM tool_cache WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or row[1] < time.time() - ttl_seconds:
+            return None
+        return json.loads(row[0])
+
+    def set(self, key: str, result: Any):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO tool_cache (key, result, created_at) "
+                "VALUES (?, ?, ?)",
+                (key, json.dumps(result), time.time()),
+            )
+            self._conn.commit()
+
+    def call(self, key: str, ttl_seconds: float, fetch: Callable[[], Any]) -> Any:
+        """Return the cached result for key, or fetch it once for all callers."""
+        cached = self.get(key, ttl_seconds)
+        if cached is not None:
+            return cached
+
+        with self._lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+        if not owner:
+            return future.result()
+
+        try:
+            result = fetch()
+            if is_cacheable(result):
+                self.set(key, result)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    async def acall(self, key: str, ttl_seconds: float, fetch) -> Any:
+        """Async version of call; fetch is a zero-argument coroutine function."""
+        cached = self.get(key, ttl_seconds)
+        if cached is not None:
+            return cached
+
+        future = self._ainflight.get(key)
+        if future is not None:
+            return await asyncio.shield(future)
+        future = self._ainflight[key] = asyncio.get_running_loop().create_future()
+
+        try:
+            result = await fetch()
+            if is_cacheable(result):
+                self.set(key, result)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved when nobody else was waiting
+            future.exception()
+            raise
+        finally:
+            self._ainflight.pop(key, None)
+
+
+_tool_cache: Optional[ToolCache] = None
+
+
+def get_tool_cache() -> ToolCache:
+    """Process-wide tool cache shared by all wrapped tools."""
+    global _tool_cache
+    if _tool_cache is None:
+        _tool_cache = ToolCache(settings.tool_cache_path)
+    return _tool_cache
+
+
+class CachedTool(BaseTool):
+    """
+    Wraps a tool with the on-disk cache and request coalescing.
+
+    Exposes the wrapped tool's name, description and argument schema
+    unchanged, so the model sees the same tool.
+    """
+
+    tool: BaseTool
+    ttl_seconds: float
+    normalize: Callable[[Dict], Dict]
+    cache: Any = None
+
+    @classmethod
+    def wrap(
+        cls, tool: BaseTool, ttl_seconds: float, normalize: Callable[[Dict], Dict]
+    ) -> "CachedTool":
+        return cls(
+            name=tool.name,
+            description=tool.description,
+            args_schema=tool.args_schema,
+            tool=tool,
+            ttl_seconds=ttl_seconds,
+            normalize=normalize,
+            cache=get_tool_cache(),
+        )
+
+    def _run(self, run_manager=None, **kwargs) -> Any:
+        key = self.cache.key(self.name, self.normalize(kwargs))
+        config = {"callbacks": run_manager.get_child()} if run_manager else None
+        return self.cache.call(
+            key, self.ttl_seconds, lambda: self.tool.invoke(kwargs, config)
+        )
+
+    async def _arun(self, run_manager=None, **kwargs) -> Any:
+        key = self.cache.key(self.name, self.normalize(kwargs))
+        config = {"callbacks": run_manager.get_child()} if run_manager else None
+        return await self.cache.acall(
+            key, self.ttl_seconds, lambda: self.tool.ainvoke(kwargs, config)
+        )
@@ -1,11 +1,24 @@
+from typing import Optional
+
 from langchain_tavily import TavilySearch
 
 from todo_agent.config import settings
+from todo_agent.rate_limit import RateLimitedTool
+from todo_agent.tools.cache import CachedTool, normalize_search_args
 
 
-def create_search_tool():
-    """Create Tavily search tool"""
-    tavily_search = TavilySearch(
-        max_results=3, topic="general", tavily_api_key=settings.tavily_api_key
+def create_search_tool(cache: Optional[bool] = None):
+    """Create Tavily search tool, rate limited and cached unless caching is disabled"""
+    tavily_search = RateLimitedTool.wrap(
+        TavilySearch(
+            max_results=3, topic="general", tavily_api_key=settings.tavily_api_key
+        ),
+        "tavily",
     )
+    if cache is None:
+        cache = settings.tool_cache_enabled
+    if cache:
+        return CachedTool.wrap(
+            tavily_search, settings.search_cache_ttl_seconds, normalize_search_args
+        )
     return tavily_search
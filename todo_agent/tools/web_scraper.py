@@ -1,13 +1,138 @@
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Type
+
+from langchain_core.tools import BaseTool
 from langchain_tavily import TavilyExtract
+from pydantic import BaseModel, Field
 
 from todo_agent.config import settings
+from todo_agent.rate_limit import RateLimitedTool
+from todo_agent.tools.cache import CachedTool, normalize_extract_args
+
+TRUNCATION_MARKER = "\n… [truncated]"
+
+
+class WebScraperInput(BaseModel):
+    urls: List[str] = Field(
+        description="All the URLs to extract content from, in a single call"
+    )
+    max_chars_per_page: Optional[int] = Field(
+        default=None,
+        description="Optional limit on the characters returned per page",
+    )
+
+
+class BatchWebScraper(BaseTool):
+    """
+    Extracts many URLs in one tool call.
+
+    Each URL is fetched separately with the wrapped extract tool (so every
+    page gets its own cache entry), on a bounded pool of concurrent requests.
+    The pages come back together in one tool result, optionally truncated, so
+    the agent spends one model turn instead of one per URL.
+    """
+
+    name: str = "web_scraper"
+    description: str = (
+        "Extract the main content of one or more web pages. "
+        "Pass every URL you need in a single call; they are fetched in parallel."
+    )
+    args_schema: Type[BaseModel] = WebScraperInput
+    extractor: BaseTool
+    max_concurrency: int = 5
+    max_chars_per_page: Optional[int] = None
+
+    def _page_limit(self, max_chars_per_page: Optional[int]) -> Optional[int]:
+        limits = [x for x in (max_chars_per_page, self.max_chars_per_page) if x]
+        return min(limits) if limits else None
+
+    @staticmethod
+    def _merge(
+        urls: List[str], pages: List[Any], max_chars: Optional[int]
+    ) -> Dict[str, List]:
+        """Combine per-URL extract responses into one result, in input order."""
+        results, failed_results = [], []
+        for url, page in zip(urls, pages):
+            if isinstance(page, Exception) or not isinstance(page, dict):
+                failed_results.append({"url": url, "error": str(page)})
+                continue
+            if "error" in page:
+                failed_results.append({"url": url, "error": str(page["error"])})
+                continue
+            failed_results.extend(page.get("failed_results", []))
+            for result in page.get("results", []):
+                content = result.get("raw_content") or ""
+                if max_chars and len(content) > max_chars:
+                    content = content[:max_chars] + TRUNCATION_MARKER
+                results.append({"url": result.get("url", url), "raw_content": content})
+        return {"results": results, "failed_results": failed_results}
+
+    def _run(
+        self,
+        urls: List[str],
+        max_chars_per_page: Optional[int] = None,
+        run_manager=None,
+    ) -> Dict[str, List]:
+        urls = list(dict.fromkeys(urls))
+        config = {"callbacks": run_manager.get_child()} if run_manager else None
+
+        def fetch(url: str):
+            try:
+                return self.extractor.invoke({"urls": [url]}, config)
+            except Exception as e:
+                return e
 
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as pool:
+            # Each fetch runs in a copy of this context, so its spans keep the
+            # session and task ids (a context can't be entered by two threads)
+            futures = [
+                pool.submit(contextvars.copy_context().run, fetch, url) for url in urls
+            ]
+            pages = [future.result() for future in futures]
+        return self._merge(urls, pages, self._page_limit(max_chars_per_page))
 
-def web_scraper():
+    async def _arun(
+        self,
+        urls: List[str],
+        max_chars_per_page: Optional[int] = None,
+        run_manager=None,
+    ) -> Dict[str, List]:
+        urls = list(dict.fromkeys(urls))
+        config = {"callbacks": run_manager.get_child()} if run_manager else None
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def fetch(url: str):
+            async with semaphore:
+                try:
+                    return await self.extractor.ainvoke({"urls": [url]}, config)
+                except Exception as e:
+                    return e
+
+        pages = await asyncio.gather(*[fetch(url) for url in urls])
+        return self._merge(urls, pages, self._page_limit(max_chars_per_page))
+
+
+def web_scraper(cache: Optional[bool] = None):
     """Tavily extract tool. This tool allows you to extract content from URLs."""
-    tavily_extract = TavilyExtract(
-        extract_depth="basic",
-        include_images=False,
-        tavily_api_key=settings.tavily_api_key,
+    # Each page fetch is one Tavily request; cache hits don't use the quota
+    tavily_extract = RateLimitedTool.wrap(
+        TavilyExtract(
+            extract_depth="basic",
+            include_images=False,
+            tavily_api_key=settings.tavily_api_key,
+        ),
+        "tavily",
+    )
+    if cache is None:
+        cache = settings.tool_cache_enabled
+    if cache:
+        tavily_extract = CachedTool.wrap(
+            tavily_extract, settings.extract_cache_ttl_seconds, normalize_extract_args
+        )
+    return BatchWebScraper(
+        extractor=tavily_extract,
+        max_concurrency=settings.scraper_max_concurrency,
+        max_chars_per_page=settings.scraper_max_chars_per_page,
     )
-    return tavily_extract
@@ -0,0 +1,214 @@
+import argparse
+import asyncio
+import datetime
+import multiprocessing
+import os
+import socket
+import sys
+from typing import Iterable, Optional
+
+from todo_agent import crud
+from todo_agent.config import settings
+from todo_agent.db import engine, get_async_engine
+from todo_agent.main import build_agents, make_thread_id
+from todo_agent.migrations import upgrade_schema
+from todo_agent.session_manager import ahandle_user_input
+
+
+async def enqueue(objectives: Iterable[str]) -> int:
+    """Queue non-empty objectives, keyed by the same thread id as the CLI."""
+    batch = {}
+    for line in objectives:
+        objective = line.strip()
+        if objective:
+            batch[make_thread_id(objective)] = objective
+    if not batch:
+        return 0
+    return await crud.aenqueue_objectives(batch)
+
+
+async def enqueue_file(path: str) -> int:
+    """Queue every objective in a file, one per line."""
+    with open(path, encoding="utf-8") as f:
+        queued = await enqueue(f)
+    # Connections are bound to this event loop; the workers run in a new one
+    await get_async_engine().dispose()
+    return queued
+
+
+async def enqueue_stdin(done: asyncio.Event):
+    """Stream objectives from stdin into the queue while the workers run."""
+    try:
+        while True:
+            line = await asyncio.to_thread(sys.stdin.readline)
+            if not line:
+                break
+            await enqueue([line])
+    finally:
+        done.set()
+
+
+async def _heartbeat(thread_id: str, worker_id: str):
+    while True:
+        await asyncio.sleep(settings.worker_heartbeat_seconds)
+        await crud.aheartbeat(thread_id, worker_id)
+
+
+async def run_worker(
+    worker_id: str,
+    planner,
+    executor,
+    producer_done: Optional[asyncio.Event],
+    drain: bool,
+):
+    """
+    Claim queued threads one at a time and run them to completion.
+
+    Args:
+        worker_id: Unique identifier stored on claimed threads
+        planner: Planner agent
+        executor: Executor agent
+        producer_done: Set once no more objectives will be enqueued (None if
+            objectives were enqueued up front)
+        drain: Exit once the queue is empty instead of polling forever
+    """
+    stale_after = datetime.timedelta(seconds=settings.worker_stale_after_seconds)
+    while True:
+        claimed = await crud.aclaim_next_thread(worker_id)
+        if claimed is None:
+            if drain and (producer_done is None or producer_done.is_set()):
+                return
+            # Idle: pick up sessions left behind by workers that died
+            await crud.arecover_abandoned_threads(stale_after)
+            await asyncio.sleep(settings.worker_poll_seconds)
+            continue
+
+        thread_id = claimed["thread_id"]
+        heartbeat = asyncio.create_task(_heartbeat(thread_id, worker_id))
+        status = "failed"
+        try:
+            await ahandle_user_input(
+                thread_id=thread_id,
+                objective=claimed["objective"],
+                planner_agent=planner,
+                executor_agent=executor,
+            )
+            session_data = await crud.aget_session_by_thread(thread_id)
+            # Tasks replaced by a repaired plan no longer count
+            if all(
+                t["status"] == "completed"
+                for t in session_data["tasks"]
+                if t["status"] != "replaced"
+            ):
+                status = "completed"
+        except Exception as e:
+            status = "failed"
+            print(f"❌ Session {thread_id[:12]} failed: {str(e)}")
+        finally:
+            heartbeat.cancel()
+            # The computed status also covers a resume that had nothing to run
+            await crud.arelease_thread(thread_id, worker_id, status)
+
+
+async def run_pool(
+    concurrency: int,
+    drain: bool,
+    stdin: bool = False,
+    process_index: int = 0,
+    cache: Optional[bool] = None,
+):
+    """
+    Run a pool of async workers in this process.
+
+    Args:
+        concurrency: Number of sessions run concurrently
+        drain: Exit once the queue is empty
+        stdin: Stream objectives from stdin while running
+        process_index: Index of this process in a multi-process pool
+        cache: Force the LLM response and tool caches on/off (None follows settings)
+    """
+    planner, executor = build_agents(cache=cache)
+    stale_after = datetime.timedelta(seconds=settings.worker_stale_after_seconds)
+    recovered = await crud.arecover_abandoned_threads(stale_after)
+    if recovered:
+        print(f"♻️  Requeued {recovered} abandoned sessions")
+
+    producer_done = None
+    producer = None
+    if stdin:
+        producer_done = asyncio.Event()
+        producer = asyncio.create_task(enqueue_stdin(producer_done))
+
+    prefix = f"{socket.gethostname()}-{os.getpid()}-{process_index}"
+    await asyncio.gather(
+        *[
+            run_worker(f"{prefix}-{i}", planner, executor, producer_done, drain)
+            for i in range(concurrency)
+        ]
+    )
+    if producer:
+        await producer
+
+
+def _run_process(
+    concurrency: int, drain: bool, process_index: int, cache: Optional[bool]
+):
+    asyncio.run(run_pool(concurrency, drain, process_index=process_index, cache=cache))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Run many objectives concurrently from a file, stdin or the DB queue."
+    )
+    parser.add_argument("--file", help="File with one objective per line to enqueue")
+    parser.add_argument(
+        "--stdin", action="store_true", help="Stream objectives from stdin"
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=settings.worker_concurrency,
+        help="Sessions run concurrently per process",
+    )
+    parser.add_argument(
+        "--processes", type=int, default=1, help="Number of worker processes"
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Bypass the LLM response and tool caches",
+    )
+    parser.add_argument(
+        "--forever",
+        action="store_true",
+        help="Keep polling the queue instead of exiting when it is empty",
+    )
+    args = parser.parse_args(argv)
+    drain = not args.forever
+    cache = False if args.no_cache else None
+
+    upgrade_schema(engine)
+    if args.file:
+        queued = asyncio.run(enqueue_file(args.file))
+        print(f"📥 Queued {queued} objectives from {args.file}")
+
+    if args.stdin or args.processes <= 1:
+        # stdin can only be consumed by one process
+        asyncio.run(run_pool(args.concurrency, drain, stdin=args.stdin, cache=cache))
+        return
+
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(
+            target=_run_process, args=(args.concurrency, drain, index, cache)
+        )
+        for index in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+
+if __name__ == "__main__":
+    main()